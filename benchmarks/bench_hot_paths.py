@@ -0,0 +1,403 @@
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing as mp
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from synthetic_data import write_eaf
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "data" / "results"))
+
+TABLES_DIR = REPO_ROOT / "data" / "results" / "tables"
+MATCHED_CSV = TABLES_DIR / "matched_single_signs.csv"  # 5694 rows = scale 1
+STATPED_CSV = TABLES_DIR / "statped_dict.csv"
+SIGNPUDDLE_CSV = TABLES_DIR / "signpuddle_dict.csv"
+BASELINE_FILE = Path(__file__).parent / "baselines.json"
+
+VARIANTS = ["original", "cut", "speed", "both"]
+VALUE_COLUMNS = ["value", "cut_value", "speed_value", "both_value"]
+_SYMBOL = re.compile(r"S[123][0-9a-f]{2}[0-5][0-9a-f]\d{3}x\d{3}")
+
+
+# ---- scaled inputs ----
+
+
+def scale_tag(k):
+    """Letters-only tag for copy k ("" for the original). Digits would be cleaned away."""
+    tag = ""
+    while k:
+        k, r = divmod(k - 1, 26)
+        tag = chr(97 + r) + tag
+    return tag
+
+
+def perturb(fsw, k):
+    """Deterministic stand-in prediction: the reference, shifted, or missing a symbol."""
+    if not isinstance(fsw, str):
+        return " "
+    if k % 3 == 0:
+        return fsw
+    if k % 3 == 1:
+        return fsw.replace("x5", "x4", 1)
+    symbols = _SYMBOL.findall(fsw)
+    return fsw.replace(symbols[-1], "", 1) if symbols else fsw
+
+
+def scaled_references(scale):
+    """matched_single_signs (Filename, Signwriting) repeated scale times with unique filenames."""
+    base = pd.read_csv(MATCHED_CSV, usecols=["Filename", "Signwriting"])
+    copies = [
+        base.assign(
+            Filename=base["Filename"].str.replace(
+                ".mp4", f"{scale_tag(k)}.mp4", regex=False
+            )
+        )
+        for k in range(scale)
+    ]
+    return pd.concat(copies, ignore_index=True)
+
+
+def predictions_for(sw_df):
+    """One row per video with value, cut_value, speed_value and both_value, as in analysis.py."""
+    refs = sw_df.drop_duplicates("Filename")
+    stems = refs["Filename"].str.replace(".mp4", "", regex=False)
+    res_df = pd.DataFrame({"name": stems + ".eaf", "stem": stems})
+    for i, col in enumerate(VALUE_COLUMNS):
+        res_df[col] = [perturb(f, j + i) for j, f in enumerate(refs["Signwriting"])]
+    return res_df.reset_index(drop=True)
+
+
+def reference_pairs(scale):
+    sw_df = scaled_references(scale)
+    hypotheses = [perturb(f, j) for j, f in enumerate(sw_df["Signwriting"])]
+    return list(zip(hypotheses, sw_df["Signwriting"]))
+
+
+def cheap_metrics():
+    """All metrics but CLIPScore, which needs a model download and dominates the run."""
+    from signwriting_evaluation.metrics.bleu import SignWritingBLEU
+    from signwriting_evaluation.metrics.chrf import SignWritingCHRF
+    from signwriting_evaluation.metrics.similarity import SignWritingSimilarityMetric
+
+    return [SignWritingBLEU(), SignWritingCHRF(), SignWritingSimilarityMetric()]
+
+
+def write_eaf_folder(scale, folder: Path):
+    res_df = predictions_for(scaled_references(scale))
+    for stem, value in zip(res_df["stem"], res_df["value"]):
+        signs = value.split()[:3] or [" "]
+        segments = [(10 * i, 10 * (i + 1)) for i in range(len(signs))]
+        write_eaf(folder / f"{stem}.eaf", segments, signwriting=signs)
+    return len(res_df)
+
+
+# ---- benchmarks: setup(scale, workdir) -> (run, n_rows) ----
+
+
+def bench_any_match(scale, workdir):
+    from src.single_signs.evaluate import any_match
+
+    pairs = reference_pairs(scale)
+    return lambda: [any_match(h, r) for h, r in pairs], len(pairs)
+
+
+def bench_get_metrics(scale, workdir):
+    from src.single_signs.evaluate import get_metrics
+
+    pairs = reference_pairs(scale)
+    metrics = cheap_metrics()
+    return lambda: [get_metrics(h, r, metrics) for h, r in pairs], len(pairs)
+
+
+def bench_compare_signwriting(scale, workdir):
+    from src.single_signs.evaluate import compare_signwriting
+
+    sw_df = scaled_references(scale)
+    res_df = predictions_for(sw_df)
+    metrics = cheap_metrics()
+    return lambda: compare_signwriting(res_df, sw_df, metrics=metrics), len(sw_df)
+
+
+def _scored_results(sw_df):
+    """compare_signwriting-shaped results with random scores for every variant."""
+    rng = np.random.default_rng(0)
+    n = len(sw_df)
+    result_df = pd.DataFrame({"reference": sw_df["Signwriting"]})
+    for i, variant in enumerate(VARIANTS):
+        result_df[f"{variant}_value"] = [
+            perturb(f, j + i) for j, f in enumerate(sw_df["Signwriting"])
+        ]
+        for metric in ["CHRF", "TokenizedBLEU", "SymbolsDistances", "CLIPScore"]:
+            result_df[f"{variant}_value_{metric}_scores"] = [[x] for x in rng.random(n)]
+    return result_df
+
+
+def bench_summarize_lengths_and_means(scale, workdir):
+    from src.single_signs.evaluate import summarize_lengths_and_means
+
+    sw_df = scaled_references(scale)
+    result_df = _scored_results(sw_df)
+    return lambda: summarize_lengths_and_means(result_df), len(sw_df)
+
+
+def bench_variant_statistics(scale, workdir):
+    from src.single_signs.evaluate import summarize_lengths_and_means
+    from src.single_signs.significance import variant_statistics
+
+    sw_df = scaled_references(scale)
+    summary_df = summarize_lengths_and_means(_scored_results(sw_df))
+    stems = sw_df["Filename"].to_numpy()
+    return lambda: variant_statistics(summary_df, clusters=stems), len(sw_df)
+
+
+def _scaled_glosses(scale):
+    glosses = pd.read_csv(STATPED_CSV, usecols=["Gloss"])["Gloss"]
+    return pd.concat(
+        [glosses + f" {scale_tag(k)}" for k in range(scale)], ignore_index=True
+    )
+
+
+def bench_clean_modified(scale, workdir):
+    from gloss import clean_modified
+
+    glosses = _scaled_glosses(scale)
+    return lambda: glosses.str.replace("-", " ").apply(clean_modified), len(glosses)
+
+
+def bench_normalize_glosses(scale, workdir):
+    from gloss import normalize_glosses
+
+    glosses = _scaled_glosses(scale)
+    return lambda: normalize_glosses(glosses), len(glosses)
+
+
+def _merged_tabs(scale, workdir, fuzzy_min_score):
+    from get_tables import merged_tabs
+
+    statped = pd.read_csv(STATPED_CSV)
+    signpuddle = pd.read_csv(SIGNPUDDLE_CSV)
+    # prefix every copy so copies only join with their own copy
+    prefixes = [f"zq{scale_tag(k)} " if k else "" for k in range(scale)]
+    pd.concat(
+        [statped.assign(Gloss=p + statped["Gloss"].astype(str)) for p in prefixes],
+        ignore_index=True,
+    ).to_csv(workdir / "statped_dict.csv", index=False)
+    pd.concat(
+        [
+            signpuddle.assign(
+                Gloss=p + signpuddle["Gloss"].astype(str),
+                modified=p + signpuddle["modified"].astype(str),
+            )
+            for p in prefixes
+        ],
+        ignore_index=True,
+    ).to_csv(workdir / "signpuddle_dict.csv", index=False)
+
+    def run():
+        merged_tabs(
+            workdir,
+            workdir / "statped_dict.csv",
+            workdir / "signpuddle_dict.csv",
+            fuzzy_min_score=fuzzy_min_score,
+        )
+
+    return run, len(statped) * scale
+
+
+def bench_merged_tabs(scale, workdir):
+    return _merged_tabs(scale, workdir, None)
+
+
+def bench_merged_tabs_fuzzy(scale, workdir):
+    return _merged_tabs(scale, workdir, 0.85)
+
+
+def bench_eaf_parse(scale, workdir):
+    from src.single_signs.eaf import load_eaf_folder
+
+    n_files = write_eaf_folder(scale, workdir)
+    return lambda: load_eaf_folder(workdir, use_cache=False), n_files
+
+
+def bench_eaf_cached(scale, workdir):
+    from src.single_signs.eaf import load_eaf_folder
+
+    n_files = write_eaf_folder(scale, workdir)
+    load_eaf_folder(workdir)  # prime the cache
+    return lambda: load_eaf_folder(workdir), n_files
+
+
+def bench_process_eaf_folder(scale, workdir):
+    from src.single_signs.predictions import process_eaf_folder
+
+    n_files = write_eaf_folder(scale, workdir)
+    return lambda: process_eaf_folder(workdir, use_cache=False), n_files
+
+
+BENCHMARKS = {
+    "any_match": bench_any_match,
+    "get_metrics": bench_get_metrics,
+    "compare_signwriting": bench_compare_signwriting,
+    "summarize_lengths_and_means": bench_summarize_lengths_and_means,
+    "variant_statistics": bench_variant_statistics,
+    "clean_modified": bench_clean_modified,
+    "normalize_glosses": bench_normalize_glosses,
+    "merged_tabs": bench_merged_tabs,
+    "merged_tabs_fuzzy": bench_merged_tabs_fuzzy,
+    "eaf_parse": bench_eaf_parse,
+    "eaf_cached": bench_eaf_cached,
+    "process_eaf_folder": bench_process_eaf_folder,
+}
+
+
+# ---- runner ----
+
+
+def _run_benchmark(name, scale, measure_memory, conn):
+    """Child process: set up, time one run, then trace peak memory of a second run."""
+    try:
+        with tempfile.TemporaryDirectory() as workdir, contextlib.redirect_stdout(
+            io.StringIO()
+        ):
+            run, n_rows = BENCHMARKS[name](scale, Path(workdir))
+            start = time.perf_counter()
+            run()
+            seconds = time.perf_counter() - start
+
+            peak_mb = None
+            if measure_memory:
+                tracemalloc.start()
+                run()
+                peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+                tracemalloc.stop()
+        conn.send(
+            {
+                "rows": n_rows,
+                "seconds": seconds,
+                "rows_per_sec": n_rows / seconds if seconds > 0 else float("inf"),
+                "peak_mb": peak_mb,
+            }
+        )
+    except ImportError as e:
+        conn.send({"skipped": f"missing dependency: {e}"})
+    except Exception as e:
+        conn.send({"error": repr(e)})
+
+
+def run_benchmark(name, scale, measure_memory=True):
+    """Run one benchmark in a fresh process so imports and memory do not leak between runs."""
+    parent, child = mp.Pipe(duplex=False)
+    process = mp.Process(
+        target=_run_benchmark, args=(name, scale, measure_memory, child)
+    )
+    process.start()
+    child.close()
+    try:
+        result = parent.recv()
+    except EOFError:
+        result = {"error": "benchmark process died"}
+    process.join()
+    return result
+
+
+def find_regressions(results, baselines, tolerance):
+    regressions = []
+    for key, result in results.items():
+        base = baselines.get(key)
+        if not base or "rows_per_sec" not in result:
+            continue
+        if result["rows_per_sec"] < base["rows_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{key}: {result['rows_per_sec']:.0f} rows/s, "
+                f"baseline {base['rows_per_sec']:.0f} rows/s"
+            )
+        if (
+            result.get("peak_mb") is not None
+            and base.get("peak_mb") is not None
+            and result["peak_mb"] > base["peak_mb"] * (1 + tolerance)
+        ):
+            regressions.append(
+                f"{key}: peak {result['peak_mb']:.1f} MB, "
+                f"baseline {base['peak_mb']:.1f} MB"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmarks for the evaluation and table-building hot paths."
+    )
+    parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=sorted(BENCHMARKS),
+        default=sorted(BENCHMARKS),
+        help="Benchmarks to run (default: all)",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1, 10, 100],
+        help="Dataset sizes as multiples of the 5694-row matched table",
+    )
+    parser.add_argument(
+        "--no_memory", action="store_true", help="Skip the traced peak-memory run"
+    )
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE)
+    parser.add_argument(
+        "--save_baseline",
+        action="store_true",
+        help="Store these results as the new baseline",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed relative slowdown / memory growth before flagging a regression",
+    )
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'benchmark':<34}{'rows':>10}{'seconds':>10}{'rows/s':>12}{'peak MB':>10}")
+    for name in args.only:
+        for scale in args.sizes:
+            key = f"{name}@{scale}x"
+            result = run_benchmark(name, scale, not args.no_memory)
+            if "rows" not in result:
+                print(f"{key:<34}{result.get('skipped') or result.get('error')}")
+                continue
+            results[key] = result
+            peak = "-" if result["peak_mb"] is None else f"{result['peak_mb']:.1f}"
+            print(
+                f"{key:<34}{result['rows']:>10}{result['seconds']:>10.3f}"
+                f"{result['rows_per_sec']:>12.0f}{peak:>10}"
+            )
+
+    baselines = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if args.save_baseline:
+        baselines.update(results)
+        args.baseline.write_text(json.dumps(baselines, indent=2, sort_keys=True))
+        print(f"Saved {len(results)} baseline(s) to {args.baseline}")
+        return
+
+    regressions = find_regressions(results, baselines, args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        print("\n".join(regressions))
+        sys.exit(1)
+    if baselines:
+        print("\nNo regressions against", args.baseline)
+
+
+if __name__ == "__main__":
+    main()
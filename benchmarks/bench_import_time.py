@@ -0,0 +1,95 @@
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# name -> (directories put on sys.path, module), as each script is run
+TARGETS = {
+    "evaluate": ([REPO_ROOT], "src.single_signs.evaluate"),
+    "predictions": ([REPO_ROOT], "src.single_signs.predictions"),
+    "analysis": (
+        [REPO_ROOT, REPO_ROOT / "experiment_single_sign"],
+        "analysis",
+    ),
+    "pose": ([REPO_ROOT / "sign_transcription"], "pose"),
+    "main": ([REPO_ROOT / "sign_transcription"], "main"),
+    "work_queue": ([REPO_ROOT / "sign_transcription"], "work_queue"),
+    "get_stats": ([REPO_ROOT / "data" / "results"], "get_stats"),
+}
+
+
+def import_seconds(paths, module):
+    """Wall time of a fresh interpreter importing module, and its slowest imports."""
+    code = (
+        "import sys, time\n"
+        f"sys.path[:0] = {[str(p) for p in paths]!r}\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=REPO_ROOT,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1])
+
+    # -X importtime lines: "import time: self [us] | cumulative | imported package"
+    slowest = []
+    for line in process.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            slowest.append((int(parts[1]) / 1e6, parts[2][1:]))
+    # nested imports are indented two spaces per level below their importer;
+    # the ones directly below the module are what it costs to import
+    direct = [
+        (s, name.strip()) for s, name in slowest if len(name) - len(name.lstrip()) == 2
+    ]
+    direct.sort(reverse=True)
+    return float(process.stdout.strip().splitlines()[-1]), direct
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time importing the evaluation and pipeline modules in a fresh interpreter."
+    )
+    parser.add_argument("--only", nargs="+", choices=list(TARGETS), default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=None,
+        help="Exit with 1 if a module takes longer than this many seconds",
+    )
+    parser.add_argument(
+        "--top", type=int, default=3, help="Slowest direct imports to show"
+    )
+    args = parser.parse_args()
+
+    over_budget = []
+    print(f"{'module':<14}{'median s':>10}  slowest imports (cumulative s)")
+    for name in args.only or TARGETS:
+        paths, module = TARGETS[name]
+        try:
+            runs = [import_seconds(paths, module) for _ in range(args.repeat)]
+        except RuntimeError as e:
+            print(f"{name:<14}{'failed':>10}  {e}")
+            continue
+        median = statistics.median(seconds for seconds, _ in runs)
+        slowest = ", ".join(f"{mod} {s:.2f}" for s, mod in runs[-1][1][: args.top])
+        print(f"{name:<14}{median:>10.2f}  {slowest}")
+        if args.budget is not None and median > args.budget:
+            over_budget.append(name)
+
+    if over_budget:
+        print(f"Over the {args.budget}s budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "sign_transcription"))
+
+from main import process_subdirectories
+from instrumentation import Tracer, read_trace
+from supervisor import Supervisor, read_failures
+from segmentation import run_segmentation
+from transcription import run_transcription
+from transcription_batched import run_transcription_batched
+from work_queue import WorkQueue, run_workers
+from pipeline_stubs import install_stubs
+from synthetic_data import generate_corpus
+
+STAGES = {
+    "segmentation": (run_segmentation, "pose_to_segments"),
+    "transcription": (run_transcription, "pose_to_signwriting"),
+    "transcription_batched": (run_transcription_batched, "pose_to_signwriting"),
+}
+
+
+def timed_stage(name, stage_times, supervisor=None, concurrency=1):
+    """A main.py stage (without the install step) that adds its run time to stage_times."""
+    func, _ = STAGES[name]
+
+    def run(subdir):
+        start = time.perf_counter()
+        func(subdir, install=False, supervisor=supervisor, concurrency=concurrency)
+        stage_times[name] += time.perf_counter() - start
+
+    return run
+
+
+def read_spans(log_path: Path):
+    if not log_path.exists():
+        return []
+    with open(log_path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def busy_seconds(spans):
+    """Length of the union of the [start, end] intervals of the tool calls."""
+    total, current_start, current_end = 0.0, None, None
+    for span in sorted(spans, key=lambda s: s["start"]):
+        if current_end is None or span["start"] > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = span["start"], span["end"]
+        else:
+            current_end = max(current_end, span["end"])
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def stub_env(args, log_path: Path, bin_dir: Path):
+    return {
+        "PATH": f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}",
+        "STUB_LOG": str(log_path),
+        "STUB_SEGMENTS_LATENCY": str(args.segment_latency),
+        "STUB_SIGNWRITING_LATENCY": str(args.transcribe_latency),
+        "STUB_SIGN_LATENCY": str(args.sign_latency),
+        "STUB_JITTER": str(args.jitter),
+        "STUB_MAX_SIGNS": str(args.max_signs),
+        "STUB_FAIL_RATE": str(args.fail_rate),
+        "STUB_HANG_RATE": str(args.hang_rate),
+    }
+
+
+def run_pipeline(
+    data_dir: Path, stages, env, quiet=True, supervisor=None, concurrency=1
+):
+    """Run main.py's subdirectory flow with the given stages; returns (wall, stage_times)."""
+    stage_times = defaultdict(float)
+    os.environ.update(env)
+    with contextlib.ExitStack() as stack:
+        if quiet:
+            devnull = stack.enter_context(open(os.devnull, "w"))
+            stack.enter_context(contextlib.redirect_stdout(devnull))
+            stack.enter_context(contextlib.redirect_stderr(devnull))
+        start = time.perf_counter()
+        process_subdirectories(
+            data_dir,
+            stages=[
+                timed_stage(name, stage_times, supervisor, concurrency)
+                for name in stages
+            ],
+        )
+        wall = time.perf_counter() - start
+    return wall, dict(stage_times)
+
+
+def run_queue(data_dir: Path, n_workers, env, trace_path, lease_seconds=60.0):
+    """Drain data_dir through work_queue.py with n_workers local processes; returns wall."""
+    os.environ.update(env)
+    db_path = data_dir.parent / "work_queue.sqlite"
+    with WorkQueue(db_path) as queue:
+        queue.enqueue(data_dir)
+    start = time.perf_counter()
+    run_workers(db_path, n_workers, lease_seconds, trace_path)
+    return time.perf_counter() - start
+
+
+def summarize(wall, stage_times, spans, n_clips):
+    """clips/sec of the whole run; per stage the time spent in and around the tools."""
+    report = {
+        "clips": n_clips,
+        "wall_seconds": wall,
+        "clips_per_second": n_clips / wall if wall else 0.0,
+        "stages": {},
+    }
+    for name, seconds in stage_times.items():
+        tool_spans = [s for s in spans if s["tool"] == STAGES[name][1]]
+        busy = busy_seconds(tool_spans)
+        report["stages"][name] = {
+            "seconds": seconds,
+            "calls": len(tool_spans),
+            "failed_calls": sum(s["exit_code"] != 0 for s in tool_spans),
+            "tool_seconds": busy,
+            # time no tool call was running: process spawn, interpreter start-up,
+            # globbing and bookkeeping between calls
+            "idle_seconds": max(seconds - busy, 0.0),
+            "idle_share": max(seconds - busy, 0.0) / seconds if seconds else 0.0,
+        }
+    return report
+
+
+def print_report(report):
+    print(
+        f"{report['clips']} clips in {report['wall_seconds']:.2f}s "
+        f"({report['clips_per_second']:.2f} clips/s)"
+    )
+    if not report["stages"]:
+        return
+    print(
+        f"{'stage':<16}{'calls':>7}{'failed':>8}{'seconds':>10}"
+        f"{'in tool':>10}{'idle':>10}{'idle %':>8}"
+    )
+    for name, stage in report["stages"].items():
+        print(
+            f"{name:<16}{stage['calls']:>7}{stage['failed_calls']:>8}"
+            f"{stage['seconds']:>10.2f}{stage['tool_seconds']:>10.2f}"
+            f"{stage['idle_seconds']:>10.2f}{100 * stage['idle_share']:>7.1f}%"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the pipeline's orchestration throughput with stub tools."
+    )
+    parser.add_argument(
+        "--work_dir",
+        type=Path,
+        default=None,
+        help="Where to write the synthetic tree (default: a temporary directory)",
+    )
+    parser.add_argument("--broadcasts", type=int, default=4)
+    parser.add_argument("--clips", type=int, default=10, help="Clips per broadcast")
+    parser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=list(STAGES),
+        default=["segmentation", "transcription"],
+    )
+    parser.add_argument("--segment_latency", type=float, default=0.05)
+    parser.add_argument("--transcribe_latency", type=float, default=0.1)
+    parser.add_argument(
+        "--sign_latency", type=float, default=0.0, help="Seconds per transcribed sign"
+    )
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--max_signs", type=int, default=6)
+    parser.add_argument(
+        "--concurrency", type=int, default=1, help="Tool calls at a time per directory"
+    )
+    parser.add_argument(
+        "--queue_workers",
+        type=int,
+        default=0,
+        help="Process the clips through the work queue with this many worker processes",
+    )
+    parser.add_argument("--fail_rate", type=float, default=0.0)
+    parser.add_argument("--hang_rate", type=float, default=0.0)
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--backoff", type=float, default=0.1)
+    parser.add_argument(
+        "--timeout_base", type=float, default=5.0, help="Seconds per call"
+    )
+    parser.add_argument(
+        "--timeout_per_second", type=float, default=0.5, help="Seconds per clip second"
+    )
+    parser.add_argument("--json", type=Path, default=None, help="Save the report")
+    parser.add_argument(
+        "--trace", type=Path, default=None, help="Save the per-clip spans as JSONL"
+    )
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline output")
+    args = parser.parse_args()
+
+    with contextlib.ExitStack() as stack:
+        work_dir = args.work_dir or Path(
+            stack.enter_context(tempfile.TemporaryDirectory())
+        )
+        generate_corpus(
+            work_dir,
+            n_broadcasts=args.broadcasts,
+            clips_per_broadcast=args.clips,
+            n_single_signs=0,
+            with_eafs="segmentation" not in args.stages,
+        )
+        data_dir = work_dir / "processed_NRK"
+        log_path = work_dir / "stub_spans.jsonl"
+        log_path.unlink(missing_ok=True)
+        env = stub_env(args, log_path, install_stubs(work_dir / "bin"))
+
+        tracer = Tracer(args.trace)
+        supervisor = Supervisor(
+            tracer,
+            retries=args.retries,
+            backoff=args.backoff,
+            timeout_base=args.timeout_base,
+            timeout_per_second=args.timeout_per_second,
+        )
+        if args.queue_workers:
+            # per-clip segmentation and transcription in the worker processes
+            trace_path = args.trace or work_dir / "queue_trace.jsonl"
+            wall = run_queue(data_dir, args.queue_workers, env, trace_path)
+            stage_times = {}
+            tracer.spans = read_trace(trace_path)
+        else:
+            wall, stage_times = run_pipeline(
+                data_dir,
+                args.stages,
+                env,
+                quiet=not args.verbose,
+                supervisor=supervisor,
+                concurrency=args.concurrency,
+            )
+        quarantined = sum(len(read_failures(d)) for d in data_dir.iterdir())
+        n_clips = sum(1 for _ in data_dir.glob("*/*.pose"))
+        report = summarize(wall, stage_times, read_spans(log_path), n_clips)
+
+    print_report(report)
+    print(tracer.summary())
+    print(f"Quarantined clips: {quarantined}")
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(REPO_ROOT), str(REPO_ROOT / "sign_transcription")]
+
+from pose_format import Pose
+from pose import POSE_PROFILES, estimate_pose
+from instrumentation import Tracer
+from segmentation import segment_clip
+from segmentation_onnx import compare_segments, read_eaf_segments
+from supervisor import Supervisor
+from transcription import transcribe_clip
+
+
+def read_pose(pose_path: Path):
+    with open(pose_path, "rb") as f:
+        return Pose.read(f.read())
+
+
+def keypoint_error(pose_path: Path, reference_path: Path):
+    """Mean pixel distance to the reference keypoints, over points both have."""
+    data, confidence = _arrays(read_pose(pose_path))
+    ref_data, ref_confidence = _arrays(read_pose(reference_path))
+    n = min(len(data), len(ref_data))
+    both = (confidence[:n] > 0) & (ref_confidence[:n] > 0)
+    distances = np.linalg.norm(data[:n, ..., :2] - ref_data[:n, ..., :2], axis=-1)
+    return float(distances[both].mean()) if both.any() else float("nan")
+
+
+def _arrays(pose):
+    return np.asarray(pose.body.data.filled(0)), np.asarray(pose.body.confidence)
+
+
+def estimate_profile(videos, out_dir: Path, profile):
+    """Estimate poses of the videos with a profile; seconds and frames per video."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rows = []
+    for video_path in videos:
+        start = time.perf_counter()
+        pose = estimate_pose(
+            video_path, out_dir / f"{video_path.stem}.pose", **POSE_PROFILES[profile]
+        )
+        rows.append(
+            {
+                "profile": profile,
+                "stem": video_path.stem,
+                "seconds": time.perf_counter() - start,
+                "frames": len(pose.body.data),
+            }
+        )
+    return rows
+
+
+def boundary_changes(pose_path: Path, reference_path: Path, tolerance_ms):
+    """compare_segments of the .eaf of pose_path against that of reference_path, per tier."""
+    reference = read_eaf_segments(reference_path.with_suffix(".eaf"))
+    segments = read_eaf_segments(pose_path.with_suffix(".eaf"))
+    return {
+        tier: compare_segments(reference[tier], segments.get(tier, []), tolerance_ms)
+        for tier in ("SIGN", "SENTENCE")
+        if tier in reference
+    }
+
+
+def signwriting_scores(predictions, profiles, references=None, metrics=None):
+    """
+    Mean evaluate.py metric scores of each profile's predictions, against the
+    references (Filename, Signwriting) or else the "full" profile's predictions.
+    """
+    from src.single_signs.evaluate import (
+        compare_signwriting,
+        summarize_lengths_and_means,
+    )
+
+    res_df = pd.DataFrame(
+        {
+            "stem": list(predictions["full"]),
+            **{
+                f"{profile}_value": [
+                    " ".join(predictions[profile].get(stem) or [])
+                    for stem in predictions["full"]
+                ]
+                for profile in profiles
+            },
+        }
+    )
+    if references is None:
+        references = pd.DataFrame(
+            {
+                "Filename": [f"{stem}.mp4" for stem in predictions["full"]],
+                "Signwriting": res_df["full_value"],
+            }
+        )
+    merged = compare_signwriting(res_df, references, metrics=metrics)
+    return summarize_lengths_and_means(merged, variants=profiles).mean()
+
+
+def no_clipscore_metrics():
+    """default_metrics without CLIPScore, which needs its CLIP model."""
+    from signwriting_evaluation.metrics.bleu import SignWritingBLEU
+    from signwriting_evaluation.metrics.chrf import SignWritingCHRF
+    from signwriting_evaluation.metrics.similarity import SignWritingSimilarityMetric
+
+    return [SignWritingBLEU(), SignWritingCHRF(), SignWritingSimilarityMetric()]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Pose estimation profiles: speedup against the change in segments and SignWriting."
+    )
+    parser.add_argument("video_dir", type=Path, help="Directory of .mp4 clips")
+    parser.add_argument(
+        "--profiles",
+        nargs="+",
+        choices=list(POSE_PROFILES),
+        default=list(POSE_PROFILES),
+    )
+    parser.add_argument("--limit", type=int, default=20, help="Number of clips")
+    parser.add_argument("--work_dir", type=Path, default=None)
+    parser.add_argument(
+        "--no_models",
+        action="store_true",
+        help="Only time estimation and keypoint error, no pose_to_segments/pose_to_signwriting",
+    )
+    parser.add_argument(
+        "--references",
+        type=Path,
+        default=None,
+        help="CSV with Filename and Signwriting columns (default: the full profile's predictions)",
+    )
+    parser.add_argument("--tolerance_ms", type=int, default=40)
+    parser.add_argument("--clipscore", action="store_true", help="Include CLIPScore")
+    parser.add_argument("--json", type=Path, default=None, help="Save the report")
+    args = parser.parse_args()
+
+    profiles = ["full"] + [p for p in args.profiles if p != "full"]
+    videos = sorted(args.video_dir.glob("*.mp4"))[: args.limit]
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix="pose_profiles_"))
+    supervisor = Supervisor(Tracer())
+
+    report = {}
+    predictions = {}
+    for profile in profiles:
+        out_dir = work_dir / profile
+        timings = pd.DataFrame(estimate_profile(videos, out_dir, profile))
+        entry = {
+            "seconds": timings["seconds"].sum(),
+            "frames_per_second": timings["frames"].sum() / timings["seconds"].sum(),
+        }
+        if profile != "full":
+            entry["keypoint_error_px"] = float(
+                np.nanmean(
+                    [
+                        keypoint_error(
+                            out_dir / f"{v.stem}.pose",
+                            work_dir / "full" / f"{v.stem}.pose",
+                        )
+                        for v in videos
+                    ]
+                )
+            )
+        if not args.no_models:
+            predictions[profile] = {}
+            for video_path in videos:
+                pose_path = out_dir / f"{video_path.stem}.pose"
+                if segment_clip(pose_path, supervisor):
+                    predictions[profile][video_path.stem] = transcribe_clip(
+                        pose_path, supervisor
+                    )
+            if profile != "full":
+                changes = [
+                    boundary_changes(
+                        out_dir / f"{stem}.pose",
+                        work_dir / "full" / f"{stem}.pose",
+                        args.tolerance_ms,
+                    )
+                    for stem in predictions[profile]
+                    if stem in predictions["full"]
+                ]
+                for tier in ("SIGN", "SENTENCE"):
+                    tier_changes = [c[tier] for c in changes if tier in c]
+                    entry[f"{tier.lower()}_segments_unchanged"] = float(
+                        np.mean([c["match"] for c in tier_changes])
+                    )
+                    entry[f"{tier.lower()}_max_boundary_ms"] = float(
+                        np.mean([c["max_boundary_ms"] for c in tier_changes])
+                    )
+        report[profile] = entry
+
+    for profile in profiles:
+        report[profile]["speedup"] = (
+            report["full"]["seconds"] / report[profile]["seconds"]
+        )
+    if not args.no_models:
+        references = pd.read_csv(args.references) if args.references else None
+        metrics = None if args.clipscore else no_clipscore_metrics()
+        scores = signwriting_scores(predictions, profiles, references, metrics)
+        for (profile, metric), value in scores.items():
+            report[profile][metric] = float(value)
+
+    print(pd.DataFrame(report).T.round(3).to_string())
+    print(f"Poses and segments in {work_dir}")
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
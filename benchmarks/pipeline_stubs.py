@@ -0,0 +1,118 @@
+"""
+Stand-ins for the pose_to_segments and pose_to_signwriting executables, so
+the transcription pipeline can be run without models or network. Behaviour is
+set through environment variables:
+
+  STUB_SEGMENTS_LATENCY / STUB_SIGNWRITING_LATENCY   seconds per call (default 0.05)
+  STUB_SIGN_LATENCY  extra seconds per transcribed sign (default 0)
+  STUB_JITTER      relative +- jitter on the latency (default 0.2)
+  STUB_MAX_SIGNS   max signs per clip (default 6)
+  STUB_FAIL_RATE   share of calls exiting with status 1 and no output (default 0)
+  STUB_HANG_RATE   share of calls sleeping STUB_HANG_SECONDS (default 0, 3600)
+  STUB_LOG         JSONL file to append one span per call to
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+# taken before the heavier imports, so spans include the tool's own start-up
+START = time.time()
+
+from synthetic_data import random_fsw, random_segments, write_eaf
+
+TOOLS = {"pose_to_segments": "segments", "pose_to_signwriting": "signwriting"}
+
+
+def _env(name, default):
+    return float(os.environ.get(f"STUB_{name}", default))
+
+
+def _simulate(tool, rng):
+    """Sleep like the tool would; returns the exit code to use."""
+    # hangs and failures are transient (not seeded by the clip), so retries can help
+    if random.random() < _env("HANG_RATE", 0):
+        time.sleep(_env("HANG_SECONDS", 3600))
+    latency = _env(f"{tool.upper()}_LATENCY", 0.05)
+    jitter = _env("JITTER", 0.2)
+    time.sleep(max(0.0, latency * (1 + rng.uniform(-jitter, jitter))))
+    return 1 if random.random() < _env("FAIL_RATE", 0) else 0
+
+
+def _log(tool, pose, exit_code):
+    log = os.environ.get("STUB_LOG")
+    if log:
+        span = {
+            "tool": tool,
+            "pose": pose,
+            "start": START,
+            "end": time.time(),
+            "exit_code": exit_code,
+        }
+        # one O_APPEND write per line, so concurrent stubs do not interleave
+        fd = os.open(log, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        os.write(fd, (json.dumps(span) + "\n").encode())
+        os.close(fd)
+
+
+def segments_main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pose", required=True)
+    parser.add_argument("--elan", required=True)
+    parser.add_argument("--video")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.pose)
+    exit_code = _simulate("segments", rng)
+    if exit_code == 0:
+        n_frames = rng.randint(50, 150)
+        max_signs = int(_env("MAX_SIGNS", 6))
+        write_eaf(
+            Path(args.elan),
+            random_segments(rng, n_frames, max_signs),
+            video_name=Path(args.video or args.pose).with_suffix(".mp4").name,
+        )
+    _log("pose_to_segments", args.pose, exit_code)
+    return exit_code
+
+
+def signwriting_main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pose", required=True)
+    parser.add_argument("--elan", required=True)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.pose)
+    exit_code = _simulate("signwriting", rng)
+    if exit_code == 0:
+        eaf = Path(args.elan).read_text(encoding="utf-8")
+        sign_tier = re.search(r'TIER_ID="SIGN">(.*?)</TIER>', eaf, re.S)
+        n_signs = sign_tier.group(1).count("<ANNOTATION>") if sign_tier else 0
+        time.sleep(n_signs * _env("SIGN_LATENCY", 0))
+        print("Loading model...")
+        for _ in range(n_signs):
+            print(random_fsw(rng))
+    _log("pose_to_signwriting", args.pose, exit_code)
+    return exit_code
+
+
+def install_stubs(bin_dir: Path):
+    """Write pose_to_segments/pose_to_signwriting executables into bin_dir."""
+    bin_dir = Path(bin_dir)
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    for tool, kind in TOOLS.items():
+        script = bin_dir / tool
+        script.write_text(
+            f"#!{sys.executable}\n"
+            "import sys\n"
+            f"sys.path.insert(0, {str(Path(__file__).resolve().parent)!r})\n"
+            "from pipeline_stubs import *\n"
+            f"sys.exit({kind}_main())\n"
+        )
+        script.chmod(0o755)
+    return bin_dir
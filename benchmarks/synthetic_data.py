@@ -0,0 +1,417 @@
+import argparse
+import random
+from datetime import date, timedelta
+import xml.etree.ElementTree as ET
+from pathlib import Path
+import numpy as np
+
+# ---- SignWriting (FSW) ----
+
+# Symbol bases per ISWA category, as hex ranges (hands, movement, dynamics, head, body)
+_SYMBOL_RANGES = [(0x100, 0x204), (0x205, 0x2F6), (0x2F7, 0x2FE), (0x2FF, 0x36C)]
+_SYMBOL_WEIGHTS = [5, 3, 1, 2]
+
+
+def random_symbol(rng: random.Random):
+    low, high = rng.choices(_SYMBOL_RANGES, weights=_SYMBOL_WEIGHTS)[0]
+    return f"S{rng.randint(low, high):03x}{rng.randint(0, 5)}{rng.randint(0, 15):x}"
+
+
+def random_fsw(rng: random.Random, min_symbols=1, max_symbols=6, prefix=False):
+    """
+    A random, well-formed FSW sign such as "M518x529S14c20481x471S27106503x489".
+    With prefix, the sign starts with an "A..." sorting sequence like Signpuddle entries.
+    """
+    symbols = [random_symbol(rng) for _ in range(rng.randint(min_symbols, max_symbols))]
+    placed = [(s, rng.randint(450, 520), rng.randint(450, 520)) for s in symbols]
+    box_x = min(max(x for _, x, _ in placed) + rng.randint(10, 30), 999)
+    box_y = min(max(y for _, _, y in placed) + rng.randint(10, 30), 999)
+    sign = f"M{box_x}x{box_y}" + "".join(f"{s}{x}x{y}" for s, x, y in placed)
+    if prefix:
+        sign = "A" + "".join(symbols) + sign
+    return sign
+
+
+# ---- ELAN (.eaf) ----
+
+
+def write_eaf(
+    path: Path,
+    sign_segments,
+    fps=25.0,
+    sentence_segments=None,
+    signwriting=None,
+    video_name=None,
+):
+    """
+    Write an .eaf the way pose_to_segments does: SIGN and SENTENCE tiers of
+    empty annotations at the given (start_frame, end_frame) segments. With
+    signwriting (one FSW string per sign segment), a SIGNWRITING tier is added
+    as after pose_to_signwriting.
+    """
+    path = Path(path)
+    video_name = video_name or f"{path.stem}.mp4"
+    if sentence_segments is None and sign_segments:
+        sentence_segments = [(sign_segments[0][0], sign_segments[-1][1])]
+
+    root = ET.Element(
+        "ANNOTATION_DOCUMENT",
+        {
+            "AUTHOR": "sign-language-processing/segmentation",
+            "DATE": "2024-01-01T00:00:00+00:00",
+            "FORMAT": "3.0",
+            "VERSION": "3.0",
+            "xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance",
+            "xsi:noNamespaceSchemaLocation": "http://www.mpi.nl/tools/elan/EAFv3.0.xsd",
+        },
+    )
+    header = ET.SubElement(
+        root, "HEADER", {"MEDIA_FILE": "", "TIME_UNITS": "milliseconds"}
+    )
+    ET.SubElement(
+        header,
+        "MEDIA_DESCRIPTOR",
+        {
+            "MEDIA_URL": f"file://{video_name}",
+            "MIME_TYPE": "video/mp4",
+            "RELATIVE_MEDIA_URL": f"./{video_name}",
+        },
+    )
+    time_order = ET.SubElement(root, "TIME_ORDER")
+
+    tiers = [("SIGN", sign_segments, None), ("SENTENCE", sentence_segments or [], None)]
+    if signwriting is not None:
+        tiers.append(("SIGNWRITING", sign_segments, signwriting))
+
+    n_slots = n_annotations = 0
+    for tier_id, segments, values in tiers:
+        tier = ET.SubElement(
+            root, "TIER", {"LINGUISTIC_TYPE_REF": "default-lt", "TIER_ID": tier_id}
+        )
+        for i, (start, end) in enumerate(segments):
+            slot_ids = []
+            for frame in (start, end):
+                n_slots += 1
+                slot_ids.append(f"ts{n_slots}")
+                ET.SubElement(
+                    time_order,
+                    "TIME_SLOT",
+                    {
+                        "TIME_SLOT_ID": slot_ids[-1],
+                        "TIME_VALUE": str(int(frame / fps * 1000)),
+                    },
+                )
+            n_annotations += 1
+            annotation = ET.SubElement(tier, "ANNOTATION")
+            alignable = ET.SubElement(
+                annotation,
+                "ALIGNABLE_ANNOTATION",
+                {
+                    "ANNOTATION_ID": f"a{n_annotations}",
+                    "TIME_SLOT_REF1": slot_ids[0],
+                    "TIME_SLOT_REF2": slot_ids[1],
+                },
+            )
+            ET.SubElement(alignable, "ANNOTATION_VALUE").text = (
+                values[i] if values is not None else ""
+            )
+
+    ET.SubElement(header, "PROPERTY", {"NAME": "lastUsedAnnotationId"}).text = str(
+        n_annotations
+    )
+    ET.SubElement(
+        root,
+        "LINGUISTIC_TYPE",
+        {
+            "GRAPHIC_REFERENCES": "false",
+            "LINGUISTIC_TYPE_ID": "default-lt",
+            "TIME_ALIGNABLE": "true",
+        },
+    )
+    ET.indent(root, space="    ")
+    ET.ElementTree(root).write(path, encoding="UTF-8", xml_declaration=True)
+
+
+def random_segments(rng: random.Random, n_frames, max_signs=6):
+    """Non-overlapping (start_frame, end_frame) sign segments inside n_frames."""
+    n_signs = rng.randint(1, max_signs)
+    bounds = sorted(
+        rng.sample(range(1, max(n_frames - 1, 2 * n_signs + 2)), 2 * n_signs)
+    )
+    return [(bounds[2 * i], bounds[2 * i + 1]) for i in range(n_signs)]
+
+
+# ---- poses (.pose) ----
+
+BODY_POINTS = [
+    "NOSE",
+    "LEFT_EYE_INNER",
+    "LEFT_EYE",
+    "LEFT_EYE_OUTER",
+    "RIGHT_EYE_INNER",
+    "RIGHT_EYE",
+    "RIGHT_EYE_OUTER",
+    "LEFT_EAR",
+    "RIGHT_EAR",
+    "MOUTH_LEFT",
+    "MOUTH_RIGHT",
+    "LEFT_SHOULDER",
+    "RIGHT_SHOULDER",
+    "LEFT_ELBOW",
+    "RIGHT_ELBOW",
+    "LEFT_WRIST",
+    "RIGHT_WRIST",
+    "LEFT_PINKY",
+    "RIGHT_PINKY",
+    "LEFT_INDEX",
+    "RIGHT_INDEX",
+    "LEFT_THUMB",
+    "RIGHT_THUMB",
+    "LEFT_HIP",
+    "RIGHT_HIP",
+    "LEFT_KNEE",
+    "RIGHT_KNEE",
+    "LEFT_ANKLE",
+    "RIGHT_ANKLE",
+    "LEFT_HEEL",
+    "RIGHT_HEEL",
+    "LEFT_FOOT_INDEX",
+    "RIGHT_FOOT_INDEX",
+]
+BODY_LIMBS = [
+    (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8), (9, 10),
+    (11, 12), (11, 13), (13, 15), (15, 17), (15, 19), (15, 21), (17, 19),
+    (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20), (11, 23),
+    (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28), (27, 29),
+    (28, 30), (29, 31), (30, 32), (27, 31), (28, 32),
+]  # fmt: skip
+HAND_POINTS = [
+    "WRIST",
+    "THUMB_CMC",
+    "THUMB_MCP",
+    "THUMB_IP",
+    "THUMB_TIP",
+    "INDEX_FINGER_MCP",
+    "INDEX_FINGER_PIP",
+    "INDEX_FINGER_DIP",
+    "INDEX_FINGER_TIP",
+    "MIDDLE_FINGER_MCP",
+    "MIDDLE_FINGER_PIP",
+    "MIDDLE_FINGER_DIP",
+    "MIDDLE_FINGER_TIP",
+    "RING_FINGER_MCP",
+    "RING_FINGER_PIP",
+    "RING_FINGER_DIP",
+    "RING_FINGER_TIP",
+    "PINKY_MCP",
+    "PINKY_PIP",
+    "PINKY_DIP",
+    "PINKY_TIP",
+]
+HAND_LIMBS = [
+    (0, 1), (1, 2), (2, 3), (3, 4), (0, 5), (5, 6), (6, 7), (7, 8), (5, 9),
+    (9, 10), (10, 11), (11, 12), (9, 13), (13, 14), (14, 15), (15, 16),
+    (13, 17), (0, 17), (17, 18), (18, 19), (19, 20),
+]  # fmt: skip
+FACE_POINTS = 468
+
+
+def holistic_components():
+    """
+    The MediaPipe holistic header components written by videos_to_poses.
+    Uses pose_format's own definition when mediapipe is installed; otherwise an
+    equivalent header with the same components and points (face mesh limbs left out).
+    """
+    try:
+        from pose_format.utils.holistic import holistic_components as components
+
+        return components()
+    except ImportError:
+        pass
+
+    from pose_format.pose_header import PoseHeaderComponent
+
+    hand_colors = [(192, 101, 21)]
+    return [
+        PoseHeaderComponent("POSE_LANDMARKS", BODY_POINTS, BODY_LIMBS, [(255, 0, 0)], "XYZC"),
+        PoseHeaderComponent("FACE_LANDMARKS", [str(i) for i in range(FACE_POINTS)], [], [(128, 0, 0)], "XYZC"),
+        PoseHeaderComponent("LEFT_HAND_LANDMARKS", HAND_POINTS, HAND_LIMBS, hand_colors, "XYZC"),
+        PoseHeaderComponent("RIGHT_HAND_LANDMARKS", HAND_POINTS, HAND_LIMBS, hand_colors, "XYZC"),
+        PoseHeaderComponent("POSE_WORLD_LANDMARKS", BODY_POINTS, BODY_LIMBS, [(255, 0, 0)], "XYZC"),
+    ]  # fmt: skip
+
+
+def random_pose(n_frames, fps=25.0, width=1280, height=720, seed=0):
+    """A pose_format Pose with a holistic header and smoothly drifting random keypoints."""
+    from pose_format.numpy.pose_body import NumPyPoseBody
+    from pose_format.pose import Pose
+    from pose_format.pose_header import PoseHeader, PoseHeaderDimensions
+
+    components = holistic_components()
+    n_points = sum(len(c.points) for c in components)
+    np_rng = np.random.default_rng(seed)
+
+    start = np_rng.uniform([0, 0, -0.5], [width, height, 0.5], size=(n_points, 3))
+    drift = np_rng.normal(0, [2.0, 2.0, 0.01], size=(n_frames, n_points, 3))
+    data = (start + np.cumsum(drift, axis=0))[:, np.newaxis].astype(np.float32)
+
+    confidence = np.ones((n_frames, 1, n_points), dtype=np.float32)
+    # hands drop out now and then, as with real MediaPipe output
+    offset = 0
+    for component in components:
+        if "HAND" in component.name:
+            missing = np_rng.random(n_frames) < 0.2
+            confidence[missing, :, offset : offset + len(component.points)] = 0
+        offset += len(component.points)
+
+    header = PoseHeader(
+        version=0.1,
+        dimensions=PoseHeaderDimensions(width=width, height=height, depth=0),
+        components=components,
+    )
+    return Pose(header, NumPyPoseBody(fps=fps, data=data, confidence=confidence))
+
+
+def write_pose(path: Path, n_frames, fps=25.0, width=1280, height=720, seed=0):
+    with open(path, "wb") as f:
+        random_pose(n_frames, fps, width, height, seed).write(f)
+
+
+# ---- subtitles (.vtt) ----
+
+WORDS = (
+    "regjeringen vil i dag legge fram nytt forslag om skole og helse i hele landet "
+    "det blir kaldt vær med snø i nord og regn på vestlandet i morgen "
+    "politiet melder om trafikkulykke ingen er alvorlig skadet"
+).split()
+
+
+def _timestamp(seconds):
+    ms = int(round(seconds * 1000))
+    h, ms = divmod(ms, 3_600_000)
+    m, ms = divmod(ms, 60_000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}.{ms:03d}"
+
+
+def random_cues(rng: random.Random, n_cues, min_duration=1.5, max_duration=6.0):
+    """[(start_sec, end_sec, text)] with small gaps, like broadcast subtitles."""
+    cues, t = [], rng.uniform(0.5, 3.0)
+    for _ in range(n_cues):
+        duration = rng.uniform(min_duration, max_duration)
+        text = " ".join(rng.choices(WORDS, k=rng.randint(3, 12)))
+        cues.append((t, t + duration, text.capitalize() + "."))
+        t += duration + rng.uniform(0.1, 1.0)
+    return cues
+
+
+def write_vtt(path: Path, cues):
+    lines = ["WEBVTT", ""]
+    for i, (start, end, text) in enumerate(cues, start=1):
+        lines += [str(i), f"{_timestamp(start)} --> {_timestamp(end)}", text, ""]
+    Path(path).write_text("\n".join(lines), encoding="utf-8")
+
+
+# ---- corpora ----
+
+
+def generate_corpus(
+    out_dir: Path,
+    n_broadcasts=3,
+    clips_per_broadcast=20,
+    n_single_signs=100,
+    fps=25.0,
+    with_poses=True,
+    with_eafs=True,
+    seed=0,
+):
+    """
+    Write a synthetic corpus shaped like the real data:
+      nrk_tegnspraaknytt/<broadcast>.nb-ttv.vtt      subtitles per broadcast
+      processed_NRK/<broadcast>/clip_NNN.pose/.eaf   one clip per subtitle cue
+      single_signs/<sign>.pose/.eaf                  dictionary signs with SIGNWRITING tier
+      matched_single_signs.csv                       references for the single signs
+    Without with_eafs, processed_NRK holds only .pose files, as before segmentation.
+    """
+    rng = random.Random(seed)
+    out_dir = Path(out_dir)
+    subtitles_dir = out_dir / "nrk_tegnspraaknytt"
+    processed_dir = out_dir / "processed_NRK"
+    signs_dir = out_dir / "single_signs"
+    for d in (subtitles_dir, processed_dir, signs_dir):
+        d.mkdir(parents=True, exist_ok=True)
+
+    for b in range(n_broadcasts):
+        # one broadcast a day, valid dates however many there are
+        broadcast = f"tegnspraaknytt-{date(2024, 1, 1) + timedelta(days=b)}"
+        cues = random_cues(rng, clips_per_broadcast)
+        write_vtt(subtitles_dir / f"{broadcast}.nb-ttv.vtt", cues)
+        clip_dir = processed_dir / broadcast
+        clip_dir.mkdir(exist_ok=True)
+        for i, (start, end, _) in enumerate(cues, start=1):
+            n_frames = max(int((end - start) * fps), 4)
+            stem = f"clip_{i:03d}"
+            if with_poses:
+                write_pose(
+                    clip_dir / f"{stem}.pose", n_frames, fps, seed=rng.getrandbits(32)
+                )
+            if with_eafs:
+                write_eaf(
+                    clip_dir / f"{stem}.eaf",
+                    random_segments(rng, n_frames, max_signs=12),
+                    fps,
+                )
+
+    references = ["Filename,Gloss_x,Description,Comment,modified,Gloss_y,Signwriting"]
+    for s in range(n_single_signs):
+        stem = f"sign-{s:05d}"
+        n_frames = rng.randint(30, 90)
+        segments = random_segments(rng, n_frames, max_signs=3)
+        if with_poses:
+            write_pose(
+                signs_dir / f"{stem}.pose", n_frames, fps, seed=rng.getrandbits(32)
+            )
+        write_eaf(
+            signs_dir / f"{stem}.eaf",
+            segments,
+            fps,
+            signwriting=[random_fsw(rng) for _ in segments],
+        )
+        gloss = " ".join(rng.choices(WORDS, k=rng.choice([1, 1, 1, 2])))
+        references.append(f"{stem}.mp4,{gloss},,,{gloss},{gloss},{random_fsw(rng)}")
+    (out_dir / "matched_single_signs.csv").write_text(
+        "\n".join(references) + "\n", encoding="utf-8"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic FSW/EAF/pose/VTT corpora for load tests."
+    )
+    parser.add_argument("--out_dir", type=Path, required=True)
+    parser.add_argument("--broadcasts", type=int, default=3)
+    parser.add_argument("--clips", type=int, default=20, help="Clips per broadcast")
+    parser.add_argument("--single_signs", type=int, default=100)
+    parser.add_argument("--fps", type=float, default=25.0)
+    parser.add_argument(
+        "--no_poses",
+        action="store_true",
+        help="Skip .pose files (no pose-format needed)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate_corpus(
+        args.out_dir,
+        n_broadcasts=args.broadcasts,
+        clips_per_broadcast=args.clips,
+        n_single_signs=args.single_signs,
+        fps=args.fps,
+        with_poses=not args.no_poses,
+        seed=args.seed,
+    )
+    print(f"Synthetic corpus written to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,13 @@
-import pandas as pd
 import matplotlib.pyplot as plt
-from get_tables import clean_modified
+from gloss import normalize_glosses
+from table_store import read_table
 from pathlib import Path
 
 
 def plot_hist(df, save_name):
     if "modified" not in df.columns:
-        df["modified"] = df["Gloss"].str.replace("-", " ", regex=False)
-        # Step 2: Remove everything from first occurrence of '(', ')', ':', digit, or '/'
-        df["modified"] = df["modified"].apply(clean_modified)
-        df["modified"] = df["modified"].str.strip()
-        df["modified"] = df["modified"].str.lower()
+        # Remove everything from first occurrence of '(', ')', ':', digit, or '/'
+        df["modified"] = normalize_glosses(df["Gloss"])
 
     duplicates = df[df.duplicated(subset=["modified"])]
     print(duplicates)
@@ -45,7 +42,7 @@ if __name__ == "__main__":
         "tables/statped_dict.csv",
     )
     for path in paths:
-        df = pd.read_csv(path)
+        df = read_table(path)
         path = Path(path)
         stem = path.stem
         plot_hist(df, stem)
@@ -1,26 +1,88 @@
 import argparse
 import csv
+import sqlite3
 from pathlib import Path
-from concurrent.futures import ProcessPoolExecutor, as_completed
-import cv2
+from itertools import islice
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    as_completed,
+    wait,
+)
 from tqdm import tqdm
+from mp4_info import read_mp4_info, read_cv2_info
+from sketches import QuantileSketch, Histogram
+from scheduling import ScheduledPool, expected_costs, longest_first, read_durations
+
+INFO_COLUMNS = ["duration", "frame_count", "fps", "width", "height", "bitrate_kbps"]
+INFO_TYPES = ["REAL", "INTEGER", "REAL", "INTEGER", "INTEGER", "REAL"]
+CSV_HEADER = [
+    "Filename",
+    "Duration_sec",
+    "Frame_Count",
+    "FPS",
+    "Width",
+    "Height",
+    "Bitrate_kbps",
+]
+
+# Histogram bin edges for the streaming report
+STAT_EDGES = {
+    "duration": [0, 1, 2, 5, 10, 30, 60, 300, 600, 1800],
+    "frame_count": [0, 25, 50, 125, 250, 750, 1500, 7500, 15000, 45000],
+    "fps": [0, 15, 24, 25, 30, 50, 60],
+}
+QUANTILES = (0.5, 0.9, 0.99)
 
 
 def get_video_info(video_path: Path):
-    """Return (filename, duration_sec, frame_count) for a given video."""
-    video = cv2.VideoCapture(str(video_path))
-    if not video.isOpened():
-        return (str(video_path.name), None, None)
+    """
+    Return (filename, duration_sec, frame_count, fps, width, height, bitrate_kbps)
+    for a given video. Reads the MP4 headers and only decodes via OpenCV if that fails.
+    """
+    info = read_mp4_info(video_path) or read_cv2_info(video_path)
+    if info is None:
+        return (str(video_path.name),) + (None,) * len(INFO_COLUMNS)
+    return (str(video_path.name),) + tuple(info[c] for c in INFO_COLUMNS)
+
+
+def open_cache(cache_path: Path):
+    """Open (or create) the video info cache, keyed by path, size and mtime."""
+    conn = sqlite3.connect(cache_path, timeout=30)
+    # WAL lets worker processes read the cache while the main process writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS video_info (
+            path TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime_ns INTEGER,
+            filename TEXT,
+            {", ".join(f"{c} {t}" for c, t in zip(INFO_COLUMNS, INFO_TYPES))}
+        )
+        """)
+    return conn
+
+
+def cache_lookup(conn, video_path: Path, size, mtime_ns):
+    return conn.execute(
+        f"SELECT filename, {', '.join(INFO_COLUMNS)} FROM video_info "
+        "WHERE path = ? AND size = ? AND mtime_ns = ?",
+        (str(video_path.resolve()), size, mtime_ns),
+    ).fetchone()
 
-    frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
-    fps = video.get(cv2.CAP_PROP_FPS)
-    duration = frame_count / fps if fps and fps > 0 else 0
 
-    video.release()
-    return (str(video_path.name), duration, frame_count)
+def cache_store(conn, entries):
+    """entries: iterable of (video_path, size, mtime_ns, info_tuple)."""
+    conn.executemany(
+        f"INSERT OR REPLACE INTO video_info VALUES (?, ?, ?, ?, {', '.join('?' * len(INFO_COLUMNS))})",
+        [(str(p.resolve()), size, mtime, *info) for p, size, mtime, info in entries],
+    )
+    conn.commit()
 
 
-def process_videos_fast(videos_dir: Path, output_csv: Path, stats_txt: Path, workers=8):
+def process_videos_fast(
+    videos_dir: Path, output_csv: Path, stats_txt: Path, workers=8, cache_path=None
+):
     mp4_files = list(videos_dir.rglob("*.mp4"))
     if not mp4_files:
         print(f"No .mp4 files found in {videos_dir}")
@@ -30,26 +92,59 @@ def process_videos_fast(videos_dir: Path, output_csv: Path, stats_txt: Path, wor
     results = []
     failed = []
 
+    # Reuse cached stats for files whose size and mtime are unchanged
+    cache = open_cache(cache_path) if cache_path else None
+    to_probe = []
+    for file_path in mp4_files:
+        st = file_path.stat()
+        cached = None
+        if cache is not None:
+            cached = cache_lookup(cache, file_path, st.st_size, st.st_mtime_ns)
+        if cached:
+            results.append(cached)
+        else:
+            to_probe.append((file_path, st.st_size, st.st_mtime_ns))
+    if cache is not None:
+        print(f"{len(results)} cached, {len(to_probe)} new or changed")
+
+    new_entries = []
     with ProcessPoolExecutor(max_workers=workers) as executor:
-        futures = {executor.submit(get_video_info, f): f for f in mp4_files}
+        # files that fall back to OpenCV take time with their length: probe the
+        # longest (known from earlier stats, else by size) first
+        pool = ScheduledPool(executor, workers)
+        costs = expected_costs(
+            [p for p, _, _ in to_probe], read_durations(output_csv.parent), probe=False
+        )
+        to_probe, _ = longest_first(to_probe, costs)
+        futures = {
+            pool.submit(get_video_info, p): (p, size, mtime)
+            for p, size, mtime in to_probe
+        }
         for future in tqdm(
             as_completed(futures), total=len(futures), desc="Processing", unit="video"
         ):
-            file_path = futures[future]
+            file_path, size, mtime = futures[future]
             try:
-                filename, duration, frames = future.result()
-                if duration is None:
+                info = future.result()
+                if info[1] is None:
                     failed.append(file_path)
                 else:
-                    results.append((filename, duration, frames))
+                    results.append(info)
+                    new_entries.append((file_path, size, mtime, info))
             except Exception as e:
                 failed.append(file_path)
                 print(f"Error processing {file_path}: {e}")
 
+    print(pool.summary())
+
+    if cache is not None:
+        cache_store(cache, new_entries)
+        cache.close()
+
     # Write CSV
     with open(output_csv, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
-        writer.writerow(["Filename", "Duration_sec", "Frame_Count"])
+        writer.writerow(CSV_HEADER)
         writer.writerows(results)
 
     print(f"Wrote {len(results)} video stats to {output_csv}")
@@ -76,9 +171,178 @@ def process_videos_fast(videos_dir: Path, output_csv: Path, stats_txt: Path, wor
         print(f"{len(failed)} video(s) failed. See {failed_log}")
 
 
+class CorpusStats:
+    """Quantile sketches and histograms over duration, frame count and fps."""
+
+    def __init__(self):
+        self.sketches = {m: QuantileSketch() for m in STAT_EDGES}
+        self.histograms = {m: Histogram(edges) for m, edges in STAT_EDGES.items()}
+
+    @property
+    def count(self):
+        return self.sketches["duration"].count
+
+    def add(self, duration, frame_count, fps):
+        for metric, value in (
+            ("duration", duration),
+            ("frame_count", frame_count),
+            ("fps", fps),
+        ):
+            self.sketches[metric].add(value)
+            self.histograms[metric].add(value)
+
+    def merge(self, other):
+        for metric in STAT_EDGES:
+            self.sketches[metric].merge(other.sketches[metric])
+            self.histograms[metric].merge(other.histograms[metric])
+        return self
+
+
+def video_group(video_path: Path, videos_dir: Path):
+    """Top-level subdirectory of a video below videos_dir ("." for files directly in it)."""
+    parts = video_path.relative_to(videos_dir).parts
+    return parts[0] if len(parts) > 1 else "."
+
+
+def probe_chunk(video_paths, videos_dir: Path, cache_path=None):
+    """
+    Worker task: stat, cache-check and probe a chunk of videos.
+    Returns (rows, new_cache_entries, failed_paths, partial_stats_per_group).
+    """
+    cache = sqlite3.connect(cache_path, timeout=30) if cache_path else None
+    rows, new_entries, failed = [], [], []
+    partial = {}
+    for file_path in video_paths:
+        try:
+            st = file_path.stat()
+            info = None
+            if cache is not None:
+                info = cache_lookup(cache, file_path, st.st_size, st.st_mtime_ns)
+            if info is None:
+                info = get_video_info(file_path)
+                if info[1] is None:
+                    failed.append(file_path)
+                    continue
+                new_entries.append((file_path, st.st_size, st.st_mtime_ns, info))
+        except Exception as e:
+            print(f"Error processing {file_path}: {e}")
+            failed.append(file_path)
+            continue
+
+        rows.append(info)
+        group = video_group(file_path, videos_dir)
+        partial.setdefault(group, CorpusStats()).add(info[1], info[2], info[3])
+
+    if cache is not None:
+        cache.close()
+    return rows, new_entries, failed, partial
+
+
+def write_stats_report(stats_txt: Path, total: CorpusStats, groups):
+    """Write min/max/mean, p50/p90/p99, histograms and a per-directory breakdown."""
+    duration = total.sketches["duration"]
+    q_header = "/".join(f"p{round(q * 100)}" for q in QUANTILES)
+    with open(stats_txt, "w", encoding="utf-8") as f:
+        f.write("Video Duration Statistics (seconds):\n")
+        f.write(f"Number of videos: {duration.count}\n")
+        f.write(f"Minimum duration: {duration.min:.2f}\n")
+        f.write(f"Maximum duration: {duration.max:.2f}\n")
+        f.write(f"Average duration: {duration.mean:.2f}\n")
+
+        for metric, sketch in total.sketches.items():
+            quantiles = " / ".join(f"{sketch.quantile(q):.2f}" for q in QUANTILES)
+            f.write(f"\n{metric} {q_header}: {quantiles}\n")
+            f.write(
+                f"{metric} mean: {sketch.mean:.2f} (min {sketch.min:.2f}, max {sketch.max:.2f})\n"
+            )
+            for label, n in total.histograms[metric].bins():
+                f.write(f"  {label:>12}: {n}\n")
+
+        if len(groups) > 1:
+            f.write(f"\nPer directory (duration {q_header}, seconds):\n")
+            for group in sorted(groups):
+                sketch = groups[group].sketches["duration"]
+                quantiles = " / ".join(f"{sketch.quantile(q):.2f}" for q in QUANTILES)
+                f.write(
+                    f"{group}: n={sketch.count}, mean={sketch.mean:.2f}, {quantiles}\n"
+                )
+
+
+def process_videos_streaming(
+    videos_dir: Path,
+    output_csv: Path,
+    stats_txt: Path,
+    workers=8,
+    cache_path=None,
+    chunk_size=256,
+):
+    """
+    Same outputs as process_videos_fast, but in constant memory: files are
+    streamed to workers in chunks, each chunk comes back with partial sketches
+    per directory that are merged here, and CSV rows are written as they arrive.
+    """
+    if cache_path:
+        open_cache(cache_path).close()  # make sure the table exists for the workers
+
+    total = CorpusStats()
+    groups = {}
+    n_failed = 0
+    failed_log = output_csv.with_name("failed_videos.txt")
+    failed_file = None
+    cache = open_cache(cache_path) if cache_path else None
+
+    with open(output_csv, "w", newline="", encoding="utf-8") as f, ProcessPoolExecutor(
+        max_workers=workers
+    ) as executor, tqdm(desc="Processing", unit="video") as progress:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+
+        def collect(future):
+            nonlocal n_failed, failed_file
+            rows, new_entries, failed, partial = future.result()
+            writer.writerows(rows)
+            if cache is not None and new_entries:
+                cache_store(cache, new_entries)
+            for group, stats in partial.items():
+                groups.setdefault(group, CorpusStats()).merge(stats)
+                total.merge(stats)
+            if failed:
+                if failed_file is None:
+                    failed_file = open(failed_log, "w", encoding="utf-8")
+                failed_file.writelines(f"{p}\n" for p in failed)
+                n_failed += len(failed)
+            progress.update(len(rows) + len(failed))
+
+        # keep a bounded number of chunks in flight so the file walk stays lazy
+        files = videos_dir.rglob("*.mp4")
+        pending = set()
+        while chunk := list(islice(files, chunk_size)):
+            pending.add(executor.submit(probe_chunk, chunk, videos_dir, cache_path))
+            if len(pending) >= 2 * (workers or 1):
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future)
+        for future in as_completed(pending):
+            collect(future)
+
+    if cache is not None:
+        cache.close()
+    if failed_file is not None:
+        failed_file.close()
+        print(f"{n_failed} video(s) failed. See {failed_log}")
+
+    if total.count == 0:
+        print(f"No readable .mp4 files found in {videos_dir}")
+        return
+
+    print(f"Wrote {total.count} video stats to {output_csv}")
+    write_stats_report(stats_txt, total, groups)
+    print(f"Stats saved to {stats_txt}")
+
+
 def main():
     parser = argparse.ArgumentParser(
-        description="Fast local video stats extractor using OpenCV."
+        description="Fast local video stats extractor reading MP4 headers."
     )
     parser.add_argument(
         "--videos_dir", type=Path, required=True, help="Directory with .mp4 files"
@@ -92,14 +356,38 @@ def main():
     parser.add_argument(
         "--workers", type=int, default=8, help="Number of parallel workers"
     )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=None,
+        help="Stats cache file (default: <output_dir>/video_info_cache.sqlite)",
+    )
+    parser.add_argument(
+        "--no_cache", action="store_true", help="Probe every file, ignore the cache"
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Constant-memory mode with p50/p90/p99 and per-directory stats",
+    )
     args = parser.parse_args()
 
     args.output_dir.mkdir(parents=True, exist_ok=True)
+    cache_path = None
+    if not args.no_cache:
+        cache_path = args.cache or args.output_dir / "video_info_cache.sqlite"
 
     output_csv = args.output_dir / f"{args.filename}.csv"
     stats_txt = args.output_dir / f"{args.filename}_stats.txt"
 
-    process_videos_fast(args.videos_dir, output_csv, stats_txt, workers=args.workers)
+    process = process_videos_streaming if args.streaming else process_videos_fast
+    process(
+        args.videos_dir,
+        output_csv,
+        stats_txt,
+        workers=args.workers,
+        cache_path=cache_path,
+    )
 
 
 if __name__ == "__main__":
@@ -1,55 +1,82 @@
+import io
+import os
 import pandas as pd
 from pathlib import Path
 import sqlite3
 import requests
 import xml.etree.ElementTree as ET
 import csv
-import re
-
+from gloss import normalize_glosses, glosses_to_norwegian
+from gloss_matching import fuzzy_match
+from signpuddle_lookup import SignLookup, build_lookup_db
+from table_store import csv_to_parquet, query, read_table, write_table
+
+# Joins run in DuckDB over the two tables registered as statped and signpuddle.
+# The ORDER BY clauses reproduce pandas.merge row order (outer joins sort by key).
+MATCHED_SQL = """
+SELECT l.Filename, l.Gloss AS Gloss_x, l.Description, l.Comment, l.modified,
+       r.Gloss AS Gloss_y, r.Signwriting
+FROM statped l
+JOIN signpuddle r ON l.modified::VARCHAR = r.modified::VARCHAR
+ORDER BY l._row, r._row
+"""
+MERGED_SQL = """
+SELECT l.Filename, l.Gloss AS Gloss_x, l.Description, l.Comment,
+       coalesce(l.modified::VARCHAR, r.modified::VARCHAR) AS modified,
+       r.Gloss AS Gloss_y, r.Signwriting
+FROM statped l
+FULL OUTER JOIN signpuddle r ON l.modified::VARCHAR = r.modified::VARCHAR
+ORDER BY coalesce(l.modified::VARCHAR, r.modified::VARCHAR) NULLS LAST,
+         l._row NULLS LAST, r._row NULLS LAST
+"""
 
-def clean_modified(value):
-    s = str(value).strip()
 
-    # 1. If the string is a numeric ratio like "2:3"
-    if re.fullmatch(r"\d+:\d+.*", s):
-        cleaned = s
-    else:
-        # 2. Colon-separated string
-        m = re.match(r"([^:]+):\s*(.+)", s)
-        if m:
-            if m.group(2).strip() == "stor":
-                cleaned = m.group(1).strip()  # keep only before colon
-            else:
-                cleaned = m.group(2).strip()  # keep after colon
+def iter_statped_entries(xml_source):
+    """
+    Stream (filnavn, visningsord, beskrivelse, kommentar) for every element with
+    a filnavn attribute, in document order. xml_source is a path or file object.
+    """
+    depth = 0
+    root = None
+    for event, elem in ET.iterparse(xml_source, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            depth += 1
+            filnavn = elem.get("filnavn")
+            if filnavn:
+                visningsord = elem.get("visningsord", "")
+                beskrivelse = elem.get("kommetarviss", "")
+                kommentar = elem.get("kommentar", "")
+                yield (filnavn, visningsord, beskrivelse, kommentar)
         else:
-            cleaned = s
+            depth -= 1
+            elem.clear()
+            if depth == 1:
+                root.clear()  # drop finished top-level entries
 
-    # 3. Remove parentheses and everything after
-    cleaned = re.sub(r"\(.*", "", cleaned)
 
-    # 4. Remove digits only if **after letters**
-    cleaned = re.sub(r"(?<=[A-Za-z] )\d+", "", cleaned)
-
-    # 5. Optionally remove /, ? characters
-    cleaned = re.sub(r"[/\?].*", "", cleaned)
-
-    return cleaned.strip()
+def fetch_statped_xml(xml_url: str, xml_cache: Path = None, refresh=False):
+    """
+    Return a path or file object with the Statped dictionary XML. A local copy
+    at xml_cache is used when it exists (unless refresh), otherwise the XML is
+    downloaded and saved there. Returns None if the download fails.
+    """
+    if xml_cache is not None and xml_cache.exists() and not refresh:
+        print(f"Using cached XML {xml_cache}")
+        return xml_cache
 
+    try:
+        response = requests.get(xml_url, timeout=30)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"Failed to fetch XML: {e}")
+        return None
 
-def ascii_to_norwegian(s):
-    if not isinstance(s, str):
-        return s
-    mapping = {
-        "aa": "å",
-        "ae": "æ",
-        "oe": "ø",
-        "AA": "Å",
-        "AE": "Æ",
-        "OE": "Ø",
-    }
-    for ascii_seq, norwegian_char in mapping.items():
-        s = s.replace(ascii_seq, norwegian_char)
-    return s
+    if xml_cache is None:
+        return io.BytesIO(response.content)
+    xml_cache.write_bytes(response.content)
+    return xml_cache
 
 
 def statped_dict_tabs(
@@ -58,42 +85,36 @@ def statped_dict_tabs(
     video_folder_2: Path,
     output_csv_1: Path,
     output_csv_2: Path,
+    xml_cache: Path = None,
+    refresh=False,
 ):
     """Fetch XML, match filenames with videos in two folders, and save separate tables"""
 
-    # Fetch XML
-    try:
-        response = requests.get(xml_url, timeout=30)
-        response.raise_for_status()
-        xml_data = response.content
-    except requests.RequestException as e:
-        print(f"Failed to fetch XML: {e}")
+    xml_source = fetch_statped_xml(xml_url, xml_cache, refresh)
+    if xml_source is None:
         return
 
-    # Parse XML
+    # List each folder once instead of checking every entry with a stat call
+    def list_videos(video_folder: Path):
+        if not video_folder.is_dir():
+            return set()
+        return {entry.name for entry in os.scandir(video_folder)}
+
+    videos_1 = list_videos(video_folder_1)
+    videos_2 = list_videos(video_folder_2)
+
+    # Match entries to videos in each folder while streaming the XML
+    table1, table2 = [], []
     try:
-        root = ET.fromstring(xml_data)
+        for row in iter_statped_entries(xml_source):
+            if f"{row[0]}.mp4" in videos_1:
+                table1.append(row)
+            if f"{row[0]}.mp4" in videos_2:
+                table2.append(row)
     except ET.ParseError as e:
         print(f"Failed to parse XML: {e}")
         return
 
-    # Extract all entries from XML
-    entries = []
-    for elem in root.iter():
-        filnavn = elem.get("filnavn")
-        if filnavn:
-            visningsord = elem.get("visningsord", "")
-            beskrivelse = elem.get("kommetarviss", "")
-            kommentar = elem.get("kommentar", "")
-            entries.append((filnavn, visningsord, beskrivelse, kommentar))
-
-    # Match entries to videos in each folder
-    def match_videos(video_folder: Path):
-        return [row for row in entries if (video_folder / f"{row[0]}.mp4").exists()]
-
-    table1 = match_videos(video_folder_1)
-    table2 = match_videos(video_folder_2)
-
     # Helper function to write a CSV
     def write_csv(rows, output_csv):
         with open(output_csv, "w", newline="", encoding="utf-8") as f:
@@ -106,6 +127,7 @@ def statped_dict_tabs(
                     writer.writerow(
                         [f"{filnavn}.mp4", visningsord, beskrivelse, kommentar]
                     )
+        csv_to_parquet(output_csv)
 
     # Write both CSVs
     write_csv(table1, output_csv_1)
@@ -147,16 +169,13 @@ def signpuddle_tab(output: Path):
         cleaned_rows.append([term, sign])
 
     df = pd.DataFrame(cleaned_rows, columns=["Gloss", "Signwriting"])
-    df["Gloss"] = df["Gloss"].apply(ascii_to_norwegian)
-    df["Gloss"] = df["Gloss"].str.replace("-", " ", regex=False)
+    df["Gloss"] = glosses_to_norwegian(df["Gloss"])
     df.drop_duplicates(inplace=True)
 
-    df["modified"] = df["Gloss"]
-    df["modified"] = df["modified"].apply(clean_modified)
-    df["modified"] = df["modified"].str.strip()
+    df["modified"] = normalize_glosses(df["Gloss"], lower=False)
     df.drop_duplicates(subset=["modified", "Signwriting"], inplace=True)
-    # Save to CSV
-    df.to_csv(output_file, index=False)
+    # Save to CSV and Parquet
+    write_table(df, output_file)
 
     print(f"Saved {len(df)} rows of Signpuddle entries to {output_file}")
 
@@ -165,27 +184,35 @@ def signpuddle_tab(output: Path):
     conn.close()
 
 
-def merged_tabs(output_path, table1, table2):
+def merged_tabs(output_path, table1, table2, fuzzy_min_score=None, lookup_db=None):
+    """
+    Join Statped and Signpuddle entries on the normalized gloss. With
+    fuzzy_min_score set, Statped glosses without an exact match are also
+    fuzzy-matched (against the gloss keys of lookup_db, see
+    signpuddle_lookup.py, when given), and exact plus ranked fuzzy matches
+    are saved together.
+    """
     output_file1 = output_path / "merged_single_signs.csv"
     output_file2 = output_path / "matched_single_signs.csv"
+    output_file3 = output_path / "fuzzy_matched_single_signs.csv"
+
+    # Load the tables (Parquet copies when available)
+    df1 = read_table(table1)
+    df2 = read_table(table2)
 
-    # Load the CSVs
-    df1 = pd.read_csv(table1)
-    df2 = pd.read_csv(table2)
+    # Replace '-' with ' ', clean and lowercase each unique gloss once
+    df1["modified"] = normalize_glosses(df1["Gloss"])
 
-    # Step 1: Replace '-' with ' '
-    df1["modified"] = df1["Gloss"].str.replace("-", " ", regex=False)
-    df1["modified"] = df1["modified"].apply(clean_modified)
-    df1["modified"] = df1["modified"].str.strip()
-    df1["modified"] = df1["modified"].str.lower()
+    statped = df1.assign(_row=range(len(df1)))
+    signpuddle = df2.assign(_row=range(len(df2)))
 
-    merged_df = pd.merge(df1, df2, on="modified", how="outer")
-    # Save to a new CSV if needed
-    merged_df.to_csv(output_file1, index=False)
+    # Outer join
+    merged_df = query(MERGED_SQL, statped=statped, signpuddle=signpuddle)
+    write_table(merged_df, output_file1)
 
     # Inner join
-    match_df = pd.merge(df1, df2, on="modified", how="inner")
-    match_df.to_csv(output_file2, index=False)
+    match_df = query(MATCHED_SQL, statped=statped, signpuddle=signpuddle)
+    write_table(match_df, output_file2)
 
     print(
         f"Saved {len(merged_df)} rows of Signpuddle and single signs to {output_file1}"
@@ -194,6 +221,35 @@ def merged_tabs(output_path, table1, table2):
         f"Saved {len(match_df)} rows of matches of Signpuddle and single signs to {output_file2}"
     )
 
+    if fuzzy_min_score is None:
+        return
+
+    # Fuzzy matches for the glosses the exact join missed
+    unmatched = df1.loc[~df1["modified"].isin(df2["modified"]), "modified"]
+    if lookup_db is not None:
+        with SignLookup(lookup_db) as lookup:
+            pairs = lookup.fuzzy_matches(unmatched, min_score=fuzzy_min_score)
+    else:
+        pairs = fuzzy_match(unmatched, df2["modified"], min_score=fuzzy_min_score)
+    pairs = pairs.rename(columns={"query": "modified", "candidate": "matched_modified"})
+    fuzzy_df = df1.merge(pairs, on="modified").merge(
+        df2.rename(columns={"modified": "matched_modified"}), on="matched_modified"
+    )
+
+    exact_df = match_df.assign(
+        matched_modified=match_df["modified"], match_score=1.0, match_rank=1
+    )
+    combined_df = pd.concat(
+        [exact_df.assign(match_type="exact"), fuzzy_df.assign(match_type="fuzzy")],
+        ignore_index=True,
+    )
+    write_table(combined_df, output_file3)
+
+    print(
+        f"Saved {len(combined_df)} rows of exact and fuzzy matches "
+        f"({pairs['modified'].nunique()} extra glosses matched) to {output_file3}"
+    )
+
 
 if __name__ == "__main__":
     output_path = Path("tables")
@@ -211,10 +267,19 @@ if __name__ == "__main__":
         video_folder_2,
         output_csv_1,
         output_csv_2,
+        xml_cache=output_path / "tegnordbok.xml",
     )
     signpuddle_tab(output_path)
+    # Indexed gloss -> sign lookup (see signpuddle_lookup.SignLookup)
+    lookup_db = build_lookup_db(lookup_db=output_path / "signpuddle_lookup.db")
 
-    merged_tabs(output_path, output_csv_1, output_path / "signpuddle_dict.csv")
+    merged_tabs(
+        output_path,
+        output_csv_1,
+        output_path / "signpuddle_dict.csv",
+        fuzzy_min_score=0.85,
+        lookup_db=lookup_db,
+    )
 
 """
 Saved 9119 rows of single signs from Statped to tables/statped_dict.csv
@@ -0,0 +1,83 @@
+import re
+import numpy as np
+import pandas as pd
+
+_RATIO = re.compile(r"\d+:\d+.*")
+_COLON = re.compile(r"([^:]+):\s*(.+)")
+_PARENTHESES = re.compile(r"\(.*")
+_DIGITS_AFTER_LETTERS = re.compile(r"(?<=[A-Za-z] )\d+")
+_SLASH_QUESTION = re.compile(r"[/\?].*")
+
+_NORWEGIAN = {
+    "aa": "å",
+    "ae": "æ",
+    "oe": "ø",
+    "AA": "Å",
+    "AE": "Æ",
+    "OE": "Ø",
+}
+_ASCII_SEQUENCES = re.compile("|".join(_NORWEGIAN))
+
+
+def clean_modified(value):
+    s = str(value).strip()
+
+    # 1. If the string is a numeric ratio like "2:3"
+    if _RATIO.fullmatch(s):
+        cleaned = s
+    else:
+        # 2. Colon-separated string
+        m = _COLON.match(s)
+        if m:
+            if m.group(2).strip() == "stor":
+                cleaned = m.group(1).strip()  # keep only before colon
+            else:
+                cleaned = m.group(2).strip()  # keep after colon
+        else:
+            cleaned = s
+
+    # 3. Remove parentheses and everything after
+    cleaned = _PARENTHESES.sub("", cleaned)
+
+    # 4. Remove digits only if **after letters**
+    cleaned = _DIGITS_AFTER_LETTERS.sub("", cleaned)
+
+    # 5. Optionally remove /, ? characters
+    cleaned = _SLASH_QUESTION.sub("", cleaned)
+
+    return cleaned.strip()
+
+
+def ascii_to_norwegian(s):
+    if not isinstance(s, str):
+        return s
+    # one left-to-right pass, same result as replacing aa, ae, oe in turn
+    return _ASCII_SEQUENCES.sub(lambda m: _NORWEGIAN[m.group(0)], s)
+
+
+def normalize_gloss(value, lower=True):
+    """Gloss -> matching key: hyphens to spaces, clean_modified, optionally lowercase."""
+    if isinstance(value, str):
+        value = value.replace("-", " ")
+    cleaned = clean_modified(value)
+    return cleaned.lower() if lower else cleaned
+
+
+def map_unique(values: pd.Series, func):
+    """Apply func once per unique value of a Series and map the results back."""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    mapped = np.array([func(v) for v in uniques], dtype=object)
+    return pd.Series(mapped[codes], index=values.index, name=values.name)
+
+
+def normalize_glosses(glosses: pd.Series, lower=True):
+    """Vectorized normalize_gloss over a Series, e.g. df["modified"] = normalize_glosses(df["Gloss"])."""
+    return map_unique(glosses, lambda g: normalize_gloss(g, lower=lower))
+
+
+def glosses_to_norwegian(glosses: pd.Series):
+    """Vectorized ascii_to_norwegian followed by hyphens to spaces, as for Signpuddle terms."""
+    return map_unique(
+        glosses,
+        lambda g: ascii_to_norwegian(g).replace("-", " ") if isinstance(g, str) else g,
+    )
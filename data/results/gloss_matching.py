@@ -0,0 +1,80 @@
+import heapq
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+import pandas as pd
+
+
+def char_ngrams(s, n=3):
+    """Set of character n-grams of s, padded with spaces so word edges count."""
+    padded = f" {s} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i : i + n] for i in range(len(padded) - n + 1)}
+
+
+class NgramIndex:
+    """
+    Blocking index for fuzzy matching: an inverted index from character
+    n-grams to the strings containing them, so a query is only scored against
+    strings it shares n-grams with instead of against the whole collection.
+    """
+
+    def __init__(self, strings, n=3, max_share=0.05):
+        self.n = n
+        self.strings = list(
+            dict.fromkeys(s for s in strings if isinstance(s, str) and s)
+        )
+        postings = defaultdict(list)
+        for i, s in enumerate(self.strings):
+            for gram in char_ngrams(s, n):
+                postings[gram].append(i)
+        # n-grams found in a large share of the strings (e.g. "er ") only add
+        # candidates, not evidence, so they are left out of the index
+        limit = max(1, int(max_share * len(self.strings)))
+        self.postings = {g: ids for g, ids in postings.items() if len(ids) <= limit}
+
+    def candidates(self, query, top_k=20):
+        """The top_k indexed strings sharing the most n-grams with query."""
+        shared = Counter()
+        for gram in char_ngrams(query, self.n):
+            shared.update(self.postings.get(gram, ()))
+        # ties broken by index position, so results do not depend on set order
+        best = heapq.nsmallest(top_k, shared.items(), key=lambda x: (-x[1], x[0]))
+        return [self.strings[i] for i, _ in best]
+
+    def match(self, query, top_n=3, min_score=0.85, top_k=20):
+        """Ranked [(candidate, score)] with SequenceMatcher ratio >= min_score."""
+        scored = []
+        for candidate in self.candidates(query, top_k):
+            score = SequenceMatcher(None, query, candidate).ratio()
+            if score >= min_score:
+                scored.append((candidate, score))
+        scored.sort(key=lambda x: (-x[1], x[0]))
+        return scored[:top_n]
+
+
+def index_matches(queries, index, top_n=3, min_score=0.85):
+    """
+    Fuzzy-match every unique query string against an NgramIndex built
+    already (e.g. SignLookup's over the Signpuddle gloss keys).
+    Returns a DataFrame with query, candidate, match_score and match_rank.
+    """
+    rows = []
+    for query in pd.unique(pd.Series(queries).dropna()):
+        if not isinstance(query, str) or not query:
+            continue
+        for rank, (candidate, score) in enumerate(
+            index.match(query, top_n=top_n, min_score=min_score), start=1
+        ):
+            rows.append((query, candidate, score, rank))
+    return pd.DataFrame(
+        rows, columns=["query", "candidate", "match_score", "match_rank"]
+    )
+
+
+def fuzzy_match(queries, candidates, top_n=3, min_score=0.85, n=3):
+    """
+    Fuzzy-match every unique query string against candidates.
+    Returns a DataFrame with query, candidate, match_score and match_rank.
+    """
+    return index_matches(queries, NgramIndex(candidates, n=n), top_n, min_score)
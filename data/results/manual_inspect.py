@@ -1,6 +1,6 @@
-import pandas as pd
+from table_store import read_table
 
-df = pd.read_csv("tables/matched_single_signs.csv")
+df = read_table("tables/matched_single_signs.csv", columns=["Filename"])
 
 unique_vid = df["Filename"].unique()
 
@@ -0,0 +1,158 @@
+import os
+import struct
+from pathlib import Path
+
+
+def _iter_boxes(f, start, end):
+    """Yield (box_type, payload_start, box_end) for every box between start and end."""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack(">I4s", header)
+        header_len = 8
+        if size == 1:  # 64-bit largesize follows the type
+            size = struct.unpack(">Q", f.read(8))[0]
+            header_len = 16
+        elif size == 0:  # box runs to the end of its parent
+            size = end - pos
+        if size < header_len:
+            return  # corrupt box, stop rather than loop forever
+        yield box_type, pos + header_len, min(pos + size, end)
+        pos += size
+
+
+def _find_box(f, start, end, box_type):
+    for t, payload_start, box_end in _iter_boxes(f, start, end):
+        if t == box_type:
+            return payload_start, box_end
+    return None
+
+
+def _read_timescale_duration(f, payload_start):
+    """Read (timescale, duration) from an mvhd or mdhd box."""
+    f.seek(payload_start)
+    version = f.read(4)[0]
+    if version == 1:
+        f.seek(16, 1)  # creation and modification time, 64 bit
+        return struct.unpack(">IQ", f.read(12))
+    f.seek(8, 1)
+    return struct.unpack(">II", f.read(8))
+
+
+def _read_stts(f, payload_start):
+    """Return (frame_count, total_delta) from the time-to-sample table."""
+    f.seek(payload_start + 4)  # version and flags
+    (entry_count,) = struct.unpack(">I", f.read(4))
+    frame_count = total_delta = 0
+    for count, delta in struct.iter_unpack(">II", f.read(entry_count * 8)):
+        frame_count += count
+        total_delta += count * delta
+    return frame_count, total_delta
+
+
+def _read_trak(f, start, end):
+    """Collect handler, resolution, timescale and stts totals for one track."""
+    track = {}
+    tkhd = _find_box(f, start, end, b"tkhd")
+    if tkhd:
+        # width and height are the last two 16.16 fixed-point fields
+        f.seek(tkhd[1] - 8)
+        width, height = struct.unpack(">II", f.read(8))
+        track["width"], track["height"] = width >> 16, height >> 16
+
+    mdia = _find_box(f, start, end, b"mdia")
+    if mdia is None:
+        return track
+    for box_type, payload_start, box_end in _iter_boxes(f, *mdia):
+        if box_type == b"mdhd":
+            track["timescale"], track["duration"] = _read_timescale_duration(
+                f, payload_start
+            )
+        elif box_type == b"hdlr":
+            f.seek(payload_start + 8)  # version/flags and pre_defined
+            track["handler"] = f.read(4)
+        elif box_type == b"minf":
+            stbl = _find_box(f, payload_start, box_end, b"stbl")
+            stts = stbl and _find_box(f, *stbl, b"stts")
+            if stts:
+                track["frame_count"], track["total_delta"] = _read_stts(f, stts[0])
+    return track
+
+
+def read_mp4_info(video_path: Path):
+    """
+    Read duration, frame count, fps, resolution and bitrate from the MP4
+    moov/mvhd/trak/stts boxes without decoding any video.
+
+    Returns a dict, or None if the file has no usable video track header
+    (not an MP4, truncated, or fragmented with empty sample tables).
+    """
+    file_size = os.path.getsize(video_path)
+    movie_timescale = movie_duration = None
+    video = None
+    with open(video_path, "rb") as f:
+        try:
+            moov = _find_box(f, 0, file_size, b"moov")
+            if moov is None:
+                return None
+            for box_type, payload_start, box_end in _iter_boxes(f, *moov):
+                if box_type == b"mvhd":
+                    movie_timescale, movie_duration = _read_timescale_duration(
+                        f, payload_start
+                    )
+                elif box_type == b"trak" and video is None:
+                    track = _read_trak(f, payload_start, box_end)
+                    if track.get("handler") == b"vide":
+                        video = track
+        except (struct.error, IndexError, ValueError):
+            # a box cut short (truncated file): leave it to the OpenCV fallback
+            return None
+
+    if video is None or not video.get("frame_count"):
+        return None
+
+    if video.get("timescale") and video.get("total_delta"):
+        duration = video["total_delta"] / video["timescale"]
+    elif movie_timescale:
+        duration = movie_duration / movie_timescale
+    else:
+        return None
+
+    frame_count = video["frame_count"]
+    return {
+        "duration": duration,
+        "frame_count": frame_count,
+        "fps": frame_count / duration if duration > 0 else 0,
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "bitrate_kbps": file_size * 8 / duration / 1000 if duration > 0 else 0,
+    }
+
+
+def read_cv2_info(video_path: Path):
+    """Fallback for files without readable MP4 headers: ask OpenCV (starts a decoder)."""
+    import cv2
+
+    video = cv2.VideoCapture(str(video_path))
+    if not video.isOpened():
+        return None
+
+    frame_count = int(video.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = video.get(cv2.CAP_PROP_FPS)
+    width = int(video.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(video.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    video.release()
+
+    duration = frame_count / fps if fps and fps > 0 else 0
+    file_size = os.path.getsize(video_path)
+    return {
+        "duration": duration,
+        "frame_count": frame_count,
+        "fps": fps,
+        "width": width,
+        "height": height,
+        "bitrate_kbps": file_size * 8 / duration / 1000 if duration > 0 else 0,
+    }
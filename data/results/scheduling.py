@@ -0,0 +1,136 @@
+import csv
+import os
+import statistics
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from mp4_info import read_mp4_info
+
+STATS_DIR = Path(__file__).parent / "stats"
+
+
+def read_durations(stats_dir: Path = STATS_DIR):
+    """Filename -> Duration_sec from every stats/*.csv written by get_stats.py."""
+    durations = {}
+    for csv_path in sorted(Path(stats_dir).glob("*.csv")):
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                try:
+                    durations[row["Filename"]] = float(row["Duration_sec"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+    return durations
+
+
+def expected_costs(paths, durations=None, probe=True):
+    """
+    Expected cost of a job per video path, in seconds of video: the duration
+    in the stats CSVs, else from the MP4 header (if probe), else the file size
+    at the median bytes per second of the videos with a known duration.
+    """
+    durations = read_durations() if durations is None else durations
+    costs = []
+    for path in paths:
+        cost = durations.get(os.path.basename(path))
+        if cost is None and probe:
+            try:
+                info = read_mp4_info(path)
+            except OSError:
+                info = None
+            cost = info["duration"] if info else None
+        costs.append(cost)
+
+    sizes = [_size(path) for path in paths]
+    rates = [s / c for s, c in zip(sizes, costs) if c and s]
+    bytes_per_second = statistics.median(rates) if rates else 1.0
+    return [
+        cost if cost is not None else size / bytes_per_second
+        for cost, size in zip(costs, sizes)
+    ]
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def longest_first(jobs, costs):
+    """jobs sorted by expected cost, longest first (LPT), ties in their given order."""
+    order = sorted(range(len(jobs)), key=lambda i: -costs[i])
+    return [jobs[i] for i in order], [costs[i] for i in order]
+
+
+def _timed_call(fn, args):
+    start = time.time()
+    result = fn(*args)
+    return result, start, time.time()
+
+
+class ScheduledPool:
+    """
+    Submits jobs to an executor longest expected cost first, so a long video
+    does not start last while the other workers run out of work (the pool
+    hands each job to the first free worker, which makes this LPT bin
+    packing), and records when each job ran for the utilization report. The
+    futures it returns give the job's own result.
+    """
+
+    def __init__(self, executor, workers):
+        self.executor = executor
+        self.workers = workers
+        self.spans = []  # (start, end) of every finished job
+
+    def submit(self, fn, *args):
+        future = Future()
+        inner = self.executor.submit(_timed_call, fn, args)
+
+        def done(inner):
+            try:
+                result, start, end = inner.result()
+            except BaseException as e:
+                future.set_exception(e)
+                return
+            self.spans.append((start, end))
+            future.set_result(result)
+
+        inner.add_done_callback(done)
+        return future
+
+    def submit_longest_first(self, fn, jobs, costs):
+        """Submit fn(*job) for every job, longest first; returns {future: job}."""
+        jobs, _ = longest_first(jobs, costs)
+        return {self.submit(fn, *job): job for job in jobs}
+
+    def report(self):
+        """
+        Busy time, makespan, and the ideal makespan: total work over the
+        workers, but at least the longest job.
+        """
+        if not self.spans:
+            return None
+        busy = sum(end - start for start, end in self.spans)
+        makespan = max(end for _, end in self.spans) - min(
+            start for start, _ in self.spans
+        )
+        longest = max(end - start for start, end in self.spans)
+        ideal = max(busy / self.workers, longest)
+        return {
+            "jobs": len(self.spans),
+            "workers": self.workers,
+            "busy_seconds": busy,
+            "makespan_seconds": makespan,
+            "ideal_makespan_seconds": ideal,
+            "utilization": busy / (self.workers * makespan) if makespan else 1.0,
+        }
+
+    def summary(self):
+        report = self.report()
+        if report is None:
+            return "No jobs ran"
+        return (
+            f"{report['jobs']} jobs on {report['workers']} workers: makespan "
+            f"{report['makespan_seconds']:.1f}s (ideal {report['ideal_makespan_seconds']:.1f}s), "
+            f"utilization {100 * report['utilization']:.0f}%"
+        )
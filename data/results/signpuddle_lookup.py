@@ -0,0 +1,207 @@
+import re
+import sqlite3
+from pathlib import Path
+from gloss import ascii_to_norwegian, normalize_gloss
+from gloss_matching import NgramIndex, index_matches
+
+SOURCE_DB = Path(__file__).parent.parent / "signpuddle" / "sgn69.db"
+LOOKUP_DB = Path(__file__).parent / "tables" / "signpuddle_lookup.db"
+
+_BOX = re.compile(r"([BLMR])(\d{3})x(\d{3})")
+_SYMBOL = re.compile(r"(S[123][0-9a-f]{2}[0-5][0-9a-f])(\d{3})x(\d{3})")
+
+SCHEMA = """
+CREATE TABLE entry (
+    id INTEGER PRIMARY KEY,
+    gloss TEXT,
+    gloss_key TEXT,
+    fsw TEXT,
+    sign TEXT,
+    box TEXT,
+    box_x INTEGER,
+    box_y INTEGER
+);
+CREATE INDEX entry_gloss_key ON entry (gloss_key);
+CREATE INDEX entry_sign ON entry (sign);
+CREATE TABLE symbol (
+    entry_id INTEGER REFERENCES entry (id),
+    position INTEGER,
+    symbol TEXT,
+    x INTEGER,
+    y INTEGER
+);
+CREATE INDEX symbol_entry ON symbol (entry_id);
+CREATE INDEX symbol_symbol ON symbol (symbol);
+CREATE VIRTUAL TABLE gloss_fts USING fts5 (
+    gloss_key, content='entry', content_rowid='id'
+);
+"""
+
+
+def sign_part(fsw):
+    """Keep only the last 'M...' sign of an FSW string, as in signpuddle_dict.csv."""
+    if fsw and "M" in fsw:
+        return "M" + fsw.split("M")[-1]
+    return fsw or ""
+
+
+def parse_fsw(sign):
+    """Split an FSW sign into its box (type, x, y) and a list of (symbol, x, y)."""
+    box = _BOX.match(sign)
+    symbols = [(s, int(x), int(y)) for s, x, y in _SYMBOL.findall(sign)]
+    if box is None:
+        return (None, None, None), symbols
+    return (box.group(1), int(box.group(2)), int(box.group(3))), symbols
+
+
+def build_lookup_db(source_db=SOURCE_DB, lookup_db=LOOKUP_DB):
+    """
+    Build the gloss/sign lookup database from the Signpuddle dump: one row per
+    (prime term, sign) with a normalized gloss key, B-tree and FTS indexes on
+    the key, and every sign pre-parsed into its symbols and positions.
+    """
+    lookup_db = Path(lookup_db)
+    lookup_db.unlink(missing_ok=True)
+
+    source = sqlite3.connect(source_db)
+    rows = source.execute("""
+        SELECT t.lower, e.sign
+        FROM term t
+        JOIN entry e ON e.id = t.id
+        WHERE t.prime = 1
+        """)
+
+    conn = sqlite3.connect(lookup_db)
+    conn.executescript(SCHEMA)
+
+    seen = set()
+    entries, symbols = [], []
+    for term, fsw in rows:
+        gloss = ascii_to_norwegian(term)
+        if isinstance(gloss, str):
+            gloss = gloss.replace("-", " ")
+        sign = sign_part(fsw)
+        if (gloss, sign) in seen:
+            continue
+        seen.add((gloss, sign))
+
+        entry_id = len(entries) + 1
+        (box, box_x, box_y), parsed = parse_fsw(sign)
+        entries.append(
+            (entry_id, gloss, normalize_gloss(gloss), fsw, sign, box, box_x, box_y)
+        )
+        symbols.extend(
+            (entry_id, position, symbol, x, y)
+            for position, (symbol, x, y) in enumerate(parsed)
+        )
+    source.close()
+
+    conn.executemany("INSERT INTO entry VALUES (?, ?, ?, ?, ?, ?, ?, ?)", entries)
+    conn.executemany("INSERT INTO symbol VALUES (?, ?, ?, ?, ?)", symbols)
+    conn.execute("INSERT INTO gloss_fts (gloss_fts) VALUES ('rebuild')")
+    conn.execute("ANALYZE")
+    conn.commit()
+    conn.close()
+
+    print(f"Saved {len(entries)} Signpuddle signs to {lookup_db}")
+    return lookup_db
+
+
+class SignLookup:
+    """Read-only point and search queries against the lookup database."""
+
+    def __init__(self, lookup_db=LOOKUP_DB):
+        self.conn = sqlite3.connect(f"file:{lookup_db}?mode=ro", uri=True)
+        self._fuzzy_index = None
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def signs(self, gloss):
+        """All signs for a gloss, normalized the same way as the table keys."""
+        rows = self.conn.execute(
+            "SELECT sign FROM entry WHERE gloss_key = ? ORDER BY id",
+            (normalize_gloss(gloss),),
+        )
+        return [sign for (sign,) in rows]
+
+    def signs_for_many(self, glosses):
+        """{gloss_key: [signs]} for many glosses in one query."""
+        keys = list({normalize_gloss(g) for g in glosses})
+        result = {key: [] for key in keys}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start : start + 500]
+            rows = self.conn.execute(
+                f"SELECT gloss_key, sign FROM entry WHERE gloss_key IN "
+                f"({', '.join('?' * len(chunk))}) ORDER BY id",
+                chunk,
+            )
+            for key, sign in rows:
+                result[key].append(sign)
+        return result
+
+    def glosses(self, sign):
+        """Gloss keys that have exactly this sign (reverse lookup)."""
+        rows = self.conn.execute(
+            "SELECT DISTINCT gloss_key FROM entry WHERE sign = ? ORDER BY gloss_key",
+            (sign,),
+        )
+        return [key for (key,) in rows]
+
+    def prefix_search(self, prefix, limit=20):
+        """Gloss keys starting with prefix (B-tree range scan)."""
+        prefix = normalize_gloss(prefix)
+        rows = self.conn.execute(
+            "SELECT DISTINCT gloss_key FROM entry "
+            "WHERE gloss_key >= ? AND gloss_key < ? ORDER BY gloss_key LIMIT ?",
+            (prefix, prefix + "\U0010ffff", limit),
+        )
+        return [key for (key,) in rows]
+
+    def search(self, words, limit=20):
+        """Gloss keys containing words that start with each of the given words (FTS)."""
+        # each word an FTS5 string (quotes doubled) with a prefix match
+        query = " ".join(
+            '"{}"*'.format(w.replace('"', '""')) for w in normalize_gloss(words).split()
+        )
+        if not query:
+            return []
+        rows = self.conn.execute(
+            "SELECT DISTINCT gloss_key FROM gloss_fts WHERE gloss_fts MATCH ? "
+            "ORDER BY rank LIMIT ?",
+            (query, limit),
+        )
+        return [key for (key,) in rows]
+
+    def fuzzy_index(self):
+        """NgramIndex over the gloss keys, built on first use."""
+        if self._fuzzy_index is None:
+            keys = self.conn.execute("SELECT DISTINCT gloss_key FROM entry")
+            self._fuzzy_index = NgramIndex(key for (key,) in keys)
+        return self._fuzzy_index
+
+    def fuzzy_search(self, gloss, limit=5, min_score=0.8):
+        """[(gloss_key, score)] of similarly spelled gloss keys."""
+        return self.fuzzy_index().match(
+            normalize_gloss(gloss), top_n=limit, min_score=min_score
+        )
+
+    def fuzzy_matches(self, keys, top_n=3, min_score=0.85):
+        """gloss_matching.fuzzy_match of many normalized glosses against the gloss keys."""
+        return index_matches(keys, self.fuzzy_index(), top_n, min_score)
+
+    def symbols(self, sign):
+        """Pre-parsed (symbol, x, y) of the first entry with this sign."""
+        rows = self.conn.execute(
+            "SELECT s.symbol, s.x, s.y FROM symbol s "
+            "WHERE s.entry_id = (SELECT id FROM entry WHERE sign = ? LIMIT 1) "
+            "ORDER BY s.position",
+            (sign,),
+        )
+        return rows.fetchall()
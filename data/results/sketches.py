@@ -0,0 +1,92 @@
+import math
+from bisect import bisect_right
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with bounded relative error (DDSketch-style).
+
+    Values are counted in logarithmic buckets, so memory depends on the range
+    of the values, not on how many were added, and two sketches merge by
+    adding their bucket counts.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= 0:
+            self.zero_count += 1
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for key, n in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else math.nan
+
+    def quantile(self, q):
+        """Approximate q-quantile (0 <= q <= 1), within relative_accuracy of the true value."""
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return max(self.min, 0.0)
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                estimate = 2 * self.gamma**key / (self.gamma + 1)
+                return min(max(estimate, self.min), self.max)
+        return self.max
+
+
+class Histogram:
+    """Fixed-edge histogram; the last bin is open-ended. Merges by adding counts."""
+
+    def __init__(self, edges):
+        self.edges = list(edges)
+        self.counts = [0] * len(self.edges)
+
+    def add(self, value):
+        # values below the first edge are counted in the first bin
+        self.counts[max(bisect_right(self.edges, value) - 1, 0)] += 1
+
+    def merge(self, other):
+        if other.edges != self.edges:
+            raise ValueError("Cannot merge histograms with different edges")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        return self
+
+    def bins(self):
+        """Yield (label, count) per bin, e.g. ("5-10", 12) and ("600+", 3)."""
+        for i, n in enumerate(self.counts):
+            low = self.edges[i]
+            if i + 1 < len(self.edges):
+                yield f"{low:g}-{self.edges[i + 1]:g}", n
+            else:
+                yield f"{low:g}+", n
@@ -0,0 +1,131 @@
+import argparse
+import re
+from pathlib import Path
+import pandas as pd
+from table_store import RESULTS_DIR, query, write_table
+
+INDEX_TABLE = "subtitle_index"
+INDEX_CSV = RESULTS_DIR / "tables" / f"{INDEX_TABLE}.csv"
+VIDEOS_DIR = RESULTS_DIR.parent / "nrk_tegnspraaknytt"
+SUBTITLE_SUFFIX = ".nb-ttv.vtt"
+MONTHS = [
+    "januar",
+    "februar",
+    "mars",
+    "april",
+    "mai",
+    "juni",
+    "juli",
+    "august",
+    "september",
+    "oktober",
+    "november",
+    "desember",
+]
+
+
+def broadcast_date(broadcast):
+    """'MM-DD' from a name like 'Tegnspråknytt - 16. april' or with a YYYY-MM-DD date."""
+    match = re.search(r"\d{4}-(\d{2})-(\d{2})", broadcast)
+    if match is not None:
+        return f"{match.group(1)}-{match.group(2)}"
+    match = re.search(r"(\d{1,2})\.\s*([a-zæøå]+)", broadcast.lower())
+    if match is None or match.group(2) not in MONTHS:
+        return None
+    return f"{MONTHS.index(match.group(2)) + 1:02d}-{int(match.group(1)):02d}"
+
+
+def read_cues(ttv_path: Path):
+    """Cues of a subtitle file, numbered from 1 as split_vid_by_subtitles.py numbers its clips."""
+    import pysrt
+
+    subs = pysrt.open(str(ttv_path), encoding="utf-8")
+    return [
+        (i, sub.start.ordinal / 1000.0, sub.end.ordinal / 1000.0, sub.text)
+        for i, sub in enumerate(subs, start=1)
+    ]
+
+
+def build_index(videos_dir: Path = VIDEOS_DIR):
+    """One row per cue of every .nb-ttv.vtt in videos_dir."""
+    rows = []
+    for ttv_path in sorted(Path(videos_dir).glob(f"*{SUBTITLE_SUFFIX}")):
+        broadcast = ttv_path.name[: -len(SUBTITLE_SUFFIX)]
+        date = broadcast_date(broadcast)
+        for clip, start, end, text in read_cues(ttv_path):
+            text = " ".join(text.split())
+            rows.append(
+                {
+                    "broadcast": broadcast,
+                    "date": date,
+                    "clip": clip,
+                    "clip_name": f"clip_{clip:03d}",
+                    "start_sec": start,
+                    "end_sec": end,
+                    "duration_sec": round(end - start, 3),
+                    "text": text,
+                    "tokens": len(text.split()),
+                }
+            )
+    return pd.DataFrame(
+        rows,
+        columns=[
+            "broadcast",
+            "date",
+            "clip",
+            "clip_name",
+            "start_sec",
+            "end_sec",
+            "duration_sec",
+            "text",
+            "tokens",
+        ],
+    )
+
+
+def select_clips(where):
+    """
+    Clips matching an SQL condition on the index, e.g. "duration_sec BETWEEN 2
+    AND 6", "date >= '04-01'" or "text ILIKE '%valg%'": {broadcast: [clip numbers]}.
+    """
+    selected = query(
+        f"SELECT broadcast, clip FROM {INDEX_TABLE} WHERE {where} "
+        "ORDER BY broadcast, clip"
+    )
+    return {
+        broadcast: group["clip"].tolist()
+        for broadcast, group in selected.groupby("broadcast", sort=False)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Index of the subtitle cues of the NRK broadcasts, and queries on it."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="(Re)build the index")
+    build.add_argument("--videos_dir", type=Path, default=VIDEOS_DIR)
+    select = subparsers.add_parser("select", help="Clips matching an SQL condition")
+    select.add_argument("where", help='e.g. "duration_sec BETWEEN 2 AND 6"')
+    args = parser.parse_args()
+
+    if args.command == "build":
+        index = build_index(args.videos_dir)
+        write_table(index, INDEX_CSV)
+        print(
+            f"Indexed {len(index)} cues of {index['broadcast'].nunique()} broadcasts "
+            f"in {INDEX_CSV}"
+        )
+    else:
+        totals = query(
+            f"SELECT COUNT(*) AS clips, SUM(duration_sec) AS seconds, "
+            f"SUM(duration_sec) FILTER (WHERE {args.where}) AS selected_seconds, "
+            f"COUNT(*) FILTER (WHERE {args.where}) AS selected_clips "
+            f"FROM {INDEX_TABLE}"
+        ).iloc[0]
+        for broadcast, clips in select_clips(args.where).items():
+            print(f"{broadcast}: {', '.join(map(str, clips))}")
+        print(
+            f"{int(totals['selected_clips'])}/{int(totals['clips'])} clips, "
+            f"{totals['selected_seconds'] or 0:.0f}/{totals['seconds']:.0f}s of video"
+        )
@@ -0,0 +1,111 @@
+import sys
+from pathlib import Path
+import pandas as pd
+
+RESULTS_DIR = Path(__file__).parent
+TABLE_DIRS = (RESULTS_DIR / "tables", RESULTS_DIR / "stats")
+# SQL schema per directory: tables/x.csv is "x", stats/x.csv is "stats.x"
+SQL_SCHEMAS = {RESULTS_DIR / "tables": "main", RESULTS_DIR / "stats": "stats"}
+
+# Repetitive string columns, stored dictionary-encoded (pandas category)
+DICTIONARY_COLUMNS = (
+    "Filename",
+    "broadcast",
+    "Gloss",
+    "Gloss_x",
+    "Gloss_y",
+    "modified",
+    "matched_modified",
+    "Signwriting",
+    "match_type",
+)
+
+
+def _parquet_path(csv_path):
+    return Path(csv_path).with_suffix(".parquet")
+
+
+def _resolve(table):
+    """Table name (e.g. "matched_single_signs", "stats/NRK_news") or path -> CSV path."""
+    path = Path(table)
+    if path.suffix in (".csv", ".parquet"):
+        return path.with_suffix(".csv")
+    for directory in (RESULTS_DIR, *TABLE_DIRS):
+        csv_path = directory / f"{table}.csv"
+        if csv_path.exists() or _parquet_path(csv_path).exists():
+            return csv_path
+    raise FileNotFoundError(f"No results table named {table!r}")
+
+
+def write_parquet(df, csv_path):
+    """Write the Parquet copy of a table, with gloss/FSW columns dictionary-encoded."""
+    encoded = df.copy(deep=False)
+    for col in DICTIONARY_COLUMNS:
+        if col in encoded.columns:
+            encoded[col] = encoded[col].astype("category")
+    parquet_path = _parquet_path(csv_path)
+    encoded.to_parquet(parquet_path, index=False)
+    return parquet_path
+
+
+def write_table(df, csv_path):
+    """Save a results table as CSV (for reading by eye) and as Parquet (for loading)."""
+    df.to_csv(csv_path, index=False)
+    write_parquet(df, csv_path)
+
+
+def csv_to_parquet(csv_path):
+    """Add or refresh the Parquet copy of an existing CSV table."""
+    return write_parquet(pd.read_csv(csv_path), csv_path)
+
+
+def read_table(table, columns=None):
+    """
+    Load a results table by name or path, only the given columns. The Parquet
+    copy is used unless the CSV is newer (e.g. edited by hand).
+    """
+    csv_path = _resolve(table)
+    parquet_path = _parquet_path(csv_path)
+    if parquet_path.exists() and (
+        not csv_path.exists()
+        or parquet_path.stat().st_mtime >= csv_path.stat().st_mtime
+    ):
+        return pd.read_parquet(parquet_path, columns=columns)
+    return pd.read_csv(csv_path, usecols=columns)
+
+
+def query(sql, **frames):
+    """
+    Run SQL in DuckDB and return a DataFrame. Every results table is available
+    as a view named after its file (tables/ as e.g. matched_single_signs,
+    stats/ as e.g. stats.NRK_news), and DataFrames passed as keyword arguments
+    are available under their names.
+    """
+    import duckdb
+
+    conn = duckdb.connect()
+    for directory, schema in SQL_SCHEMAS.items():
+        conn.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+        for csv_path in sorted(directory.glob("*.csv")):
+            parquet_path = _parquet_path(csv_path)
+            if parquet_path.exists():
+                source = f"read_parquet('{parquet_path.as_posix()}')"
+            else:
+                source = f"read_csv_auto('{csv_path.as_posix()}')"
+            conn.execute(
+                f'CREATE VIEW {schema}."{csv_path.stem}" AS SELECT * FROM {source}'
+            )
+    for name, df in frames.items():
+        conn.register(name, df)
+    result = conn.execute(sql).df()
+    conn.close()
+    return result
+
+
+if __name__ == "__main__":
+    # Convert every CSV in tables/ and stats/ (or the paths given) to Parquet
+    paths = [Path(p) for p in sys.argv[1:]] or [
+        p for directory in TABLE_DIRS for p in sorted(directory.glob("*.csv"))
+    ]
+    for path in paths:
+        print(f"{path} -> {csv_to_parquet(path)}")
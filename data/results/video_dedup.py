@@ -0,0 +1,270 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from table_store import RESULTS_DIR, write_table
+
+DATA_DIR = RESULTS_DIR.parent
+# in order of preference for a group's representative
+CORPORA = {
+    "statped": (DATA_DIR / "videos", "*.mp4"),
+    "unexpected_vid": (DATA_DIR / "unexpected_vid", "*.mp4"),
+    "nrk": (DATA_DIR / "processed_NRK", "*/*.mp4"),
+}
+HASHES_CSV = RESULTS_DIR / "tables" / "video_hashes.csv"
+GROUPS_CSV = RESULTS_DIR / "tables" / "video_groups.csv"
+HASH_COLUMNS = ["corpus", "path", "size", "mtime_ns", "hash"]
+
+# a 64-bit DCT hash per sampled frame
+HASH_FRAMES = 4
+HASH_BITS = 64 * HASH_FRAMES
+# videos at most this many bits apart are near-duplicates
+MAX_DISTANCE = 24
+# multi-index lookup: the hash split into CHUNKS substrings; two hashes at most
+# MAX_DISTANCE apart have a substring at most MAX_DISTANCE // CHUNKS apart
+CHUNKS = 16
+CHUNK_BITS = HASH_BITS // CHUNKS
+
+# Below this many videos to hash, process start-up costs more than it saves.
+PARALLEL_THRESHOLD = 64
+
+
+def frame_hash(frame):
+    """
+    64-bit perceptual hash of a BGR frame: the signs of the lowest 8x8 DCT
+    coefficients of the 32x32 grayscale image against their median.
+    """
+    import cv2
+
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(small.astype(np.float32))[:8, :8].ravel()
+    # the DC term is the mean brightness, it would dominate the median
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def video_hash(video_path, n_frames=HASH_FRAMES):
+    """
+    HASH_BITS-bit hash of n_frames frames evenly spread over the video (none at
+    the very start or end, where fades and cuts differ), or None if unreadable.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(str(video_path))
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        code = 0
+        for i in range(n_frames):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(total * (i + 0.5) / n_frames))
+            ok, frame = cap.read()
+            if not ok:
+                return None
+            code = (code << 64) | frame_hash(frame)
+        return code
+    finally:
+        cap.release()
+
+
+def _hash_record(corpus, path):
+    stat = os.stat(path)
+    code = video_hash(path)
+    return (
+        corpus,
+        str(path),
+        stat.st_size,
+        stat.st_mtime_ns,
+        None if code is None else f"{code:0{HASH_BITS // 4}x}",
+    )
+
+
+def list_videos(corpora=CORPORA):
+    """(corpus, path) of every video of the corpora."""
+    return [
+        (corpus, path)
+        for corpus, (directory, pattern) in corpora.items()
+        for path in sorted(Path(directory).glob(pattern))
+    ]
+
+
+def update_hashes(videos, hashes_csv=HASHES_CSV, workers=None):
+    """
+    The hash table of the videos: hashes of unchanged files (same size and
+    mtime) are read from hashes_csv, the others computed and saved there.
+    """
+    cached = (
+        pd.read_csv(hashes_csv, dtype={"hash": str})
+        if Path(hashes_csv).exists()
+        else pd.DataFrame(columns=HASH_COLUMNS)
+    )
+    known = {
+        (path, size, mtime): code
+        for path, size, mtime, code in zip(
+            cached["path"], cached["size"], cached["mtime_ns"], cached["hash"]
+        )
+    }
+    rows, todo = [], []
+    for corpus, path in videos:
+        stat = os.stat(path)
+        key = (str(path), stat.st_size, stat.st_mtime_ns)
+        if key in known:
+            rows.append((corpus, *key, known[key]))
+        else:
+            todo.append((corpus, path))
+
+    if len(todo) >= PARALLEL_THRESHOLD and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows += executor.map(_hash_record, *zip(*todo), chunksize=8)
+    else:
+        rows += [_hash_record(corpus, path) for corpus, path in todo]
+
+    hashes = pd.DataFrame(rows, columns=HASH_COLUMNS)
+    if todo or len(hashes) != len(cached):
+        write_table(hashes, hashes_csv)
+    return hashes
+
+
+def _chunks(code):
+    mask = (1 << CHUNK_BITS) - 1
+    return [(code >> (i * CHUNK_BITS)) & mask for i in range(CHUNKS)]
+
+
+def _probes(value, radius):
+    """value and every value within radius bits of it."""
+    probes = [value]
+    for _ in range(radius):
+        probes = list(
+            {p ^ (1 << bit) for p in probes for bit in range(CHUNK_BITS)} | set(probes)
+        )
+    return probes
+
+
+def near_duplicate_pairs(codes, max_distance=MAX_DISTANCE):
+    """
+    (i, j, distance) of the codes at most max_distance bits apart, i < j.
+    Each code is split into CHUNKS substrings, each indexed in its own hash
+    table; only codes sharing a substring within max_distance // CHUNKS bits
+    are compared, instead of all pairs.
+    """
+    radius = max_distance // CHUNKS
+    tables = [{} for _ in range(CHUNKS)]
+    for i, code in enumerate(codes):
+        if code is None:
+            continue
+        for table, value in zip(tables, _chunks(code)):
+            table.setdefault(value, []).append(i)
+
+    pairs = []
+    for i, code in enumerate(codes):
+        if code is None:
+            continue
+        candidates = set()
+        for table, value in zip(tables, _chunks(code)):
+            for probe in _probes(value, radius):
+                candidates.update(j for j in table.get(probe, ()) if j > i)
+        for j in sorted(candidates):
+            distance = bin(code ^ codes[j]).count("1")
+            if distance <= max_distance:
+                pairs.append((i, j, distance))
+    return pairs
+
+
+def group_videos(hashes, max_distance=MAX_DISTANCE):
+    """
+    One row per video with its group and the group's representative (first
+    by CORPORA order, then path): connected components of near-duplicate pairs.
+    """
+    order = {corpus: rank for rank, corpus in enumerate(CORPORA)}
+    hashes = hashes.assign(_rank=hashes["corpus"].map(order).fillna(len(order)))
+    hashes = hashes.sort_values(["_rank", "path"], ignore_index=True)
+    codes = [int(h, 16) if isinstance(h, str) else None for h in hashes["hash"]]
+
+    parent = list(range(len(codes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j, _ in near_duplicate_pairs(codes, max_distance):
+        # the lower index, earlier in preference order, stays the root
+        ri, rj = find(i), find(j)
+        parent[max(ri, rj)] = min(ri, rj)
+
+    roots = [find(i) for i in range(len(codes))]
+    distances = [
+        bin(codes[i] ^ codes[r]).count("1") if codes[i] is not None else None
+        for i, r in enumerate(roots)
+    ]
+    return pd.DataFrame(
+        {
+            "corpus": hashes["corpus"],
+            "path": hashes["path"],
+            "stem": [Path(p).stem for p in hashes["path"]],
+            "group": pd.Series(roots).rank(method="dense").astype(int) - 1,
+            "representative": [hashes["path"][r] for r in roots],
+            "distance": distances,
+        }
+    )
+
+
+def read_groups(groups_csv=GROUPS_CSV):
+    return pd.read_csv(groups_csv) if Path(groups_csv).exists() else None
+
+
+def duplicate_map(video_dir, groups=None):
+    """
+    {video: representative video} of the videos in video_dir whose results
+    can come from their representative: it is in video_dir too (so processed
+    in the same run) or already has an .eaf.
+    """
+    groups = read_groups() if groups is None else groups
+    if groups is None:
+        return {}
+    video_dir = Path(video_dir).resolve()
+    duplicates = {}
+    for path, representative in zip(groups["path"], groups["representative"]):
+        path, representative = Path(path).resolve(), Path(representative).resolve()
+        if path == representative or path.parent != video_dir:
+            continue
+        if (
+            representative.parent == video_dir
+            or representative.with_suffix(".eaf").exists()
+        ):
+            duplicates[path] = representative
+    return duplicates
+
+
+def duplicate_stems(groups, corpus=None):
+    """stem -> group, e.g. to count the videos of a group once in an evaluation."""
+    if corpus is not None:
+        groups = groups[groups["corpus"] == corpus]
+    return dict(zip(groups["stem"], groups["group"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Perceptual hashes of the Statped, unexpected_vid and NRK clip videos, grouped into near-duplicates."
+    )
+    parser.add_argument("--max_distance", type=int, default=MAX_DISTANCE)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    hashes = update_hashes(list_videos(), workers=args.workers)
+    groups = group_videos(hashes, args.max_distance)
+    write_table(groups, GROUPS_CSV)
+    sizes = groups["group"].value_counts()
+    duplicates = int((sizes - 1).sum())
+    print(
+        f"{len(groups)} videos in {len(sizes)} groups: {duplicates} near-duplicates "
+        f"({(sizes > 1).sum()} groups of more than one) in {GROUPS_CSV}"
+    )
+    for corpus, count in (
+        groups[groups["path"] != groups["representative"]]["corpus"]
+        .value_counts()
+        .items()
+    ):
+        print(f"  {corpus}: {count} duplicates")
@@ -1,8 +1,9 @@
 import os
-import glob
+import sys
 import pandas as pd
-import xml.etree.ElementTree as ET
 import numpy as np
+from pathlib import Path
+from src.single_signs.eaf import load_eaf_folder, annotation_values
 from src.single_signs.evaluate import (
     compare_signwriting,
     summarize_lengths_and_means,
@@ -12,33 +13,17 @@ from src.single_signs.evaluate import (
     analyze_value_columns,
     visualize_signwriting,
 )
-import matplotlib.pyplot as plt
+from src.single_signs.significance import variant_statistics
 
-
-def extract_annotation_values(eaf_path):
-    """Extract all <ANNOTATION_VALUE>...</ANNOTATION_VALUE> texts from an .eaf file."""
-    tree = ET.parse(eaf_path)
-    root = tree.getroot()
-
-    return " ".join(
-        elem.text.strip() for elem in root.findall(".//ANNOTATION_VALUE") if elem.text
-    )
+# results tables are read through data/results/table_store.py
+sys.path.append(str(Path(__file__).parent.parent / "data" / "results"))
+from table_store import read_table, write_table
+from video_dedup import duplicate_stems, read_groups
 
 
 def process_eaf_folder(folder_path):
-    """Build a table containing filename, stem, and list of annotation values."""
-    data = []
-
-    for file_path in glob.glob(os.path.join(folder_path, "*.eaf")):
-        filename = os.path.basename(file_path)
-        stem = os.path.splitext(filename)[0]
-
-        values = extract_annotation_values(file_path)
-
-        data.append({"name": filename, "stem": stem, "value": values})
-
-    df = pd.DataFrame(data)
-    return df
+    """Build a table containing filename, stem, and space-joined annotation values."""
+    return annotation_values(load_eaf_folder(folder_path), sep=" ")
 
 
 def split_stem(s):
@@ -101,7 +86,10 @@ if __name__ == "__main__":
     # Analyze value columns and plot histograms
     # analyze_value_columns(merged_df)
 
-    sw_df = pd.read_csv("data/results/tables/matched_single_signs.csv")
+    sw_df = read_table(
+        "data/results/tables/matched_single_signs.csv",
+        columns=["Filename", "Signwriting"],
+    )
     result_df = compare_signwriting(merged_df, sw_df, experiment=True)
 
     summary_df = summarize_lengths_and_means(result_df)
@@ -111,6 +99,21 @@ if __name__ == "__main__":
     print("\nMean of each column:")
     print(table)
 
+    # bootstrap CIs, and paired permutation tests of each variant against the
+    # originals; the rows of a video (one per matching reference) are resampled
+    # together, and so are near-duplicate videos (data/results/video_dedup.py)
+    clusters = result_df["stem"]
+    groups = read_groups()
+    if groups is not None:
+        stem_groups = duplicate_stems(groups, corpus="statped")
+        clusters = clusters.map(
+            lambda stem: f"group_{stem_groups[stem]}" if stem in stem_groups else stem
+        )
+    stats_df = variant_statistics(summary_df, clusters=clusters)
+    print("\nMeans with 95% CIs, and differences to original with p-values:")
+    print(stats_df.round(4).to_string())
+    write_table(stats_df.reset_index(), "data/results/tables/variant_statistics.csv")
+
     # draw three random samples and vizualize the SW for manual inspection.
     output_dir = "experiment_single_sign/visualizations"
     os.makedirs(output_dir, exist_ok=True)  # creates the folder if needed
@@ -1,10 +1,16 @@
 import os
 import shutil
+import sys
+from pathlib import Path
 from concurrent.futures import ProcessPoolExecutor, as_completed
 from moviepy.editor import VideoFileClip, vfx
 from tqdm import tqdm
 import pandas as pd
 
+# longest videos first, with durations from data/results/stats
+sys.path.append(str(Path(__file__).parent.parent / "data" / "results"))
+from scheduling import ScheduledPool, expected_costs
+
 
 def process_single_video(input_path, output_folder, operation, speed_factor, cut_seconds, keep_original=False):
     """Process a single video and save result(s). Handles 'all' mode for multiple copies."""
@@ -76,28 +82,30 @@ def process_videos_from_df(
     selected_videos = df[filename_column].unique().tolist()
     print(f"Processing {len(selected_videos)} videos ({operation.upper()})...")
 
-    tasks = []
+    input_paths = []
+    for filename in selected_videos:
+        input_path = os.path.join(source_folder, filename)
+        if not os.path.exists(input_path):
+            print(f"Warning: {filename} not found in source folder.")
+            continue
+        input_paths.append(input_path)
+
+    workers = max_workers or os.cpu_count() or 1
     with ProcessPoolExecutor(max_workers=max_workers) as executor:
-        for filename in selected_videos:
-            input_path = os.path.join(source_folder, filename)
-            if not os.path.exists(input_path):
-                print(f"Warning: {filename} not found in source folder.")
-                continue
-            tasks.append(
-                executor.submit(
-                    process_single_video,
-                    input_path,
-                    output_folder,
-                    operation,
-                    speed_factor,
-                    cut_seconds,
-                    keep_original
-                )
-            )
+        pool = ScheduledPool(executor, workers)
+        tasks = pool.submit_longest_first(
+            process_single_video,
+            [
+                (input_path, output_folder, operation, speed_factor, cut_seconds, keep_original)
+                for input_path in input_paths
+            ],
+            expected_costs(input_paths),
+        )
 
         for future in tqdm(as_completed(tasks), total=len(tasks), desc="Processing videos", ncols=90):
             tqdm.write(future.result())
 
+    print(pool.summary())
     print("All videos processed!")
 
 
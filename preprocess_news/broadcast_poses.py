@@ -0,0 +1,158 @@
+import argparse
+import math
+import mmap
+import os
+import subprocess
+import numpy as np
+import pysrt
+from pose_format import Pose
+from pose_format.numpy.pose_body import NumPyPoseBody
+from pose_format.pose_header import PoseHeader
+from pose_format.utils.reader import BufferReader
+
+
+def estimate_broadcast_pose(video_path, pose_path):
+    """Run MediaPipe once over the whole broadcast, unless its .pose exists."""
+    if os.path.exists(pose_path):
+        return pose_path
+    os.makedirs(os.path.dirname(pose_path) or ".", exist_ok=True)
+    tmp_path = pose_path + ".tmp"
+    subprocess.run(
+        ["video_to_pose", "--format", "mediapipe", "-i", video_path, "-o", tmp_path],
+        check=True,
+    )
+    os.replace(tmp_path, pose_path)
+    return pose_path
+
+
+def cue_times(ttv_path):
+    """(start, end) in seconds of every subtitle cue, numbered as the clips are."""
+    subs = pysrt.open(ttv_path, encoding="utf-8")
+    return [(sub.start.ordinal / 1000.0, sub.end.ordinal / 1000.0) for sub in subs]
+
+
+class BroadcastPoses:
+    """
+    The .pose of a whole broadcast, memory-mapped: the body is never read as a
+    whole, clip(i) is a view of the frames of cue i, and only the frames of
+    the clips that are written are paged in.
+    """
+
+    def __init__(self, pose_path, cues):
+        self.pose_path = pose_path
+        self.cues = cues
+        self._file = open(pose_path, "rb")
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        reader = BufferReader(self._buffer)
+        self.header = PoseHeader.read(reader)
+        offset = reader.read_offset
+
+        points = sum(len(c.points) for c in self.header.components)
+        dims = self.header.num_dims()
+        # v0.1 stores fps and frames as ushorts, later versions as float and uint
+        if round(self.header.version, 1) <= 0.1:
+            self.fps, _, people = np.frombuffer(self._buffer, "<u2", 3, offset)
+            offset += 6
+            # the ushort overflows after 65,535 frames (22 minutes at 50 fps):
+            # like pose_format's read_v0_1, count the frames in the bytes left
+            frame_bytes = int(people) * points * (dims + 1) * 4
+            frames = (len(self._buffer) - offset) // frame_bytes
+        else:
+            (self.fps,) = np.frombuffer(self._buffer, "<f4", 1, offset)
+            (frames,) = np.frombuffer(self._buffer, "<u4", 1, offset + 4)
+            (people,) = np.frombuffer(self._buffer, "<u2", 1, offset + 8)
+            offset += 10
+        self.fps = float(self.fps)
+        shape = (int(frames), int(people), points)
+
+        self.data = np.frombuffer(
+            self._buffer, "<f4", math.prod(shape) * dims, offset
+        ).reshape(*shape, dims)
+        offset += self.data.nbytes
+        self.confidence = np.frombuffer(
+            self._buffer, "<f4", math.prod(shape), offset
+        ).reshape(shape)
+
+    def close(self):
+        # views of the buffer must be gone before it can be closed
+        self.data = self.confidence = None
+        self._buffer.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.cues)
+
+    def frames(self, i):
+        """Frame range [start, end) of cue i (0-based), as pose_format reads times."""
+        start, end = self.cues[i]
+        n_frames = len(self.data)
+        return (
+            min(math.floor(start * self.fps), n_frames),
+            min(math.ceil(end * self.fps), n_frames),
+        )
+
+    def clip(self, i):
+        """Pose of cue i, its body a view of the broadcast's frames."""
+        start, end = self.frames(i)
+        body = NumPyPoseBody(self.fps, self.data[start:end], self.confidence[start:end])
+        return Pose(self.header, body)
+
+    def write_clips(self, output_dir, clips=None):
+        """
+        Write clip_NNN.pose (numbered from 1, like the .mp4 clips) for the given
+        clip numbers, or all cues, skipping clips already written. Returns the
+        paths written.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        written = []
+        for number in clips or range(1, len(self) + 1):
+            out_path = os.path.join(output_dir, f"clip_{number:03d}.pose")
+            if os.path.exists(out_path):
+                continue
+            start, end = self.frames(number - 1)
+            if end <= start:
+                print(f"Warning: cue {number} has no frames, skipping.")
+                continue
+            with open(out_path + ".tmp", "wb") as f:
+                self.clip(number - 1).write(f)
+            os.replace(out_path + ".tmp", out_path)
+            written.append(out_path)
+        return written
+
+
+def split_broadcast_poses(video_path, ttv_path, pose_path, output_dir, clips=None):
+    """Pose estimation once per broadcast, then a .pose per subtitle cue."""
+    estimate_broadcast_pose(video_path, pose_path)
+    with BroadcastPoses(pose_path, cue_times(ttv_path)) as broadcast:
+        return broadcast.write_clips(output_dir, clips)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Write per-subtitle .pose clips from the .pose of a whole broadcast."
+    )
+    parser.add_argument(
+        "video", help="Broadcast video, e.g. ../data/nrk_tegnspraaknytt/x.mp4"
+    )
+    parser.add_argument("--pose_dir", default="../data/broadcast_poses")
+    parser.add_argument("--output_base_dir", default="../data/processed_nrk")
+    parser.add_argument(
+        "--clips", type=int, nargs="+", default=None, help="Clip numbers to write"
+    )
+    args = parser.parse_args()
+
+    video_name = os.path.splitext(os.path.basename(args.video))[0]
+    written = split_broadcast_poses(
+        args.video,
+        os.path.join(os.path.dirname(args.video), video_name + ".nb-ttv.vtt"),
+        os.path.join(args.pose_dir, video_name + ".pose"),
+        os.path.join(args.output_base_dir, video_name),
+        args.clips,
+    )
+    print(f"Wrote {len(written)} clips")
@@ -1,14 +1,27 @@
 import os
+import sys
 import glob
 import pysrt
 from moviepy.editor import VideoFileClip
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
 
+# longest broadcasts first, with durations from data/results/stats/NRK_news.csv
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "data", "results"))
+from scheduling import ScheduledPool, expected_costs
+from subtitle_index import select_clips
+
 # === CONFIG ===
 video_folder = "../data/nrk_tegnspraaknytt"  # folder containing multiple video files
 output_base_dir = "../data/processed_nrk"  # base folder for all clips
 max_workers = 4  # number of videos to process in parallel
+# "clips": cut and re-encode a clip_NNN.mp4 per subtitle, poses estimated per clip
+# "poses": estimate poses once per broadcast and write a clip_NNN.pose per subtitle
+mode = "clips"
+broadcast_pose_dir = "../data/broadcast_poses"  # whole-broadcast .pose files
+# only the cues matching this condition on data/results/subtitle_index.py's index,
+# e.g. "duration_sec BETWEEN 2 AND 6" or "text ILIKE '%valg%'"; None for all
+clip_query = None
 
 # Create base output folder
 os.makedirs(output_base_dir, exist_ok=True)
@@ -21,6 +34,13 @@ video_files = []
 for ext in video_extensions:
     video_files.extend(glob.glob(os.path.join(video_folder, ext)))
 
+# {broadcast: clip numbers} of the selected cues
+selection = select_clips(clip_query) if clip_query else None
+if selection is not None:
+    video_files = [
+        vf for vf in video_files if os.path.splitext(os.path.basename(vf))[0] in selection
+    ]
+
 
 def process_video(video_path):
     video_name = os.path.splitext(os.path.basename(video_path))[0]
@@ -33,12 +53,29 @@ def process_video(video_path):
         return f"Skipped {video_name}"
 
     print(f"\nProcessing video: {video_name}")
+    clips = selection[video_name] if selection is not None else None
+
+    if mode == "poses":
+        # pose_format is only needed in this mode
+        from broadcast_poses import split_broadcast_poses
+
+        # no clip encode/decode round trip and one MediaPipe start per broadcast
+        written = split_broadcast_poses(
+            video_path,
+            ttv_path,
+            os.path.join(broadcast_pose_dir, video_name + ".pose"),
+            output_dir,
+            clips,
+        )
+        return f"Finished {video_name}: {len(written)} new .pose clips"
 
     # Load subtitles and video
     subs = pysrt.open(ttv_path, encoding="utf-8")
     video = VideoFileClip(video_path)
 
     for i, sub in enumerate(tqdm(subs, desc=f"{video_name}", unit="clip"), start=1):
+        if clips is not None and i not in clips:
+            continue
         start = sub.start.ordinal / 1000.0
         end = sub.end.ordinal / 1000.0
 
@@ -54,7 +91,10 @@ def process_video(video_path):
 
 results = []
 with ThreadPoolExecutor(max_workers=max_workers) as executor:
-    futures = [executor.submit(process_video, vf) for vf in video_files]
+    pool = ScheduledPool(executor, max_workers)
+    futures = pool.submit_longest_first(
+        process_video, [(vf,) for vf in video_files], expected_costs(video_files)
+    )
 
     for f in tqdm(
         as_completed(futures), total=len(futures), desc="Videos", unit="video"
@@ -63,5 +103,6 @@ with ThreadPoolExecutor(max_workers=max_workers) as executor:
 
 # Print final summary
 print("\nAll videos processed. Clips saved in:", output_base_dir)
+print(pool.summary())
 for r in results:
     print(r)
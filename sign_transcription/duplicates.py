@@ -0,0 +1,68 @@
+import shutil
+import sys
+from pathlib import Path
+from segments import merge_segments, read_segments, segment_table, write_segments
+
+# the near-duplicate groups are built by data/results/video_dedup.py
+sys.path.append(str(Path(__file__).resolve().parent.parent / "data" / "results"))
+
+OUTPUT_SUFFIXES = (".pose", ".eaf")
+
+
+def find_duplicates(video_dir: Path):
+    """{video: representative video} of the near-duplicates in video_dir, see video_dedup.py."""
+    from video_dedup import duplicate_map
+
+    return duplicate_map(video_dir)
+
+
+def _predictions(data_dir: Path):
+    path = data_dir / "prediction.txt"
+    if not path.exists():
+        return []
+    with open(path) as f:
+        return [line.rstrip("\n").split(" ", 1) for line in f if " " in line]
+
+
+def fan_out(duplicates):
+    """
+    Give every duplicate video its representative's results: copies of the
+    .pose and .eaf files, its prediction.txt lines and its segments.parquet
+    rows under the duplicate's name. Returns the duplicates that got results.
+    """
+    done = []
+    for video, representative in sorted(duplicates.items()):
+        video, representative = Path(video), Path(representative)
+        copied = False
+        for suffix in OUTPUT_SUFFIXES:
+            source = representative.with_suffix(suffix)
+            target = video.with_suffix(suffix)
+            if source.exists():
+                if not target.exists():
+                    shutil.copyfile(source, target)
+                copied = True
+
+        predictions = _predictions(video.parent)
+        if not any(stem == video.stem for stem, _ in predictions):
+            lines = [
+                f"{video.stem} {pred}\n"
+                for stem, pred in _predictions(representative.parent)
+                if stem == representative.stem
+            ]
+            with open(video.parent / "prediction.txt", "a") as f:
+                f.writelines(lines)
+            copied = copied or bool(lines)
+
+        source_segments = read_segments(representative.parent)
+        if source_segments is not None:
+            rows = source_segments[source_segments["clip"] == representative.stem]
+            if len(rows):
+                rows = rows.astype({"clip": object}).assign(clip=video.stem)
+                segments = merge_segments(
+                    read_segments(video.parent), segment_table(rows)
+                )
+                write_segments(segments, video.parent)
+                copied = True
+        if copied:
+            done.append(video)
+    return done
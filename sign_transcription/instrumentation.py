@@ -0,0 +1,391 @@
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+# histogram buckets (seconds) for the Prometheus metrics
+BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _drain(stream, chunks):
+    chunks.append(stream.read())
+    stream.close()
+
+
+def _kill_group(proc, killed):
+    killed.set()
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        proc.kill()
+
+
+def _run_with_usage(cmd, capture_output=False, timeout=None, **kwargs):
+    """
+    subprocess.run, but the child is reaped with os.wait4 to get its own CPU
+    time and peak RSS. After timeout seconds the child's whole process group is
+    killed. Returns (CompletedProcess, rusage or None, timed_out).
+    """
+    if not hasattr(os, "wait4"):
+        try:
+            process = subprocess.run(
+                cmd, capture_output=capture_output, timeout=timeout, **kwargs
+            )
+        except subprocess.TimeoutExpired as e:
+            return (
+                subprocess.CompletedProcess(cmd, None, e.output, e.stderr),
+                None,
+                True,
+            )
+        return process, None, False
+
+    pipe = subprocess.PIPE if capture_output else None
+    proc = subprocess.Popen(
+        cmd, stdout=pipe, stderr=pipe, start_new_session=timeout is not None, **kwargs
+    )
+    outputs = {"stdout": [], "stderr": []}
+    threads = []
+    if capture_output:
+        for name in outputs:
+            thread = threading.Thread(
+                target=_drain, args=(getattr(proc, name), outputs[name]), daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+    killed = threading.Event()
+    timer = threading.Timer(timeout, _kill_group, args=(proc, killed))
+    if timeout is not None:
+        timer.start()
+    _, status, usage = os.wait4(proc.pid, 0)
+    timer.cancel()
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    for thread in threads:
+        # a leftover grandchild may still hold the pipe open
+        thread.join(timeout=5)
+    stdout = stderr = None
+    if capture_output:
+        empty = "" if kwargs.get("text") else b""
+        stdout = empty.join(outputs["stdout"])
+        stderr = empty.join(outputs["stderr"])
+    process = subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+    return process, usage, killed.is_set()
+
+
+async def _read_lines(pipe, on_line=None):
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=1 << 20)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+    lines = []
+    async for raw in reader:
+        line = raw.decode(errors="replace")
+        lines.append(line)
+        if on_line is not None:
+            on_line(line)
+    return "".join(lines)
+
+
+async def _run_with_usage_async(cmd, timeout=None, on_line=None):
+    """
+    Async _run_with_usage with text output. The pipes are read on the event
+    loop while os.wait4 waits for the child in the loop's executor, so the
+    child's own CPU time and peak RSS are still available.
+    """
+    proc = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True
+    )
+    readers = asyncio.gather(
+        _read_lines(proc.stdout, on_line), _read_lines(proc.stderr)
+    )
+    loop = asyncio.get_running_loop()
+    wait = loop.run_in_executor(None, os.wait4, proc.pid, 0)
+    killed = threading.Event()
+    try:
+        _, status, usage = await asyncio.wait_for(asyncio.shield(wait), timeout)
+    except asyncio.TimeoutError:
+        _kill_group(proc, killed)
+        _, status, usage = await wait
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    try:
+        # a leftover grandchild may still hold the pipes open
+        stdout, stderr = await asyncio.wait_for(readers, 5)
+    except asyncio.TimeoutError:
+        stdout = stderr = ""
+    process = subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+    return process, usage, killed.is_set()
+
+
+def percentile(values, q):
+    """Nearest-rank percentile, q in [0, 100]."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(1, -(-q * len(ordered) // 100))
+    return ordered[int(rank) - 1]
+
+
+class Tracer:
+    """
+    Per-clip, per-stage spans of the pipeline's tool calls: wall and CPU time,
+    peak RSS, exit code and bytes in/out. Spans are appended to a JSONL trace
+    and aggregated into a Prometheus text file (node_exporter textfile format).
+    Without paths the spans are only kept in memory for summary().
+    """
+
+    def __init__(self, trace_path=None, metrics_path=None, metrics_interval=10.0):
+        self.trace_path = Path(trace_path) if trace_path else None
+        self.metrics_path = Path(metrics_path) if metrics_path else None
+        self.metrics_interval = metrics_interval
+        self.run_id = f"{os.getpid()}-{int(time.time())}"
+        self.spans = []
+        self._lock = threading.Lock()
+        self._metrics_written = 0.0
+
+    def run(self, stage, clip, cmd, inputs=(), outputs=(), timeout=None, **kwargs):
+        """
+        Run cmd like subprocess.run and record a span for (stage, clip).
+        Raises subprocess.TimeoutExpired (after recording) if cmd timed out.
+        """
+        start = time.time()
+        wall_start = time.perf_counter()
+        process, usage, timed_out = _run_with_usage(cmd, timeout=timeout, **kwargs)
+        wall = time.perf_counter() - wall_start
+        self._record_run(
+            stage, clip, start, wall, process, usage, timed_out, inputs, outputs
+        )
+        if timed_out:
+            raise subprocess.TimeoutExpired(
+                cmd, timeout, output=process.stdout, stderr=process.stderr
+            )
+        return process
+
+    async def run_async(
+        self, stage, clip, cmd, inputs=(), outputs=(), timeout=None, on_line=None
+    ):
+        """
+        Async run with the output as text; on_line is called with every stdout
+        line as it arrives. Raises subprocess.TimeoutExpired like run.
+        """
+        start = time.time()
+        wall_start = time.perf_counter()
+        process, usage, timed_out = await _run_with_usage_async(cmd, timeout, on_line)
+        wall = time.perf_counter() - wall_start
+        self._record_run(
+            stage, clip, start, wall, process, usage, timed_out, inputs, outputs
+        )
+        if timed_out:
+            raise subprocess.TimeoutExpired(
+                cmd, timeout, output=process.stdout, stderr=process.stderr
+            )
+        return process
+
+    @contextmanager
+    def span(self, stage, clip, inputs=(), outputs=()):
+        """
+        Record a span for (stage, clip) of work done in this process instead of
+        a tool call (CPU time of this thread, no RSS). The exit code is 1 if
+        the block raised, timed_out whether it raised TimeoutError.
+        """
+        start = time.time()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        exit_code, timed_out = 1, False
+        try:
+            yield
+            exit_code = 0
+        except TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.record(
+                {
+                    "run_id": self.run_id,
+                    "stage": stage,
+                    "clip": str(clip),
+                    "start": start,
+                    "wall_seconds": time.perf_counter() - wall_start,
+                    "cpu_user_seconds": time.thread_time() - cpu_start,
+                    "cpu_system_seconds": None,
+                    "max_rss_bytes": None,
+                    "exit_code": exit_code,
+                    "timed_out": timed_out,
+                    "bytes_in": sum(_file_size(p) for p in inputs),
+                    "bytes_out": sum(_file_size(p) for p in outputs),
+                }
+            )
+
+    def _record_run(
+        self, stage, clip, start, wall, process, usage, timed_out, inputs, outputs
+    ):
+        bytes_out = sum(_file_size(p) for p in outputs)
+        for stream in (process.stdout, process.stderr):
+            if stream:
+                bytes_out += len(stream.encode() if isinstance(stream, str) else stream)
+        self.record(
+            {
+                "run_id": self.run_id,
+                "stage": stage,
+                "clip": str(clip),
+                "start": start,
+                "wall_seconds": wall,
+                "cpu_user_seconds": usage.ru_utime if usage else None,
+                "cpu_system_seconds": usage.ru_stime if usage else None,
+                # ru_maxrss is in kilobytes on Linux, bytes on macOS
+                "max_rss_bytes": (
+                    usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+                    if usage
+                    else None
+                ),
+                "exit_code": process.returncode,
+                "timed_out": timed_out,
+                "bytes_in": sum(_file_size(p) for p in inputs),
+                "bytes_out": bytes_out,
+            }
+        )
+
+    def record(self, span):
+        with self._lock:
+            self.spans.append(span)
+            if self.trace_path:
+                with open(self.trace_path, "a") as f:
+                    f.write(json.dumps(span) + "\n")
+            if (
+                self.metrics_path
+                and time.time() - self._metrics_written >= self.metrics_interval
+            ):
+                self._write_metrics()
+
+    def close(self):
+        with self._lock:
+            if self.metrics_path:
+                self._write_metrics()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _write_metrics(self):
+        tmp_path = self.metrics_path.with_suffix(".tmp")
+        tmp_path.write_text(prometheus_metrics(self.spans))
+        os.replace(tmp_path, self.metrics_path)
+        self._metrics_written = time.time()
+
+    def summary(self):
+        return summarize_spans(self.spans)
+
+
+def prometheus_metrics(spans):
+    """Prometheus text exposition of the spans, aggregated per stage."""
+    by_stage = defaultdict(list)
+    for span in spans:
+        by_stage[span["stage"]].append(span)
+
+    lines = [
+        "# HELP pipeline_stage_seconds Wall time of one tool call per clip.",
+        "# TYPE pipeline_stage_seconds histogram",
+    ]
+    for stage, stage_spans in sorted(by_stage.items()):
+        walls = [s["wall_seconds"] for s in stage_spans]
+        for bucket in BUCKETS:
+            count = sum(w <= bucket for w in walls)
+            lines.append(
+                f'pipeline_stage_seconds_bucket{{stage="{stage}",le="{bucket}"}} {count}'
+            )
+        lines.append(
+            f'pipeline_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {len(walls)}'
+        )
+        lines.append(f'pipeline_stage_seconds_sum{{stage="{stage}"}} {sum(walls)}')
+        lines.append(f'pipeline_stage_seconds_count{{stage="{stage}"}} {len(walls)}')
+
+    counters = [
+        ("cpu_seconds_total", "CPU time (user + system) of the tool calls.", None),
+        ("failures_total", "Tool calls with a non-zero exit code.", None),
+        ("bytes_in_total", "Bytes of input files read by the tool calls.", "bytes_in"),
+        ("bytes_out_total", "Bytes of output files and captured output.", "bytes_out"),
+    ]
+    for name, help_text, field in counters:
+        lines += [
+            f"# HELP pipeline_stage_{name} {help_text}",
+            f"# TYPE pipeline_stage_{name} counter",
+        ]
+        for stage, stage_spans in sorted(by_stage.items()):
+            if name == "cpu_seconds_total":
+                value = sum(
+                    (s["cpu_user_seconds"] or 0) + (s["cpu_system_seconds"] or 0)
+                    for s in stage_spans
+                )
+            elif name == "failures_total":
+                value = sum(s["exit_code"] != 0 for s in stage_spans)
+            else:
+                value = sum(s[field] for s in stage_spans)
+            lines.append(f'pipeline_stage_{name}{{stage="{stage}"}} {value}')
+
+    lines += [
+        "# HELP pipeline_stage_max_rss_bytes Largest peak RSS of a tool call.",
+        "# TYPE pipeline_stage_max_rss_bytes gauge",
+    ]
+    for stage, stage_spans in sorted(by_stage.items()):
+        rss = [s["max_rss_bytes"] for s in stage_spans if s["max_rss_bytes"]]
+        lines.append(
+            f'pipeline_stage_max_rss_bytes{{stage="{stage}"}} {max(rss, default=0)}'
+        )
+    return "\n".join(lines) + "\n"
+
+
+def summarize_spans(spans, stragglers=5):
+    """Text report: latency p50/p95/max per stage and the slowest clips."""
+    by_stage = defaultdict(list)
+    for span in spans:
+        by_stage[span["stage"]].append(span)
+
+    lines = [
+        f"{'stage':<16}{'calls':>7}{'failed':>8}{'p50 s':>9}{'p95 s':>9}"
+        f"{'max s':>9}{'cpu s':>9}{'rss MB':>9}"
+    ]
+    for stage, stage_spans in sorted(by_stage.items()):
+        walls = [s["wall_seconds"] for s in stage_spans]
+        cpu = sum(
+            (s["cpu_user_seconds"] or 0) + (s["cpu_system_seconds"] or 0)
+            for s in stage_spans
+        )
+        rss = max((s["max_rss_bytes"] or 0 for s in stage_spans), default=0)
+        lines.append(
+            f"{stage:<16}{len(walls):>7}{sum(s['exit_code'] != 0 for s in stage_spans):>8}"
+            f"{percentile(walls, 50):>9.2f}{percentile(walls, 95):>9.2f}"
+            f"{max(walls):>9.2f}{cpu:>9.1f}{rss / 2**20:>9.0f}"
+        )
+
+    slowest = sorted(spans, key=lambda s: s["wall_seconds"], reverse=True)
+    if slowest[:stragglers]:
+        lines.append("Slowest clips:")
+        for span in slowest[:stragglers]:
+            lines.append(
+                f"  {span['wall_seconds']:8.2f}s  {span['stage']:<14} {span['clip']}"
+                f" (exit {span['exit_code']})"
+            )
+    return "\n".join(lines)
+
+
+def read_trace(trace_path):
+    with open(trace_path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == "__main__":
+    # summarize an existing trace: python instrumentation.py pipeline_trace.jsonl
+    print(summarize_spans(read_trace(sys.argv[1])))
@@ -1,45 +1,151 @@
 from pathlib import Path
+from functools import partial
 import os
+import sys
 from segmentation import run_segmentation
 from transcription import run_transcription
+from transcription_batched import run_transcription_batched
 from pose import get_poses, visualize_pose, normalize_poses
+from instrumentation import Tracer
+from duplicates import fan_out, find_duplicates
 from tqdm import tqdm
 
+# tool calls run at the same time per directory, each loads its own model
+CONCURRENCY = max(1, (os.cpu_count() or 1) // 2)
+# "onnx" for the int8-quantized segmentation model, see segmentation_onnx.py
+SEGMENTATION_BACKEND = "torch"
+# with the onnx backend: keep segments in a table (segments.py) handed to
+# transcription instead of an .eaf per clip; export .eaf with segments.py
+SEGMENTS_IN_MEMORY = False
+# sign segments of many clips per pose_to_signwriting call, e.g. 256 for short
+# single-sign clips (see transcription_batched.py); None for one call per clip
+TRANSCRIPTION_BATCH_SIZE = None
+# "fast"/"fastest" estimate poses on fewer, smaller frames, see pose.POSE_PROFILES
+POSE_PROFILE = "full"
+# only the clips matching this condition on the subtitle index
+# (data/results/subtitle_index.py), e.g. "duration_sec BETWEEN 2 AND 6"; None for all
+CLIP_QUERY = None
+# process one video per group of near-duplicates (data/results/video_dedup.py)
+# and copy its results to the others
+DEDUPLICATE = False
+
 
 def only_contains_dirs_pathlib(directory_path):
     """Checks if a directory only contains subdirectories using pathlib."""
     return all(entry.is_dir() for entry in directory_path.iterdir())
 
 
+def is_processed(subdir):
+    # Superficial check, does not guarantee processing of all files in subdir is done.
+    return any(subdir.glob("*.eaf")) and any(subdir.glob("*.bak"))
+
+
+def select_clips(where):
+    """{broadcast: clip names} of the subtitle index rows matching where."""
+    sys.path.append(str(Path(__file__).resolve().parent.parent / "data" / "results"))
+    import subtitle_index
+
+    return {
+        broadcast: {f"clip_{clip:03d}" for clip in clips}
+        for broadcast, clips in subtitle_index.select_clips(where).items()
+    }
+
+
+def transcription_stage(**kwargs):
+    """run_transcription, or run_transcription_batched with TRANSCRIPTION_BATCH_SIZE."""
+    if TRANSCRIPTION_BATCH_SIZE:
+        return partial(
+            run_transcription_batched, batch_size=TRANSCRIPTION_BATCH_SIZE, **kwargs
+        )
+    return partial(run_transcription, **kwargs)
+
+
+def process_subdirectories(
+    data_dir: Path, stages=(run_transcription,), selection=None, deduplicate=False
+):
+    """
+    Run the pipeline stages on every subdirectory of data_dir (e.g.
+    processed_NRK), or with a selection ({subdirectory name: clip names}) only
+    on the selected clips, passed to the stages as only= (the other clips'
+    predictions in prediction.txt are kept). With deduplicate, near-duplicates
+    of another clip (e.g. re-aired NRK segments) are left out and get their
+    representative's results afterwards, as for a single directory.
+    """
+    subdirectories = list(data_dir.iterdir())
+    if selection is not None:
+        subdirectories = [d for d in subdirectories if d.name in selection]
+    for subdir in tqdm(subdirectories, desc="Processing subdirectories:"):
+        tqdm.write(f"Processing subdirectory: {subdir}")
+        if is_processed(subdir):
+            tqdm.write(f"Skipping {subdir}: .eaf and .bak files found")
+            continue
+        # get_poses(subdir)
+        # normalize_poses(subdir, subdir)
+        only = None if selection is None else set(selection[subdir.name])
+        duplicates = find_duplicates(subdir) if deduplicate else {}
+        if only is not None:
+            duplicates = {v: r for v, r in duplicates.items() if v.stem in only}
+        if duplicates:
+            if only is None:
+                only = {p.stem for p in subdir.glob("*.pose")}
+            # a selected duplicate's results come from its representative
+            only -= {p.stem for p in duplicates}
+            only |= {
+                r.stem for r in duplicates.values() if r.parent == subdir.resolve()
+            }
+            tqdm.write(f"Skipping {len(duplicates)} near-duplicate clips")
+        for stage in stages:
+            if only is None:
+                stage(subdir)
+            else:
+                stage(subdir, only=only)
+        fan_out(duplicates)
+
+
 if __name__ == "__main__":
     dir = "../data/processed_NRK"
     # directory containing your .pose and .mp4 files
     data_dir = Path(dir)
+    # per-clip timings of the tool calls, summarized at the end
+    tracer = Tracer("pipeline_trace.jsonl", "pipeline_metrics.prom")
     # make .pose files in video directory
     if only_contains_dirs_pathlib(data_dir):
-        subdirectories = list(data_dir.iterdir())
-        for subdir in tqdm(subdirectories, desc="Processing subdirectories:"):
-            tqdm.write(f"Processing subdirectory: {subdir}")
-            if any(subdir.glob("*.eaf")) and any(
-                subdir.glob("*.bak")
-            ):  # Superficial check, does not guarantee processing of all files in subdir is done.
-                tqdm.write(f"Skipping {subdir}: .eaf and .bak files found")
-                continue
-            else:
-                # get_poses(subdir)
-                # normalize_poses(subdir, subdir)
-                # run_segmentation(subdir)
-                run_transcription(subdir)
+        # stages run per subdirectory, e.g. (run_segmentation, run_transcription)
+        process_subdirectories(
+            data_dir,
+            stages=(transcription_stage(tracer=tracer, concurrency=CONCURRENCY),),
+            selection=select_clips(CLIP_QUERY) if CLIP_QUERY else None,
+            deduplicate=DEDUPLICATE,
+        )
 
     else:
-        get_poses(data_dir)
+        duplicates = find_duplicates(data_dir) if DEDUPLICATE else {}
+        only = None
+        if duplicates:
+            only = {p.stem for p in data_dir.glob("*.mp4")} - {
+                p.stem for p in duplicates
+            }
+            print(f"Skipping {len(duplicates)} near-duplicate videos")
+        get_poses(data_dir, POSE_PROFILE, only=only)
         # create visuals of the poses. Optional:
         # visualize_pose(data_dir, "pose_visuals/")
         # normalize the poses
         normalize_poses(data_dir, data_dir)
 
         # creating .eaf (segmentations) files for the poses
-        run_segmentation(data_dir)
+        segments = run_segmentation(
+            data_dir,
+            tracer=tracer,
+            concurrency=CONCURRENCY,
+            backend=SEGMENTATION_BACKEND,
+            in_memory=SEGMENTS_IN_MEMORY,
+            only=only,
+        )
 
         # creating SignWriting annotations of the .pose files
-        run_transcription(data_dir)
+        transcribe = transcription_stage(tracer=tracer, concurrency=CONCURRENCY)
+        transcribe(data_dir, segments=segments, only=only)
+        fan_out(duplicates)
+
+    tracer.close()
+    print(tracer.summary())
@@ -4,11 +4,104 @@ import subprocess, sys
 import importlib.util
 import os
 from pathlib import Path
+import numpy as np
 from pose_format.pose import Pose
-from pose_format.pose_visualizer import PoseVisualizer
 
+# stride: MediaPipe runs on every stride-th frame and the keypoints of the
+# frames in between are interpolated; scale: of the frame size MediaPipe gets
+POSE_PROFILES = {
+    "full": dict(stride=1, scale=1.0, model_complexity=1),
+    "fast": dict(stride=2, scale=0.5, model_complexity=1),
+    "fastest": dict(stride=3, scale=0.5, model_complexity=0),
+}
 
-def get_poses(dir: Path):
+
+def interpolate_frames(data, confidence, frames, n_frames):
+    """
+    Keypoints estimated at the (sorted) frame indices frames, linearly
+    interpolated to all n_frames; frames after the last estimate keep it. A
+    point is missing (confidence 0) where either neighbouring estimate misses it.
+    """
+    frames = np.asarray(frames)
+    t = np.arange(n_frames)
+    right = np.minimum(np.searchsorted(frames, t), len(frames) - 1)
+    left = np.where(frames[right] > t, np.maximum(right - 1, 0), right)
+    span = frames[right] - frames[left]
+    weight = np.where(span > 0, (t - frames[left]) / np.maximum(span, 1), 0.0)
+
+    w = weight.reshape(-1, *([1] * (data.ndim - 1))).astype(np.float32)
+    out_data = data[left] * (1 - w) + data[right] * w
+    out_confidence = np.where(
+        weight.reshape(-1, *([1] * (confidence.ndim - 1))) > 0,
+        np.minimum(confidence[left], confidence[right]),
+        confidence[left],
+    )
+    out_data[out_confidence == 0] = 0
+    return out_data, out_confidence
+
+
+def estimate_pose(
+    video_path: Path, pose_path: Path, stride=1, scale=1.0, model_complexity=1
+):
+    """
+    MediaPipe holistic on every stride-th frame of the video, downscaled by
+    scale, with the skipped frames interpolated. Keypoints stay in the pixel
+    coordinates of the full-size video.
+    """
+    import cv2
+    from pose_format.numpy.pose_body import NumPyPoseBody
+    from pose_format.utils.holistic import load_holistic
+
+    cap = cv2.VideoCapture(str(video_path))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    sampled = []
+    n_frames = 0
+
+    def frames():
+        nonlocal n_frames
+        while True:
+            if n_frames % stride:
+                # skipped frames are only demuxed, not converted
+                if not cap.grab():
+                    return
+            else:
+                ok, frame = cap.read()
+                if not ok:
+                    return
+                if scale != 1.0:
+                    frame = cv2.resize(
+                        frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+                    )
+                sampled.append(n_frames)
+                yield cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            n_frames += 1
+
+    try:
+        pose = load_holistic(
+            frames(),
+            fps=fps,
+            width=width,
+            height=height,
+            additional_holistic_config={"model_complexity": model_complexity},
+        )
+    finally:
+        cap.release()
+
+    if stride > 1:
+        data, confidence = interpolate_frames(
+            pose.body.data.filled(0), pose.body.confidence, sampled, n_frames
+        )
+        mask = np.repeat((confidence == 0)[..., np.newaxis], data.shape[-1], axis=-1)
+        pose.body = NumPyPoseBody(fps, np.ma.masked_array(data, mask=mask), confidence)
+    with open(pose_path, "wb") as f:
+        pose.write(f)
+    return pose
+
+
+def get_poses(dir: Path, profile="full", only=None):
+    """only: names of the videos to estimate poses of (e.g. {"alarm"}), default all."""
     # installing
     if importlib.util.find_spec("pose-format") is not None:
         print("Pose format already exists.")
@@ -23,13 +116,39 @@ def get_poses(dir: Path):
             ]
         )
 
-    # testing for a single sign.
-    subprocess.run(
-        ["videos_to_poses", "--format", "mediapipe", "--directory", str(dir)]
-    )
+    if profile == "full" and only is None:
+        # testing for a single sign.
+        subprocess.run(
+            ["videos_to_poses", "--format", "mediapipe", "--directory", str(dir)]
+        )
+        return
+
+    # one video at a time: the videos in only with the full profile, or
+    # strided, downscaled estimation (see POSE_PROFILES)
+    for video_path in sorted(dir.glob("*.mp4")):
+        pose_path = video_path.with_suffix(".pose")
+        if pose_path.exists() or (only is not None and video_path.stem not in only):
+            continue
+        if profile == "full":
+            subprocess.run(
+                [
+                    "video_to_pose",
+                    "--format",
+                    "mediapipe",
+                    "-i",
+                    str(video_path),
+                    "-o",
+                    str(pose_path),
+                ]
+            )
+        else:
+            estimate_pose(video_path, pose_path, **POSE_PROFILES[profile])
 
 
 def visualize_pose(pose_dir: Path, output_dir: str):
+    # imported here, it pulls in OpenCV which normalizing does not need
+    from pose_format.pose_visualizer import PoseVisualizer
+
     # Make output folder
     os.makedirs(str(output_dir), exist_ok=True)
 
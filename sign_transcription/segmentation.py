@@ -1,11 +1,21 @@
 import subprocess, sys
 import importlib.util
+from functools import partial
 from pathlib import Path
 from tqdm import tqdm
+from supervisor import Supervisor, run_in_order
+from segmentation_onnx import (
+    export_onnx,
+    load_session,
+    onnx_model_path,
+    segment_clip_rows,
+)
+from segments import merge_segments, read_segments, segment_table, write_segments
 
+ONNX_SCRIPT = Path(__file__).resolve().parent / "segmentation_onnx.py"
 
-def run_segmentation(data_dir: Path):
-    # installing
+
+def install_segmentation(backend="torch"):
     if importlib.util.find_spec("segmentation") is not None:
         print("Sign segmentation already exists.")
     else:
@@ -18,6 +28,11 @@ def run_segmentation(data_dir: Path):
                 "git+https://github.com/sign-language-processing/segmentation",
             ]
         )
+    if backend == "onnx":
+        # the quantized model runs on onnxruntime, torch (whatever version the
+        # package pulled in) is only used once to export it
+        subprocess.run([sys.executable, "-m", "pip", "install", "onnxruntime", "onnx"])
+        return
     subprocess.run(
         [
             sys.executable,
@@ -29,32 +44,151 @@ def run_segmentation(data_dir: Path):
             "torchaudio==2.2.1",
         ]
     )
+
+
+def ensure_onnx_model(data_dir: Path):
+    """
+    Export the ONNX model unless it exists, traced on the first .pose of
+    data_dir (or signdict_examples); without any, every clip would fail.
+    """
+    if onnx_model_path().exists():
+        return
+    sample = next(Path(data_dir).glob("*.pose"), None) or next(
+        Path("signdict_examples").glob("*.pose"), None
+    )
+    if sample is None:
+        raise FileNotFoundError(
+            f"No ONNX segmentation model at {onnx_model_path()} and no .pose file "
+            "to export it from; run `python3 segmentation_onnx.py export <pose>`"
+        )
+    export_onnx(sample)
+
+
+def segmentation_args(pose_path: Path, backend="torch"):
+    """(args, kwargs) of Supervisor.run/run_async for segmenting one clip."""
+    elan_path = pose_path.with_suffix(".eaf")
+    video_path = pose_path.with_suffix(".mp4")
+    # Run the segmentation command, a half-written .eaf is removed on failure
+    if backend == "onnx":
+        tool = [sys.executable, str(ONNX_SCRIPT), "segment"]
+    else:
+        tool = ["pose_to_segments"]
+    cmd = [
+        *tool,
+        "--pose",
+        str(pose_path),
+        "--elan",
+        str(elan_path),
+        "--video",
+        str(video_path),
+    ]
+    kwargs = dict(
+        check=lambda _: elan_path.exists(),
+        cleanup=[elan_path],
+        inputs=[pose_path],
+        outputs=[elan_path],
+    )
+    return ("segmentation", pose_path, cmd), kwargs
+
+
+def segment_clip(pose_path: Path, supervisor, backend="torch"):
+    """Segment one clip unless its .eaf exists; returns whether the .eaf is there."""
+    if pose_path.with_suffix(".eaf").exists():
+        return True
+    args, kwargs = segmentation_args(pose_path, backend)
+    process = supervisor.run(*args, **kwargs, capture_output=True, text=True)
+    return process is not None
+
+
+def segment_in_memory(data_dir: Path, pose_files, supervisor, quarantined=()):
+    """
+    Segment the clips without rows in segments.parquet in this process with
+    one model session; all segments of data_dir. Each clip is run through
+    supervisor.call, so it gets a span, a timeout and, if it keeps failing,
+    an entry in failures.jsonl, and later runs skip it like a failed tool call.
+    """
+    existing = read_segments(data_dir)
+    done = set(existing["clip"]) if existing is not None else set()
+    todo = []
+    for pose_path in pose_files:
+        if pose_path.name in quarantined:
+            tqdm.write(f"Skipping {pose_path.stem}: quarantined after failing before")
+        elif pose_path.stem not in done:
+            todo.append(pose_path)
+    if not todo:
+        return existing
+
+    session = load_session()
+    rows = []
+    for pose_path in tqdm(todo, desc="Segmenting pose files"):
+        clip_rows = supervisor.call(
+            "segmentation",
+            pose_path,
+            partial(segment_clip_rows, session=session),
+            inputs=[pose_path],
+        )
+        if clip_rows is not None:
+            rows += clip_rows
+    if not rows:
+        return existing
+    segments = merge_segments(existing, segment_table(rows))
+    write_segments(segments, data_dir)
+    return segments
+
+
+def run_segmentation(
+    data_dir: Path,
+    install=True,
+    tracer=None,
+    supervisor=None,
+    concurrency=1,
+    backend="torch",
+    only=None,
+    in_memory=False,
+):
+    """
+    backend "torch" runs pose_to_segments, "onnx" the int8-quantized export of
+    the same model on onnxruntime (segmentation_onnx.py), which is faster on
+    CPU; check it with `segmentation_onnx.py parity` on clips segmented before.
+    only: names of the clips to segment (e.g. {"clip_003"}), default all.
+    in_memory (onnx only): segment in this process with one model session and
+    return the segments table (see segments.py), also saved to segments.parquet,
+    instead of writing an .eaf per clip.
+    """
+    if install:
+        install_segmentation(backend)
+    if backend == "onnx":
+        ensure_onnx_model(data_dir)
+    supervisor = supervisor or Supervisor(tracer)
+    quarantined = supervisor.quarantined(data_dir, "segmentation")
+
     # Find all .pose files
     pose_files = sorted(data_dir.glob("*.pose"))
+    if only is not None:
+        pose_files = [p for p in pose_files if p.stem in only]
 
-    for pose_path in tqdm(pose_files, desc="Processing pose files"):
+    if in_memory:
+        if backend != "onnx":
+            raise ValueError("in_memory segmentation needs the onnx backend")
+        return segment_in_memory(data_dir, pose_files, supervisor, quarantined)
+
+    jobs = []
+    for pose_path in pose_files:
         base_name = pose_path.stem  # e.g. "alarm" from "alarm.pose"
         elan_path = data_dir / f"{base_name}.eaf"
-        video_path = data_dir / f"{base_name}.mp4"
 
         if elan_path.exists():
             tqdm.write(f"Skipping {base_name}: {elan_path.name} found")
             continue
+        if pose_path.name in quarantined:
+            tqdm.write(f"Skipping {base_name}: quarantined after failing before")
+            continue
 
-        tqdm.write(f"Processing {base_name}")
+        args, kwargs = segmentation_args(pose_path, backend)
+        jobs.append(partial(supervisor.run_async, *args, **kwargs))
 
-        # Run the segmentation command
-        subprocess.run(
-            [
-                "pose_to_segments",
-                "--pose",
-                str(pose_path),
-                "--elan",
-                str(elan_path),
-                "--video",
-                str(video_path),
-            ]
-        )
+    # up to concurrency tool calls at a time
+    run_in_order(jobs, concurrency, desc="Processing pose files")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,296 @@
+import argparse
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+import numpy as np
+from pose_format import Pose
+from pose_format.utils.generic import pose_hide_legs, pose_normalization_info
+from segments import from_tiers
+
+MODEL_NAME = "model_E1s-1.pth"
+ONNX_DIR = Path(__file__).resolve().parent / "models"
+# BIO thresholds of pose_to_segments for the sign and sentence tiers
+THRESHOLDS = {"SIGN": (60, 50), "SENTENCE": (90, 90)}
+BIO = {"O": 0, "B": 1, "I": 2}
+
+
+def torch_model_path(model_name=MODEL_NAME):
+    """The TorchScript model shipped with the segmentation package."""
+    import sign_language_segmentation
+
+    return Path(sign_language_segmentation.__file__).parent / "dist" / model_name
+
+
+def onnx_model_path(model_name=MODEL_NAME):
+    return ONNX_DIR / f"{Path(model_name).stem}.int8.onnx"
+
+
+def load_pose(pose_path: Path, model_name=MODEL_NAME):
+    """Read and normalize a pose as pose_to_segments does for model_name."""
+    with open(pose_path, "rb") as f:
+        pose = Pose.read(f.read())
+    if "E4" in model_name:
+        # optical flow and hand normalization, only the package has them
+        from sign_language_segmentation.bin import process_pose
+
+        return process_pose(pose, optical_flow=True, hand_normalization=True)
+    # the package's process_pose without importing torch, which takes longer
+    # to import than the ONNX model takes to segment a clip
+    pose = pose.get_components(
+        ["POSE_LANDMARKS", "LEFT_HAND_LANDMARKS", "RIGHT_HAND_LANDMARKS"]
+    )
+    pose = pose.normalize(pose_normalization_info(pose.header))
+    return pose_hide_legs(pose)
+
+
+def model_input(pose):
+    """(1, frames, points, dims) float32 array of the first person."""
+    return np.asarray(pose.body.data.data[:, 0], dtype=np.float32)[np.newaxis]
+
+
+def export_onnx(sample_pose: Path, model_name=MODEL_NAME, onnx_path=None):
+    """
+    Export the TorchScript segmentation model to ONNX, traced on a sample
+    clip with the number of frames left dynamic, and quantize its weights to
+    int8. Needs torch once; inference afterwards only needs onnxruntime.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    onnx_path = Path(onnx_path or onnx_model_path(model_name))
+    onnx_path.parent.mkdir(parents=True, exist_ok=True)
+    float_path = onnx_path.with_suffix(".float.onnx")
+
+    model = torch.jit.load(str(torch_model_path(model_name)))
+    model.eval()
+    example = torch.from_numpy(model_input(load_pose(sample_pose, model_name)))
+    torch.onnx.export(
+        model,
+        example,
+        str(float_path),
+        input_names=["pose"],
+        output_names=["sign", "sentence"],
+        dynamic_axes={
+            "pose": {1: "frames"},
+            "sign": {1: "frames"},
+            "sentence": {1: "frames"},
+        },
+        opset_version=17,
+    )
+    quantize_dynamic(str(float_path), str(onnx_path), weight_type=QuantType.QInt8)
+    float_path.unlink()
+    return onnx_path
+
+
+def load_session(onnx_path=None, threads=1):
+    """
+    onnxruntime session of the quantized model. One intra-op thread by
+    default, since clips are segmented in parallel processes.
+    """
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(
+        str(onnx_path or onnx_model_path()),
+        options,
+        providers=["CPUExecutionProvider"],
+    )
+
+
+def predict_onnx(session, pose):
+    """Log-probabilities per tier, as numpy arrays of shape (1, frames, 3)."""
+    sign, sentence = session.run(["sign", "sentence"], {"pose": model_input(pose)})
+    return {"SIGN": sign, "SENTENCE": sentence}
+
+
+def probs_to_segments(logits, b_threshold, o_threshold, restart_on_b=True):
+    """
+    BIO decoding of the segmentation package (probs_to_segments) on numpy
+    log-probabilities, in percent as there. Segments in frames.
+    """
+    probs = np.round(np.exp(logits.squeeze(0)) * 100)
+    if np.all(probs[:, BIO["B"]] < b_threshold):
+        # no clear beginnings: consecutive inside frames make a segment
+        inside = probs[:, BIO["I"]] > o_threshold
+        edges = np.flatnonzero(np.diff(np.concatenate([[0], inside, [0]])))
+        return [
+            {"start": int(start), "end": int(end - 1)}
+            for start, end in zip(edges[::2], edges[1::2])
+        ]
+
+    segments = []
+    segment = {"start": None, "end": None}
+    did_pass_start = False
+    for idx in range(len(probs)):
+        b = float(probs[idx, BIO["B"]])
+        o = float(probs[idx, BIO["O"]])
+        if segment["start"] is None:
+            if b > b_threshold:
+                segment["start"] = idx
+        elif did_pass_start:
+            if (restart_on_b and b > b_threshold) or o > o_threshold:
+                segment["end"] = idx - 1
+                segments.append(segment)
+                segment = {"start": None if o > o_threshold else idx, "end": None}
+                did_pass_start = False
+        elif b < b_threshold:
+            did_pass_start = True
+    if segment["start"] is not None:
+        segment["end"] = len(probs)
+        segments.append(segment)
+    return segments
+
+
+def to_segments(probs):
+    """{tier: [{"start", "end"}]} in frames."""
+    return {
+        tier: probs_to_segments(probs[tier], *THRESHOLDS[tier]) for tier in THRESHOLDS
+    }
+
+
+def write_eaf(elan_path: Path, segments, fps, pose_path=None, video_path=None):
+    """Write the tiers in milliseconds, like pose_to_segments."""
+    import pympi
+
+    eaf = pympi.Elan.Eaf(author="sign-language-processing/transcription")
+    if video_path is not None:
+        eaf.add_linked_file(str(video_path), mimetype="video/mp4")
+    if pose_path is not None:
+        eaf.add_linked_file(str(pose_path), mimetype="application/pose")
+    for tier, tier_segments in segments.items():
+        eaf.add_tier(tier)
+        for segment in tier_segments:
+            eaf.add_annotation(
+                tier,
+                int(segment["start"] / fps * 1000),
+                int(segment["end"] / fps * 1000),
+            )
+    eaf.to_file(str(elan_path))
+
+
+def read_eaf_segments(elan_path: Path):
+    """{tier: [(start_ms, end_ms)]} of an .eaf file."""
+    root = ET.parse(elan_path).getroot()
+    slots = {
+        slot.get("TIME_SLOT_ID"): int(slot.get("TIME_VALUE", 0))
+        for slot in root.iter("TIME_SLOT")
+    }
+    segments = {}
+    for tier in root.iter("TIER"):
+        segments[tier.get("TIER_ID")] = sorted(
+            (slots[a.get("TIME_SLOT_REF1")], slots[a.get("TIME_SLOT_REF2")])
+            for a in tier.iter("ALIGNABLE_ANNOTATION")
+        )
+    return segments
+
+
+def compare_segments(reference, candidate, tolerance_ms):
+    """Counts and boundary differences of one tier's segments against the reference."""
+    boundary_diffs = [
+        max(abs(r[0] - c[0]), abs(r[1] - c[1])) for r, c in zip(reference, candidate)
+    ]
+    return {
+        "reference": len(reference),
+        "candidate": len(candidate),
+        "max_boundary_ms": max(boundary_diffs, default=0),
+        "match": len(reference) == len(candidate)
+        and all(d <= tolerance_ms for d in boundary_diffs),
+    }
+
+
+def parity_check(data_dir: Path, session, tolerance_ms=40, model_name=MODEL_NAME):
+    """
+    Segment the clips of data_dir that already have an .eaf from
+    pose_to_segments (PyTorch) with the ONNX model and compare the tiers.
+    Boundaries may differ by tolerance_ms (one frame at 25 fps by default).
+    Returns one row per clip.
+    """
+    rows = []
+    for pose_path in sorted(Path(data_dir).glob("*.pose")):
+        elan_path = pose_path.with_suffix(".eaf")
+        if not elan_path.exists():
+            continue
+        pose = load_pose(pose_path, model_name)
+        fps = pose.body.fps
+        start = time.perf_counter()
+        segments = to_segments(predict_onnx(session, pose))
+        seconds = time.perf_counter() - start
+        reference = read_eaf_segments(elan_path)
+        row = {"clip": pose_path.name, "seconds": seconds}
+        for tier, tier_segments in segments.items():
+            candidate = [
+                (int(s["start"] / fps * 1000), int(s["end"] / fps * 1000))
+                for s in tier_segments
+            ]
+            row[tier] = compare_segments(
+                reference.get(tier, []), candidate, tolerance_ms
+            )
+        rows.append(row)
+    return rows
+
+
+def print_parity(rows):
+    print(f"{'clip':<28}{'tier':<10}{'torch':>7}{'onnx':>7}{'max ms':>8}  match")
+    for row in rows:
+        for tier in THRESHOLDS:
+            r = row[tier]
+            print(
+                f"{row['clip']:<28}{tier:<10}{r['reference']:>7}{r['candidate']:>7}"
+                f"{r['max_boundary_ms']:>8}  {'yes' if r['match'] else 'NO'}"
+            )
+    matching = sum(all(row[tier]["match"] for tier in THRESHOLDS) for row in rows)
+    seconds = sum(row["seconds"] for row in rows)
+    print(
+        f"{matching}/{len(rows)} clips match, "
+        f"{seconds / max(len(rows), 1):.3f}s of ONNX inference per clip"
+    )
+    return matching == len(rows)
+
+
+def segment_clip_rows(pose_path: Path, session, model_name=MODEL_NAME):
+    """Segment one clip with a loaded session; its rows of the segments table."""
+    pose = load_pose(pose_path, model_name)
+    segments = to_segments(predict_onnx(session, pose))
+    return from_tiers(pose_path.stem, segments, pose.body.fps)
+
+
+def segment(pose_path: Path, elan_path: Path, video_path=None, onnx_path=None):
+    """pose_to_segments with the quantized ONNX model."""
+    pose = load_pose(pose_path)
+    session = load_session(onnx_path)
+    segments = to_segments(predict_onnx(session, pose))
+    write_eaf(elan_path, segments, pose.body.fps, pose_path, video_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sign segmentation with an int8-quantized ONNX model on CPU."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="Export and quantize the model")
+    export.add_argument("sample_pose", type=Path, help="Any clip, to trace the model")
+    export.add_argument("--model", default=MODEL_NAME)
+    run = subparsers.add_parser("segment", help="Drop-in for pose_to_segments")
+    run.add_argument("--pose", type=Path, required=True)
+    run.add_argument("--elan", type=Path, required=True)
+    run.add_argument("--video", type=Path, default=None)
+    run.add_argument("--onnx", type=Path, default=None)
+    parity = subparsers.add_parser(
+        "parity", help="Compare with the .eaf files of pose_to_segments"
+    )
+    parity.add_argument("data_dir", type=Path)
+    parity.add_argument("--onnx", type=Path, default=None)
+    parity.add_argument("--tolerance_ms", type=int, default=40)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(f"Wrote {export_onnx(args.sample_pose, args.model)}")
+    elif args.command == "segment":
+        segment(args.pose, args.elan, args.video, args.onnx)
+    else:
+        rows = parity_check(args.data_dir, load_session(args.onnx), args.tolerance_ms)
+        if not print_parity(rows):
+            raise SystemExit(1)
@@ -0,0 +1,273 @@
+import argparse
+import os
+import xml.etree.ElementTree as ET
+from pathlib import Path
+import pandas as pd
+
+# per directory, next to the clips; src/single_signs/eaf.py reads it too
+SEGMENTS_FILENAME = "segments.parquet"
+SEGMENT_COLUMNS = ["clip", "tier", "start_frame", "end_frame", "value", "fps"]
+TIER_ORDER = ["SIGN", "SENTENCE", "SIGNWRITING"]
+
+
+def segment_table(rows):
+    """
+    Segments as a compact table, one row per (clip, tier, start_frame,
+    end_frame, value, fps): clip and tier dictionary-encoded, frames int32.
+    This is what the pipeline stages hand each other instead of .eaf files.
+    """
+    table = pd.DataFrame(rows, columns=SEGMENT_COLUMNS)
+    return table.astype(
+        {
+            "clip": "category",
+            "tier": "category",
+            "start_frame": "int32",
+            "end_frame": "int32",
+            "value": "object",
+            "fps": "float32",
+        }
+    )
+
+
+def from_tiers(clip, tiers, fps):
+    """
+    Rows of one clip from {tier: [{"start", "end"}]} in frames
+    (segmentation_onnx.to_segments). A clip without any segment gets one row
+    without a tier, so that it counts as segmented.
+    """
+    rows = [
+        (clip, tier, segment["start"], segment["end"], None, fps)
+        for tier, segments in tiers.items()
+        for segment in segments
+    ]
+    return rows or [(clip, None, 0, 0, None, fps)]
+
+
+def from_eaf(eaf_path: Path, fps):
+    """Rows of one clip from an .eaf file, times converted back to frames."""
+    root = ET.parse(eaf_path).getroot()
+    slots = {
+        slot.get("TIME_SLOT_ID"): int(slot.get("TIME_VALUE", 0))
+        for slot in root.iter("TIME_SLOT")
+    }
+    rows = []
+    for tier in root.iter("TIER"):
+        for annotation in tier.iter("ALIGNABLE_ANNOTATION"):
+            value = annotation.findtext("ANNOTATION_VALUE")
+            rows.append(
+                (
+                    Path(eaf_path).stem,
+                    tier.get("TIER_ID"),
+                    round(slots[annotation.get("TIME_SLOT_REF1")] / 1000 * fps),
+                    round(slots[annotation.get("TIME_SLOT_REF2")] / 1000 * fps),
+                    value.strip() or None if value else None,
+                    fps,
+                )
+            )
+    return rows
+
+
+def add_eaf_signwriting(eaf_path: Path, predictions):
+    """
+    Add a SIGNWRITING tier to an .eaf, one prediction per SIGN annotation in
+    time order, as pose_to_signwriting does (replacing one already there).
+    Its annotations use the SIGN annotations' time slots; the rest of the
+    file is left as it is, and it is replaced atomically.
+    """
+    ET.register_namespace("xsi", "http://www.w3.org/2001/XMLSchema-instance")
+    tree = ET.parse(eaf_path)
+    root = tree.getroot()
+    slots = {
+        slot.get("TIME_SLOT_ID"): int(slot.get("TIME_VALUE", 0))
+        for slot in root.iter("TIME_SLOT")
+    }
+    tiers = root.findall("TIER")
+    sign_tier = next(t for t in tiers if t.get("TIER_ID") == "SIGN")
+    signs = sorted(
+        sign_tier.iter("ALIGNABLE_ANNOTATION"),
+        key=lambda a: slots[a.get("TIME_SLOT_REF1")],
+    )
+    for tier in tiers:
+        if tier.get("TIER_ID") == "SIGNWRITING":
+            root.remove(tier)
+
+    ids = [
+        int(a.get("ANNOTATION_ID")[1:])
+        for a in root.iter("ALIGNABLE_ANNOTATION")
+        if a.get("ANNOTATION_ID", "")[1:].isdigit()
+    ]
+    last_id = max(ids, default=0)
+    tier = ET.Element(
+        "TIER",
+        {
+            "LINGUISTIC_TYPE_REF": sign_tier.get("LINGUISTIC_TYPE_REF"),
+            "TIER_ID": "SIGNWRITING",
+        },
+    )
+    for sign, prediction in zip(signs, predictions):
+        last_id += 1
+        alignable = ET.SubElement(
+            ET.SubElement(tier, "ANNOTATION"),
+            "ALIGNABLE_ANNOTATION",
+            {
+                "ANNOTATION_ID": f"a{last_id}",
+                "TIME_SLOT_REF1": sign.get("TIME_SLOT_REF1"),
+                "TIME_SLOT_REF2": sign.get("TIME_SLOT_REF2"),
+            },
+        )
+        ET.SubElement(alignable, "ANNOTATION_VALUE").text = prediction
+    # after the last tier, before the linguistic types
+    children = list(root)
+    root.insert(max(children.index(t) for t in root.findall("TIER")) + 1, tier)
+    ET.indent(tier, space="    ", level=1)
+    tier.tail = sign_tier.tail
+    for prop in root.iter("PROPERTY"):
+        if prop.get("NAME") == "lastUsedAnnotationId":
+            prop.text = str(last_id)
+
+    tmp_path = Path(eaf_path).with_name(f"{Path(eaf_path).name}.{os.getpid()}.tmp")
+    tree.write(tmp_path, encoding="UTF-8", xml_declaration=True)
+    os.replace(tmp_path, eaf_path)
+
+
+def read_segments(data_dir: Path):
+    """The segments of a directory, or None if the pipeline has not written any."""
+    path = Path(data_dir) / SEGMENTS_FILENAME
+    if not path.exists():
+        return None
+    return segment_table(pd.read_parquet(path))
+
+
+def write_segments(segments, data_dir: Path):
+    """Replace the segments of a directory (atomically, other stages may read it)."""
+    path = Path(data_dir) / SEGMENTS_FILENAME
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    segments.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def merge_segments(existing, segments):
+    """existing with the clips in segments replaced by their new rows."""
+    if existing is None:
+        return segments
+    clips = set(segments["clip"])
+    kept = existing[~existing["clip"].isin(clips)]
+    rows = pd.concat([kept.astype(object), segments.astype(object)], ignore_index=True)
+    return segment_table(rows)
+
+
+def clip_segments(segments, clip, tier="SIGN"):
+    """(start_frame, end_frame) of one clip's tier, in time order."""
+    rows = segments[(segments["clip"] == clip) & (segments["tier"] == tier)]
+    return list(
+        rows.sort_values("start_frame")[["start_frame", "end_frame"]].itertuples(
+            index=False, name=None
+        )
+    )
+
+
+def write_eaf(segments, clip, eaf_path: Path, video_name=None):
+    """
+    Export one clip's segments as an .eaf in the layout pose_to_segments (and
+    pose_to_signwriting, for the SIGNWRITING tier) writes, e.g. to open it in ELAN.
+    """
+    rows = segments[segments["clip"] == clip]
+    fps = float(rows["fps"].iloc[0]) if len(rows) else 25.0
+    video_name = video_name or f"{clip}.mp4"
+    root = ET.Element(
+        "ANNOTATION_DOCUMENT",
+        {
+            "AUTHOR": "sign-language-processing/transcription",
+            "FORMAT": "3.0",
+            "VERSION": "3.0",
+            "xmlns:xsi": "http://www.w3.org/2001/XMLSchema-instance",
+            "xsi:noNamespaceSchemaLocation": "http://www.mpi.nl/tools/elan/EAFv3.0.xsd",
+        },
+    )
+    header = ET.SubElement(
+        root, "HEADER", {"MEDIA_FILE": "", "TIME_UNITS": "milliseconds"}
+    )
+    ET.SubElement(
+        header,
+        "MEDIA_DESCRIPTOR",
+        {
+            "MEDIA_URL": f"file://{video_name}",
+            "MIME_TYPE": "video/mp4",
+            "RELATIVE_MEDIA_URL": f"./{video_name}",
+        },
+    )
+    time_order = ET.SubElement(root, "TIME_ORDER")
+
+    # SIGN and SENTENCE even when empty, as pose_to_segments writes them
+    present = set(rows["tier"].dropna())
+    tiers = [t for t in TIER_ORDER if t in present or t != "SIGNWRITING"]
+    tiers += sorted(present - set(tiers))
+    n_slots = n_annotations = 0
+    for tier_id in tiers:
+        tier = ET.SubElement(
+            root, "TIER", {"LINGUISTIC_TYPE_REF": "default-lt", "TIER_ID": tier_id}
+        )
+        tier_rows = rows[rows["tier"] == tier_id].sort_values("start_frame")
+        for start, end, value in tier_rows[
+            ["start_frame", "end_frame", "value"]
+        ].itertuples(index=False, name=None):
+            slot_ids = []
+            for frame in (start, end):
+                n_slots += 1
+                slot_ids.append(f"ts{n_slots}")
+                ET.SubElement(
+                    time_order,
+                    "TIME_SLOT",
+                    {
+                        "TIME_SLOT_ID": slot_ids[-1],
+                        "TIME_VALUE": str(int(frame / fps * 1000)),
+                    },
+                )
+            n_annotations += 1
+            annotation = ET.SubElement(tier, "ANNOTATION")
+            alignable = ET.SubElement(
+                annotation,
+                "ALIGNABLE_ANNOTATION",
+                {
+                    "ANNOTATION_ID": f"a{n_annotations}",
+                    "TIME_SLOT_REF1": slot_ids[0],
+                    "TIME_SLOT_REF2": slot_ids[1],
+                },
+            )
+            ET.SubElement(alignable, "ANNOTATION_VALUE").text = (
+                value if isinstance(value, str) else ""
+            )
+
+    ET.SubElement(header, "PROPERTY", {"NAME": "lastUsedAnnotationId"}).text = str(
+        n_annotations
+    )
+    ET.SubElement(
+        root,
+        "LINGUISTIC_TYPE",
+        {
+            "GRAPHIC_REFERENCES": "false",
+            "LINGUISTIC_TYPE_ID": "default-lt",
+            "TIME_ALIGNABLE": "true",
+        },
+    )
+    ET.indent(root, space="    ")
+    ET.ElementTree(root).write(eaf_path, encoding="UTF-8", xml_declaration=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export clips of a directory's segments.parquet as .eaf files for ELAN."
+    )
+    parser.add_argument("data_dir", type=Path)
+    parser.add_argument("clips", nargs="*", help="e.g. clip_003 (default: all)")
+    parser.add_argument("--out_dir", type=Path, default=None)
+    args = parser.parse_args()
+
+    segments = read_segments(args.data_dir)
+    if segments is None:
+        raise SystemExit(f"No {SEGMENTS_FILENAME} in {args.data_dir}")
+    out_dir = args.out_dir or args.data_dir
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for clip in args.clips or sorted(segments["clip"].unique()):
+        write_eaf(segments, clip, out_dir / f"{clip}.eaf")
+        print(out_dir / f"{clip}.eaf")
@@ -0,0 +1,311 @@
+import asyncio
+import json
+import signal
+import struct
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from tqdm import tqdm
+from instrumentation import Tracer
+
+# tool start-up (model loading) plus processing time per second of video
+TIMEOUT_BASE = 120.0
+TIMEOUT_PER_SECOND = 20.0
+FAILURE_MANIFEST = "failures.jsonl"
+
+
+def _header_timing(buffer):
+    offset = 0
+
+    def read(fmt):
+        nonlocal offset
+        values = struct.unpack_from(fmt, buffer, offset)
+        offset += struct.calcsize(fmt)
+        return values
+
+    def skip_str():
+        nonlocal offset
+        (length,) = read("<H")
+        offset += length
+
+    (version,) = read("<f")
+    read("<HHH")  # width, height, depth
+    (components,) = read("<H")
+    for _ in range(components):
+        skip_str()  # name
+        skip_str()  # point format
+        points, limbs, colors = read("<HHH")
+        for _ in range(points):
+            skip_str()
+        offset += 4 * limbs + 6 * colors
+    # v0.1 stores fps and frames as ushorts, later versions as float and uint
+    return read("<HH") if round(version, 1) <= 0.1 else read("<fI")
+
+
+def pose_timing(pose_path: Path):
+    """(fps, frames) from the .pose header without reading the body, or None."""
+    try:
+        with open(pose_path, "rb") as f:
+            # the header fits in the first 64 kB unless it has unusually many points
+            try:
+                return _header_timing(f.read(1 << 16))
+            except struct.error:
+                f.seek(0)
+                return _header_timing(f.read())
+    except (OSError, struct.error):
+        return None
+
+
+def pose_duration(pose_path: Path):
+    """Clip duration in seconds from the .pose header, without reading the body."""
+    timing = pose_timing(pose_path)
+    if timing is None or not timing[0]:
+        return None
+    fps, frames = timing
+    return frames / fps
+
+
+def clip_timeout(pose_path, base=TIMEOUT_BASE, per_second=TIMEOUT_PER_SECOND):
+    duration = pose_duration(pose_path)
+    # unknown length: allow a clip of a minute
+    return base + per_second * (duration if duration is not None else 60.0)
+
+
+@contextmanager
+def time_limit(seconds):
+    """
+    Raise TimeoutError in the block after seconds. Needs SIGALRM and the main
+    thread (elsewhere there is no limit); a long call into C code, such as an
+    onnxruntime run, is only interrupted once it returns.
+    """
+    if (
+        not hasattr(signal, "SIGALRM")
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield
+        return
+
+    def alarm(signum, frame):
+        raise TimeoutError(f"timed out after {seconds:.0f}s")
+
+    previous = signal.signal(signal.SIGALRM, alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+class Supervisor:
+    """
+    Runs the pipeline's per-clip tool calls with a timeout scaled to the clip
+    duration and a bounded number of retries with exponential backoff. Clips
+    that still fail are quarantined in failures.jsonl next to them, and later
+    runs skip quarantined clips. With quarantine=False recording failed clips
+    is left to the caller (e.g. the work queue, which counts attempts itself);
+    last_failure has the reason and stderr of the last failure either way.
+    """
+
+    def __init__(
+        self,
+        tracer=None,
+        retries=2,
+        backoff=5.0,
+        timeout_base=TIMEOUT_BASE,
+        timeout_per_second=TIMEOUT_PER_SECOND,
+        retry_quarantined=False,
+        quarantine=True,
+    ):
+        self.tracer = tracer or Tracer()
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout_base = timeout_base
+        self.timeout_per_second = timeout_per_second
+        self.retry_quarantined = retry_quarantined
+        self.quarantine = quarantine
+        self.last_failure = None
+
+    def quarantined(self, data_dir: Path, stage):
+        """Names of the clips in data_dir quarantined for stage."""
+        if self.retry_quarantined:
+            return set()
+        return {
+            failure["clip"]
+            for failure in read_failures(data_dir)
+            if failure["stage"] == stage
+        }
+
+    def run(self, stage, pose_path: Path, cmd, check=None, cleanup=(), **kwargs):
+        """
+        Run cmd for one clip until it exits with 0 (and check(process) holds).
+        Partial outputs in cleanup are removed after a failed attempt. Returns
+        the CompletedProcess, or None once the clip has been quarantined.
+        """
+        timeout = clip_timeout(pose_path, self.timeout_base, self.timeout_per_second)
+        for attempt in range(1, self.retries + 2):
+            try:
+                process = self.tracer.run(
+                    stage, pose_path, cmd, timeout=timeout, **kwargs
+                )
+            except subprocess.TimeoutExpired as e:
+                process = e
+            reason = self._failure(process, check, timeout)
+            if reason is None:
+                return process
+            self._failed_attempt(stage, pose_path, reason, attempt, cleanup)
+            if attempt <= self.retries:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+        self._give_up(stage, pose_path, reason, attempt, process.stderr)
+        return None
+
+    async def run_async(
+        self,
+        stage,
+        pose_path: Path,
+        cmd,
+        check=None,
+        cleanup=(),
+        parse_line=None,
+        **kwargs,
+    ):
+        """
+        Async run, with stdout parsed while the tool is running: returns
+        (CompletedProcess, [parse_line(line) for each stdout line that gives
+        a result]) of the successful attempt, or (None, []) once quarantined.
+        """
+        timeout = clip_timeout(pose_path, self.timeout_base, self.timeout_per_second)
+        for attempt in range(1, self.retries + 2):
+            parsed = []
+
+            def on_line(line):
+                result = parse_line(line)
+                if result is not None:
+                    parsed.append(result)
+
+            try:
+                process = await self.tracer.run_async(
+                    stage,
+                    pose_path,
+                    cmd,
+                    timeout=timeout,
+                    on_line=on_line if parse_line else None,
+                    **kwargs,
+                )
+            except subprocess.TimeoutExpired as e:
+                process = e
+            reason = self._failure(process, check, timeout)
+            if reason is None:
+                return process, parsed
+            self._failed_attempt(stage, pose_path, reason, attempt, cleanup)
+            if attempt <= self.retries:
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+        self._give_up(stage, pose_path, reason, attempt, process.stderr)
+        return None, []
+
+    def call(self, stage, pose_path: Path, function, inputs=()):
+        """
+        run for work done in this process instead of a tool call:
+        function(pose_path) with the same timeout, retries and quarantine, and
+        a span per attempt. Returns its result, or None once quarantined.
+        """
+        timeout = clip_timeout(pose_path, self.timeout_base, self.timeout_per_second)
+        for attempt in range(1, self.retries + 2):
+            try:
+                with self.tracer.span(stage, pose_path, inputs), time_limit(timeout):
+                    return function(pose_path)
+            except TimeoutError:
+                reason, stderr = f"timed out after {timeout:.0f}s", ""
+            except Exception as e:
+                reason, stderr = f"raised {type(e).__name__}", repr(e)
+            self._failed_attempt(stage, pose_path, reason, attempt, ())
+            if attempt <= self.retries:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+        self._give_up(stage, pose_path, reason, attempt, stderr)
+        return None
+
+    @staticmethod
+    def _failure(process, check, timeout):
+        """Why an attempt failed, or None if it succeeded."""
+        if isinstance(process, subprocess.TimeoutExpired):
+            return f"timed out after {timeout:.0f}s"
+        if process.returncode != 0:
+            return f"exit code {process.returncode}"
+        if check is not None and not check(process):
+            return "missing or invalid output"
+        return None
+
+    @staticmethod
+    def _failed_attempt(stage, pose_path, reason, attempt, cleanup):
+        for path in cleanup:
+            Path(path).unlink(missing_ok=True)
+        tqdm.write(f"{stage} failed for {pose_path.name} ({reason}), attempt {attempt}")
+
+    def _give_up(self, stage, pose_path, reason, attempts, stderr):
+        self.last_failure = (reason, stderr)
+        if self.quarantine:
+            self.quarantine_clip(stage, pose_path, reason, attempts, stderr)
+
+    @staticmethod
+    def quarantine_clip(stage, pose_path, reason, attempts, stderr=""):
+        """Record a clip in the failures.jsonl next to it; later runs skip it for stage."""
+        if isinstance(stderr, bytes):
+            stderr = stderr.decode(errors="replace")
+        failure = {
+            "clip": pose_path.name,
+            "stage": stage,
+            "attempts": attempts,
+            "reason": reason,
+            "stderr": (stderr or "")[-2000:],
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        with open(pose_path.parent / FAILURE_MANIFEST, "a") as f:
+            f.write(json.dumps(failure) + "\n")
+        tqdm.write(f"Quarantined {pose_path.name} for {stage}: {reason}")
+
+
+def run_in_order(jobs, concurrency=1, on_result=None, desc=None):
+    """
+    Run async jobs (functions returning a coroutine) with at most concurrency
+    running at a time. Jobs start in order, and on_result is called with each
+    result in job order as soon as all earlier jobs are done, whatever order
+    they finish in. Returns the results in job order.
+    """
+
+    async def run_all():
+        loop = asyncio.get_running_loop()
+        # one thread per running tool waits for its exit (see Tracer.run_async)
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency + 4))
+        semaphore = asyncio.Semaphore(concurrency)
+        progress = tqdm(total=len(jobs), desc=desc)
+
+        async def run(job):
+            async with semaphore:
+                result = await job()
+            progress.update()
+            return result
+
+        tasks = [asyncio.ensure_future(run(job)) for job in jobs]
+        results = []
+        try:
+            for task in tasks:
+                result = await task
+                if on_result is not None:
+                    on_result(result)
+                results.append(result)
+        finally:
+            progress.close()
+        return results
+
+    return asyncio.run(run_all())
+
+
+def read_failures(data_dir: Path):
+    manifest = Path(data_dir) / FAILURE_MANIFEST
+    if not manifest.exists():
+        return []
+    with open(manifest) as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -1,12 +1,22 @@
 import subprocess, sys, os
 import importlib.util
 import importlib.metadata
+import tempfile
+from functools import partial
 from pathlib import Path
+import pandas as pd
 from tqdm import tqdm
+from segments import (
+    clip_segments,
+    read_segments,
+    segment_table,
+    write_eaf,
+    write_segments,
+)
+from supervisor import Supervisor, run_in_order
 
 
-def run_transcription(data_dir: Path):
-    # install dependencies
+def install_transcription():
     if importlib.util.find_spec("mediapipe") is None:
         subprocess.run(
             [sys.executable, "-m", "pip", "install", "mediapipe", "protobuf==3.20.3"]
@@ -50,63 +60,174 @@ def run_transcription(data_dir: Path):
             [sys.executable, "-m", "pip", "install", ".[pose_to_signwriting]"],
             cwd="signwriting-transcription",
         )
-    
+
     subprocess.run(
-            [
-                sys.executable,
-                "-m",
-                "pip",
-                "install",
-                "numpy==1.24.4",
-                "torch==1.12.0",
-                "torchaudio==0.12.0",
-            ]
-        )
+        [
+            sys.executable,
+            "-m",
+            "pip",
+            "install",
+            "numpy==1.24.4",
+            "torch==1.12.0",
+            "torchaudio==0.12.0",
+        ]
+    )
+
+
+def parse_prediction(line):
+    """SignWriting prediction from a line of pose_to_signwriting output, if any."""
+    # Filter only lines starting with 'M' (SignWriting symbols)
+    return line.strip() if line.startswith("M") else None
+
+
+def transcription_args(pose_path: Path, elan_path=None):
+    """(args, kwargs) of Supervisor.run/run_async for transcribing one segmented clip."""
+    elan_path = elan_path or pose_path.with_suffix(".eaf")
+    # Run the pose_to_signwriting command
+    cmd = ["pose_to_signwriting", "--pose", str(pose_path), "--elan", str(elan_path)]
+    return ("transcription", pose_path, cmd), dict(inputs=[pose_path, elan_path])
+
+
+def transcribe_clip(pose_path: Path, supervisor, elan_path=None):
+    """Transcribe one segmented clip; its predictions, or None if it failed."""
+    args, kwargs = transcription_args(pose_path, elan_path)
+    process = supervisor.run(*args, **kwargs, capture_output=True, text=True)
+    if process is None:
+        return None
+    predictions = [parse_prediction(line) for line in process.stdout.splitlines()]
+    return [pred for pred in predictions if pred is not None]
+
+
+def prediction_lines(clip, predictions):
+    """The prediction.txt lines of a transcribed clip, "<clip> None" if it got no prediction."""
+    # Add predictions using the clip name instead of a numeric ID
+    return [f"{clip} {pred}\n" for pred in predictions or ["None"]]
+
+
+def kept_prediction_lines(data_dir: Path, only=None):
+    """The prediction.txt lines of the clips not in only, which a run on only keeps."""
+    path = data_dir / "prediction.txt"
+    if only is None or not path.exists():
+        return []
+    with open(path) as f:
+        return [line for line in f if line.split(" ", 1)[0] not in only]
+
+
+def run_transcription(
+    data_dir: Path,
+    install=True,
+    tracer=None,
+    supervisor=None,
+    concurrency=1,
+    only=None,
+    segments=None,
+):
+    """
+    only: names of the clips to transcribe (e.g. {"clip_003"}), default all;
+    the prediction.txt lines of the other clips are kept.
+    Clips without an .eaf are transcribed from segments (the table returned by
+    run_segmentation(in_memory=True), by default data_dir's segments.parquet),
+    and their predictions are added to it as a SIGNWRITING tier.
+    """
+    if install:
+        install_transcription()
+    supervisor = supervisor or Supervisor(tracer)
+    quarantined = supervisor.quarantined(data_dir, "transcription")
+    if segments is None:
+        segments = read_segments(data_dir)
+    in_table = set(segments["clip"]) if segments is not None else set()
+    # pose_to_signwriting only reads .eaf: segments of clips without one are
+    # written to a temporary .eaf for the call
+    tmp_dir = tempfile.TemporaryDirectory(prefix="segments_")
 
     # Find all .pose files
     pose_files = sorted(data_dir.glob("*.pose"))
+    if only is not None:
+        pose_files = [p for p in pose_files if p.stem in only]
 
-    output_lines = []
+    async def transcribe(pose_path, elan_path=None):
+        args, kwargs = transcription_args(pose_path, elan_path)
+        process, predictions = await supervisor.run_async(
+            *args, **kwargs, parse_line=parse_prediction
+        )
+        if process is None:
+            return pose_path.stem, None
+        if not predictions:
+            tqdm.write(f"No predicted SignWriting for {pose_path.stem}")
+        return pose_path.stem, predictions
 
-    for pose_path in tqdm(pose_files, desc="Processing files"):
+    jobs = []
+    for pose_path in pose_files:
         base_name = pose_path.stem  # e.g. "alarm" from "alarm.pose"
         elan_path = data_dir / f"{base_name}.eaf"
 
         if not elan_path.exists():
-            tqdm.write(f"Skipping {pose_path.name} (missing {elan_path.name})")
+            if base_name not in in_table:
+                tqdm.write(f"Skipping {pose_path.name} (missing {elan_path.name})")
+                continue
+            elan_path = Path(tmp_dir.name) / elan_path.name
+            write_eaf(segments, base_name, elan_path)
+        if pose_path.name in quarantined:
+            tqdm.write(f"Skipping {base_name}: quarantined after failing before")
             continue
+        jobs.append(partial(transcribe, pose_path, elan_path))
 
-        tqdm.write(f"Processing {base_name}")
+    # Write all predictions to a single file, in file order whatever order the
+    # clips finish in; a run on only some clips keeps the others' lines
+    kept = kept_prediction_lines(data_dir, only)
+    with open(data_dir / "prediction.txt", "w") as f:
+        f.writelines(kept)
+
+        def write_predictions(result):
+            base_name, predictions = result
+            # failed clips (None) are recorded in failures.jsonl instead
+            if predictions is not None:
+                f.writelines(prediction_lines(base_name, predictions))
+            f.flush()
+
+        with tmp_dir:
+            results = run_in_order(
+                jobs, concurrency, write_predictions, desc="Processing files"
+            )
 
-        # Run the pose_to_signwriting command
-        process = subprocess.run(
+    if in_table:
+        segments = add_signwriting(
+            segments,
             [
-                "pose_to_signwriting",
-                "--pose",
-                str(pose_path),
-                "--elan",
-                str(elan_path),
+                (clip, preds)
+                for clip, preds in results
+                if clip in in_table and preds is not None
             ],
-            capture_output=True,
-            text=True,
         )
-
-        # Filter only lines starting with 'M' (SignWriting symbols)
-        predictions = [
-            line.strip() for line in process.stdout.splitlines() if line.startswith("M")
+        write_segments(segments, data_dir)
+    return segments
+
+
+def add_signwriting(segments, predictions):
+    """
+    segments with a SIGNWRITING tier for the (clip, predictions) given, one
+    prediction per SIGN segment in time order, like pose_to_signwriting's tier.
+    """
+    rows = []
+    for clip, preds in predictions:
+        signs = clip_segments(segments, clip)
+        if preds and len(preds) != len(signs):
+            tqdm.write(f"{clip}: {len(preds)} predictions for {len(signs)} signs")
+        fps = float(segments.loc[segments["clip"] == clip, "fps"].iloc[0])
+        rows += [
+            (clip, "SIGNWRITING", start, end, pred, fps)
+            for (start, end), pred in zip(signs, preds)
         ]
-
-        if not predictions:
-            tqdm.write(f"No predicted SignWriting for {base_name}")
-            predictions = ["None"] 
-
-        # Add predictions using base_name instead of a numeric ID
-        for pred in predictions:
-            output_lines.append(f"{base_name} {pred}")
-
-    # Write all predictions to a single file
-    with open(data_dir / "prediction.txt", "w") as f:
-        f.write("\n".join(output_lines))
+    replaced = {clip for clip, _ in predictions}
+    kept = segments[
+        ~(segments["clip"].isin(replaced) & (segments["tier"] == "SIGNWRITING"))
+    ]
+    return segment_table(
+        pd.concat(
+            [kept.astype(object), segment_table(rows).astype(object)],
+            ignore_index=True,
+        )
+    )
 
 
 if __name__ == "__main__":
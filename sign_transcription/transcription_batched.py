@@ -0,0 +1,240 @@
+import tempfile
+from collections import namedtuple
+from functools import partial
+from pathlib import Path
+import numpy as np
+from tqdm import tqdm
+from pose_format import Pose
+from pose_format.numpy.pose_body import NumPyPoseBody
+from segments import (
+    add_eaf_signwriting,
+    clip_segments,
+    from_eaf,
+    read_segments,
+    segment_table,
+    write_eaf,
+    write_segments,
+)
+from supervisor import Supervisor, pose_timing, run_in_order
+from transcription import (
+    add_signwriting,
+    install_transcription,
+    kept_prediction_lines,
+    parse_prediction,
+    prediction_lines,
+    transcribe_clip,
+    transcription_args,
+)
+
+# sign segments per pose_to_signwriting call
+BATCH_SIZE = 256
+# masked frames between two segments of a batch, so rounding frames to
+# milliseconds and back never moves a frame into the neighbouring segment
+GAP_FRAMES = 2
+BATCH_CLIP = "batch"
+
+Sign = namedtuple("Sign", "clip index start end fps pose_path")
+
+
+def clip_signs(pose_path: Path, segments, fps):
+    """(start_frame, end_frame) of a clip's SIGN segments, from its .eaf or else segments."""
+    elan_path = pose_path.with_suffix(".eaf")
+    if elan_path.exists():
+        return clip_segments(segment_table(from_eaf(elan_path, fps)), pose_path.stem)
+    if segments is not None and pose_path.stem in set(segments["clip"]):
+        return clip_segments(segments, pose_path.stem)
+    return None
+
+
+def gather_signs(pose_files, segments):
+    """The Sign segments of all clips, and {clip: number of signs}."""
+    signs, n_signs = [], {}
+    for pose_path in pose_files:
+        timing = pose_timing(pose_path)
+        bounds = clip_signs(pose_path, segments, timing[0]) if timing else None
+        if bounds is None:
+            tqdm.write(f"Skipping {pose_path.name} (no segments)")
+            continue
+        n_signs[pose_path.stem] = len(bounds)
+        signs += [
+            Sign(pose_path.stem, i, start, end, timing[0], pose_path)
+            for i, (start, end) in enumerate(bounds)
+        ]
+    return signs, n_signs
+
+
+def length_batches(signs, batch_size=BATCH_SIZE):
+    """
+    Batches of at most batch_size signs of the same frame rate, sorted by
+    length so the signs the model pads together are about as long.
+    """
+    by_fps = {}
+    for sign in signs:
+        by_fps.setdefault(sign.fps, []).append(sign)
+    batches = []
+    for group in by_fps.values():
+        group.sort(key=lambda sign: sign.end - sign.start)
+        batches += [group[i : i + batch_size] for i in range(0, len(group), batch_size)]
+    return batches
+
+
+def read_normalized(pose_path: Path):
+    with open(pose_path, "rb") as f:
+        pose = Pose.read(f.read())
+    # each clip in its own frame of reference, as if transcribed on its own;
+    # a no-op for the poses main.py has normalized already
+    return pose.normalize()
+
+
+def write_batch(batch, pose_path: Path, elan_path: Path):
+    """
+    Write the signs of a batch one after another into one .pose, and an .eaf
+    with a SIGN segment for each; returns the start frame of each sign there.
+    """
+    poses = {}
+    for sign in batch:
+        if sign.pose_path not in poses:
+            poses[sign.pose_path] = read_normalized(sign.pose_path)
+    first = poses[batch[0].pose_path]
+    shape = first.body.data.shape[1:]
+    fps = batch[0].fps
+
+    data, confidence, rows = [], [], []
+    offset = 0
+    for sign in batch:
+        body = poses[sign.pose_path].body
+        if body.data.shape[1:] != shape:
+            raise ValueError(f"{sign.clip} has other pose components than the batch")
+        data.append(body.data[sign.start : sign.end])
+        confidence.append(body.confidence[sign.start : sign.end])
+        length = len(data[-1])
+        rows.append((BATCH_CLIP, "SIGN", offset, offset + length, None, fps))
+        gap = np.zeros((GAP_FRAMES, *shape), dtype=body.data.dtype)
+        data.append(np.ma.masked_array(gap, mask=True))
+        confidence.append(np.zeros((GAP_FRAMES, *shape[:-1]), dtype="float32"))
+        offset += length + GAP_FRAMES
+
+    body = NumPyPoseBody(fps, np.ma.concatenate(data), np.concatenate(confidence))
+    with open(pose_path, "wb") as f:
+        Pose(first.header, body).write(f)
+    write_eaf(segment_table(rows), BATCH_CLIP, elan_path, pose_path.stem + ".mp4")
+    return [start for _, _, start, _, _, _ in rows]
+
+
+async def transcribe_batch(batch, work_dir: Path, number, supervisor):
+    """{(clip, sign index): prediction} of one batch, empty if it failed."""
+    pose_path = work_dir / f"batch_{number:05d}.pose"
+    elan_path = pose_path.with_suffix(".eaf")
+    try:
+        starts = write_batch(batch, pose_path, elan_path)
+    except (ValueError, OSError) as e:
+        tqdm.write(f"Could not batch {len(batch)} signs: {e}")
+        return {}
+    args, kwargs = transcription_args(pose_path, elan_path)
+    process, predictions = await supervisor.run_async(
+        *args, **kwargs, parse_line=parse_prediction
+    )
+    if process is None:
+        return {}
+
+    by_start = dict(zip(starts, batch))
+    tier = [
+        (start, value)
+        for _, tier, start, _, value, _ in from_eaf(elan_path, batch[0].fps)
+        if tier == "SIGNWRITING" and value
+    ]
+    if len(tier) == len(batch) and all(start in by_start for start, _ in tier):
+        pairs = [(by_start[start], value) for start, value in tier]
+    elif len(predictions) == len(batch):
+        # one printed prediction per SIGN segment, in time order
+        pairs = list(zip(batch, predictions))
+    else:
+        tqdm.write(f"{len(predictions)} predictions for a batch of {len(batch)} signs")
+        return {}
+    return {(sign.clip, sign.index): value for sign, value in pairs}
+
+
+def run_transcription_batched(
+    data_dir: Path,
+    install=True,
+    tracer=None,
+    supervisor=None,
+    concurrency=1,
+    only=None,
+    segments=None,
+    batch_size=BATCH_SIZE,
+):
+    """
+    run_transcription with the SIGN segments of many clips per
+    pose_to_signwriting call instead of one clip per call: the model is
+    loaded once per batch_size signs, which dominates for short clips. Clips
+    whose batch failed are transcribed on their own.
+    """
+    if install:
+        install_transcription()
+    supervisor = supervisor or Supervisor(tracer)
+    quarantined = supervisor.quarantined(data_dir, "transcription")
+    if segments is None:
+        segments = read_segments(data_dir)
+
+    pose_files = sorted(data_dir.glob("*.pose"))
+    if only is not None:
+        pose_files = [p for p in pose_files if p.stem in only]
+    pose_files = [p for p in pose_files if p.name not in quarantined]
+
+    signs, n_signs = gather_signs(pose_files, segments)
+    batches = length_batches(signs, batch_size)
+    tqdm.write(f"{len(signs)} signs of {len(n_signs)} clips in {len(batches)} batches")
+
+    predictions = {}
+    with tempfile.TemporaryDirectory(prefix="signwriting_batches_") as work_dir:
+        jobs = [
+            partial(transcribe_batch, batch, Path(work_dir), number, supervisor)
+            for number, batch in enumerate(batches)
+        ]
+        run_in_order(jobs, concurrency, predictions.update, desc="Transcribing batches")
+
+        results, batched = {}, set()
+        for pose_path in pose_files:
+            clip = pose_path.stem
+            if clip not in n_signs:
+                continue
+            preds = [predictions.get((clip, i)) for i in range(n_signs[clip])]
+            if None not in preds:
+                results[clip] = preds
+                batched.add(clip)
+                continue
+            elan_path = pose_path.with_suffix(".eaf")
+            if not elan_path.exists():
+                elan_path = Path(work_dir) / elan_path.name
+                write_eaf(segments, clip, elan_path)
+            preds = transcribe_clip(pose_path, supervisor, elan_path)
+            if preds is not None:
+                results[clip] = preds
+
+    # the SIGNWRITING tier pose_to_signwriting would have added
+    in_table = set(segments["clip"]) if segments is not None else set()
+    for clip in batched:
+        elan_path = data_dir / f"{clip}.eaf"
+        if elan_path.exists():
+            add_eaf_signwriting(elan_path, results[clip])
+    table_results = [
+        (clip, preds) for clip, preds in results.items() if clip in in_table
+    ]
+    if table_results:
+        segments = add_signwriting(segments, table_results)
+        write_segments(segments, data_dir)
+
+    kept = kept_prediction_lines(data_dir, only)
+    with open(data_dir / "prediction.txt", "w") as f:
+        f.writelines(kept)
+        for clip, preds in results.items():
+            f.writelines(prediction_lines(clip, preds))
+    return segments
+
+
+if __name__ == "__main__":
+    dir = "signdict_examples/"
+    # directory containing your .pose and .eaf files
+    data_dir = Path(dir)
+    run_transcription_batched(data_dir)
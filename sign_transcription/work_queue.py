@@ -0,0 +1,332 @@
+import argparse
+import multiprocessing as mp
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from tqdm import tqdm
+from instrumentation import Tracer
+from segmentation import segment_clip
+from supervisor import Supervisor
+from transcription import prediction_lines, transcribe_clip
+
+LEASE_SECONDS = 600.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS clip (
+    pose_path TEXT PRIMARY KEY,
+    subdir TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    predictions TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS clip_state ON clip (state, lease_expires);
+CREATE INDEX IF NOT EXISTS clip_subdir ON clip (subdir, state);
+"""
+
+
+class WorkQueue:
+    """
+    Clips of processed_NRK in a shared SQLite file. A worker claims a clip by
+    taking a lease on it, renews the lease while it works, and marks the clip
+    done or failed; a clip whose lease ran out (its worker died) is claimed
+    again by the next worker. Clip states: queued, leased, done, failed.
+    """
+
+    def __init__(self, db_path, lease_seconds=LEASE_SECONDS, max_attempts=3):
+        self.db_path = Path(db_path)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # rollback journal rather than WAL: WAL needs shared memory, which does
+        # not work across machines on network storage
+        self.conn = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+        self.conn.executescript(SCHEMA)
+        self.expired = []
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers cannot
+        # both read a clip as free and then both claim it
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+
+    def enqueue(self, data_dir: Path):
+        """Add every .pose file in the subdirectories of data_dir; returns the number added."""
+        rows = [
+            (str(pose_path), str(pose_path.parent))
+            for subdir in sorted(Path(data_dir).iterdir())
+            if subdir.is_dir()
+            for pose_path in sorted(subdir.glob("*.pose"))
+        ]
+        with self._transaction() as conn:
+            before = conn.execute("SELECT COUNT(*) FROM clip").fetchone()[0]
+            conn.executemany(
+                "INSERT OR IGNORE INTO clip (pose_path, subdir) VALUES (?, ?)", rows
+            )
+            after = conn.execute("SELECT COUNT(*) FROM clip").fetchone()[0]
+        return after - before
+
+    def claim(self, worker):
+        """
+        Lease the next free clip (queued, or with an expired lease); its path or
+        None. Expired leases of clips out of attempts (their workers died on
+        them, e.g. out of memory) are marked failed instead, and kept in
+        self.expired for the worker to record.
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            # no UPDATE ... RETURNING, which needs SQLite 3.35; the
+            # transaction keeps the SELECT and the UPDATE consistent
+            expired = "state = 'leased' AND lease_expires < ? AND attempts >= ?"
+            self.expired = [
+                Path(pose_path)
+                for (pose_path,) in conn.execute(
+                    f"SELECT pose_path FROM clip WHERE {expired}",
+                    (now, self.max_attempts),
+                ).fetchall()
+            ]
+            conn.execute(
+                "UPDATE clip SET state = 'failed', lease_expires = NULL, "
+                "error = 'lease expired after ' || attempts || ' attempts' "
+                f"WHERE {expired}",
+                (now, self.max_attempts),
+            )
+            row = conn.execute(
+                "SELECT pose_path FROM clip "
+                "WHERE state = 'queued' OR (state = 'leased' AND lease_expires < ?) "
+                "ORDER BY pose_path LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE clip SET state = 'leased', worker = ?, lease_expires = ?, "
+                    "attempts = attempts + 1 WHERE pose_path = ?",
+                    (worker, now + self.lease_seconds, row[0]),
+                )
+        return Path(row[0]) if row else None
+
+    def heartbeat(self, pose_path, worker):
+        """Renew the lease; False if the worker has lost it to another worker."""
+        cursor = self.conn.execute(
+            "UPDATE clip SET lease_expires = ? "
+            "WHERE pose_path = ? AND worker = ? AND state = 'leased'",
+            (time.time() + self.lease_seconds, str(pose_path), worker),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, pose_path, worker, predictions):
+        """Mark a leased clip done; False if the lease was lost meanwhile."""
+        cursor = self.conn.execute(
+            "UPDATE clip SET state = 'done', predictions = ?, lease_expires = NULL "
+            "WHERE pose_path = ? AND worker = ? AND state = 'leased'",
+            ("\n".join(predictions), str(pose_path), worker),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, pose_path, worker, error, final=False):
+        """
+        Requeue a leased clip, or mark it failed after max_attempts (or if
+        final); True if it is failed now.
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE clip SET state = CASE WHEN attempts >= ? OR ? THEN 'failed' "
+                "ELSE 'queued' END, error = ?, lease_expires = NULL "
+                "WHERE pose_path = ? AND worker = ? AND state = 'leased'",
+                (self.max_attempts, final, error, str(pose_path), worker),
+            )
+            if cursor.rowcount != 1:
+                return False
+            row = conn.execute(
+                "SELECT state FROM clip WHERE pose_path = ?", (str(pose_path),)
+            ).fetchone()
+        return row[0] == "failed"
+
+    def subdir_finished(self, subdir):
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM clip WHERE subdir = ? AND state IN ('queued', 'leased')",
+            (str(subdir),),
+        ).fetchone()
+        return row[0] == 0
+
+    def export_predictions(self, subdir):
+        """Write subdir/prediction.txt from the done clips, in file order."""
+        rows = self.conn.execute(
+            "SELECT pose_path, predictions FROM clip "
+            "WHERE subdir = ? AND state = 'done' ORDER BY pose_path",
+            (str(subdir),),
+        )
+        lines = [
+            line
+            for pose_path, predictions in rows
+            for line in prediction_lines(Path(pose_path).stem, predictions.splitlines())
+        ]
+        # workers finishing the last clips at the same time may both export
+        tmp_path = Path(subdir) / f"prediction.txt.{os.getpid()}.tmp"
+        tmp_path.write_text("".join(lines))
+        os.replace(tmp_path, Path(subdir) / "prediction.txt")
+
+    def counts(self):
+        rows = self.conn.execute("SELECT state, COUNT(*) FROM clip GROUP BY state")
+        return dict(rows.fetchall())
+
+
+def _keep_lease(db_path, lease_seconds, pose_path, worker, stop):
+    """Heartbeat thread: renew the lease every third of its length until stopped."""
+    with WorkQueue(db_path, lease_seconds) as queue:
+        while not stop.wait(lease_seconds / 3):
+            if not queue.heartbeat(pose_path, worker):
+                tqdm.write(f"{worker} lost the lease on {pose_path}")
+                return
+
+
+def clip_stage(pose_path: Path):
+    """The stage process_clip starts a clip with."""
+    return "transcription" if pose_path.with_suffix(".eaf").exists() else "segmentation"
+
+
+def process_clip(pose_path: Path, supervisor):
+    """Segment (if needed) and transcribe one clip; its predictions, or None."""
+    if not segment_clip(pose_path, supervisor):
+        return None
+    return transcribe_clip(pose_path, supervisor)
+
+
+def queue_supervisor(tracer=None):
+    """
+    A Supervisor for queue workers: one tool call per claim, and no quarantine
+    of its own, so the queue's attempts are the only retry count.
+    """
+    return Supervisor(tracer or Tracer(), retries=0, quarantine=False)
+
+
+def run_worker(
+    db_path, lease_seconds=LEASE_SECONDS, supervisor=None, worker=None, poll=0.5
+):
+    """
+    Claim and process clips until the queue has no free clips left. Returns the
+    number of clips this worker completed. Clips the queue gives up on are
+    recorded in failures.jsonl, and clips quarantined there are not run.
+    """
+    worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+    supervisor = supervisor or queue_supervisor()
+    done = 0
+    with WorkQueue(db_path, lease_seconds) as queue:
+        while True:
+            pose_path = queue.claim(worker)
+            for expired in queue.expired:
+                Supervisor.quarantine_clip(
+                    clip_stage(expired),
+                    expired,
+                    "lease expired (worker died)",
+                    queue.max_attempts,
+                )
+            if pose_path is None:
+                # clips leased by other workers may still fail and be requeued,
+                # or expire and come back; a short poll, so the last worker
+                # does not idle long after the queue has drained
+                if queue.counts().get("leased", 0) == 0:
+                    return done
+                time.sleep(poll)
+                continue
+
+            stage = clip_stage(pose_path)
+            if pose_path.name in supervisor.quarantined(pose_path.parent, stage):
+                queue.fail(pose_path, worker, f"quarantined for {stage}", final=True)
+                continue
+
+            stop = threading.Event()
+            heartbeat = threading.Thread(
+                target=_keep_lease,
+                args=(db_path, lease_seconds, pose_path, worker, stop),
+                daemon=True,
+            )
+            heartbeat.start()
+            try:
+                predictions = process_clip(pose_path, supervisor)
+            except Exception as e:
+                queue.fail(pose_path, worker, repr(e))
+                raise
+            finally:
+                stop.set()
+                heartbeat.join()
+
+            if predictions is None:
+                reason, stderr = supervisor.last_failure or ("tool call failed", "")
+                if queue.fail(pose_path, worker, reason) and not supervisor.quarantine:
+                    Supervisor.quarantine_clip(
+                        clip_stage(pose_path),
+                        pose_path,
+                        reason,
+                        queue.max_attempts,
+                        stderr,
+                    )
+            elif queue.complete(pose_path, worker, predictions):
+                done += 1
+            if queue.subdir_finished(pose_path.parent):
+                queue.export_predictions(pose_path.parent)
+
+
+def _worker_process(db_path, lease_seconds, trace_path):
+    supervisor = queue_supervisor(Tracer(trace_path))
+    run_worker(db_path, lease_seconds, supervisor)
+
+
+def run_workers(db_path, n_workers, lease_seconds=LEASE_SECONDS, trace_path=None):
+    """Run n_workers local worker processes on the queue until it is drained."""
+    workers = [
+        mp.Process(target=_worker_process, args=(db_path, lease_seconds, trace_path))
+        for _ in range(n_workers)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Process processed_NRK clips from a shared work queue."
+    )
+    parser.add_argument("--db", type=Path, default=Path("../data/work_queue.sqlite"))
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    enqueue = subparsers.add_parser("enqueue", help="Add the clips of a directory")
+    enqueue.add_argument(
+        "data_dir", type=Path, nargs="?", default="../data/processed_NRK"
+    )
+    work = subparsers.add_parser("work", help="Run workers on this machine")
+    work.add_argument("--workers", type=int, default=1)
+    work.add_argument("--lease", type=float, default=LEASE_SECONDS, help="Seconds")
+    work.add_argument(
+        "--trace", type=Path, default=None, help="JSONL trace of the tool calls"
+    )
+    subparsers.add_parser("status", help="Number of clips per state")
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        with WorkQueue(args.db) as queue:
+            print(f"Queued {queue.enqueue(args.data_dir)} new clips")
+    elif args.command == "work":
+        run_workers(args.db, args.workers, args.lease, args.trace)
+    with WorkQueue(args.db) as queue:
+        print(queue.counts())
@@ -0,0 +1,182 @@
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import xml.etree.ElementTree as ET
+import pandas as pd
+
+ANNOTATION_COLUMNS = ["tier", "annotation_id", "start_ms", "end_ms", "value"]
+CACHE_COLUMNS = ["name", "stem", "mtime_ns"] + ANNOTATION_COLUMNS
+CACHE_FILENAME = ".eaf_cache.parquet"
+# written by sign_transcription/segments.py for clips segmented in memory
+SEGMENTS_FILENAME = "segments.parquet"
+
+# Below this many files to parse, process start-up costs more than it saves.
+PARALLEL_THRESHOLD = 64
+
+
+def parse_eaf(eaf_path):
+    """
+    Stream an .eaf file and return its annotations in document order as
+    (tier, annotation_id, start_ms, end_ms, value) tuples.
+    """
+    time_slots = {}
+    annotations = []
+    tier = annotation_id = slot1 = slot2 = value = None
+
+    for event, elem in ET.iterparse(str(eaf_path), events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            if tag == "TIER":
+                tier = elem.get("TIER_ID")
+            elif tag in ("ALIGNABLE_ANNOTATION", "REF_ANNOTATION"):
+                annotation_id = elem.get("ANNOTATION_ID")
+                slot1 = elem.get("TIME_SLOT_REF1")
+                slot2 = elem.get("TIME_SLOT_REF2")
+            continue
+
+        if tag == "TIME_SLOT":
+            time_value = elem.get("TIME_VALUE")
+            time_slots[elem.get("TIME_SLOT_ID")] = (
+                int(time_value) if time_value is not None else None
+            )
+            elem.clear()
+        elif tag == "ANNOTATION_VALUE":
+            # same rule as the old findall(): texts are stripped, missing text is no value
+            value = elem.text.strip() if elem.text else None
+        elif tag in ("ALIGNABLE_ANNOTATION", "REF_ANNOTATION"):
+            annotations.append(
+                (
+                    tier,
+                    annotation_id,
+                    time_slots.get(slot1),
+                    time_slots.get(slot2),
+                    value,
+                )
+            )
+            annotation_id = slot1 = slot2 = value = None
+        elif tag in ("ANNOTATION", "TIER"):
+            elem.clear()
+
+    return annotations
+
+
+def _file_records(file_path):
+    """Parse one .eaf file into cache rows. Files without annotations get one empty row."""
+    file_path = Path(file_path)
+    mtime_ns = file_path.stat().st_mtime_ns
+    annotations = parse_eaf(file_path) or [(None,) * len(ANNOTATION_COLUMNS)]
+    return [(file_path.name, file_path.stem, mtime_ns, *a) for a in annotations]
+
+
+def _parse_files(file_paths, workers=None):
+    if len(file_paths) >= PARALLEL_THRESHOLD and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            per_file = list(executor.map(_file_records, file_paths, chunksize=16))
+    else:
+        per_file = [_file_records(f) for f in file_paths]
+    return [row for rows in per_file for row in rows]
+
+
+def _segment_records(segments_path: Path, skip_stems):
+    """
+    Cache rows of the clips in a segments.parquet that have no .eaf of their
+    own (those in skip_stems), frames converted to milliseconds.
+    """
+    segments = pd.read_parquet(segments_path)
+    segments = segments[~segments["clip"].astype(str).isin(skip_stems)]
+    # clips segmented without any segment have a row without a tier
+    segments = segments[segments["tier"].notna()]
+    mtime_ns = segments_path.stat().st_mtime_ns
+    to_ms = 1000 / segments["fps"].astype(float)
+    return pd.DataFrame(
+        {
+            "name": segments["clip"].astype(str) + ".eaf",
+            "stem": segments["clip"].astype(str),
+            "mtime_ns": mtime_ns,
+            "tier": segments["tier"].astype(str),
+            "annotation_id": None,
+            "start_ms": (segments["start_frame"] * to_ms).astype(int),
+            "end_ms": (segments["end_frame"] * to_ms).astype(int),
+            "value": segments["value"],
+        },
+        columns=CACHE_COLUMNS,
+    )
+
+
+def _read_cache(cache_path: Path):
+    if cache_path.exists():
+        try:
+            return pd.read_parquet(cache_path)
+        except Exception as e:
+            print(f"Ignoring unreadable cache {cache_path}: {e}")
+    return pd.DataFrame(columns=CACHE_COLUMNS)
+
+
+def load_eaf_folder(folder_path, workers=None, use_cache=True):
+    """
+    Return one row per annotation (name, stem, mtime_ns, tier, annotation_id,
+    start_ms, end_ms, value) for every .eaf file in folder_path.
+
+    Parsed annotations are cached in a Parquet file inside the folder, keyed by
+    filename and modification time, so only new or changed files are parsed
+    again. Large batches of files are parsed across worker processes. Clips
+    of the folder's segments.parquet without an .eaf are included as if they
+    had one.
+    """
+    folder = Path(folder_path)
+    files = sorted(folder.glob("*.eaf"))
+    mtimes = {f.name: f.stat().st_mtime_ns for f in files}
+    cache_path = folder / CACHE_FILENAME
+
+    cached = (
+        _read_cache(cache_path) if use_cache else pd.DataFrame(columns=CACHE_COLUMNS)
+    )
+    # compare as Python ints, nanosecond mtimes do not survive a float cast
+    is_fresh = [
+        mtimes.get(name) == mtime
+        for name, mtime in zip(cached["name"], cached["mtime_ns"])
+    ]
+    fresh = cached[pd.Series(is_fresh, index=cached.index, dtype=bool)]
+
+    fresh_names = set(fresh["name"])
+    stale = [f for f in files if f.name not in fresh_names]
+    parsed = pd.DataFrame(_parse_files(stale, workers), columns=CACHE_COLUMNS)
+
+    segments_path = folder / SEGMENTS_FILENAME
+    from_segments = (
+        _segment_records(segments_path, {f.stem for f in files})
+        if segments_path.exists()
+        else pd.DataFrame(columns=CACHE_COLUMNS)
+    )
+
+    frames = [df for df in (fresh, parsed, from_segments) if len(df)]
+    if frames:
+        annotations = pd.concat(frames, ignore_index=True)
+    else:
+        annotations = pd.DataFrame(columns=CACHE_COLUMNS)
+    # stable sort keeps the document order of annotations within each file
+    annotations = annotations.sort_values("name", kind="stable", ignore_index=True)
+
+    if use_cache and (stale or len(fresh) != len(cached)):
+        cache = annotations[annotations["name"].isin(mtimes)]
+        cache.to_parquet(cache_path, index=False)
+
+    return annotations
+
+
+def annotation_values(annotations, sep=None):
+    """
+    Collapse annotation rows to one row per file with name, stem and value.
+    value is the list of annotation texts, or a single string joined by sep.
+    """
+    files = annotations[["name", "stem"]].drop_duplicates("name")
+    texts = annotations.dropna(subset=["value"]).groupby("name", sort=False)["value"]
+    values = texts.agg(list) if sep is None else texts.agg(sep.join)
+
+    mapped = files["name"].map(values)
+    files = files.assign(
+        value=[
+            v if isinstance(v, (list, str)) else ([] if sep is None else "")
+            for v in mapped
+        ]
+    )
+    return files.reset_index(drop=True)
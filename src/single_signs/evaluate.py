@@ -1,7 +1,5 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.stats import gaussian_kde
 import sys
 import re
 from pathlib import Path
@@ -9,18 +7,28 @@ from pathlib import Path
 # Add the directory that *contains* the signwriting_evaluation folder
 sys.path.append(str(Path(__file__).parent / "signwriting-evaluation"))
 
-from signwriting_evaluation.metrics.bleu import SignWritingBLEU
-from signwriting_evaluation.metrics.chrf import SignWritingCHRF
-from signwriting_evaluation.metrics.clip import (
-    SignWritingCLIPScore,
-    signwriting_to_clip_image,
-)
-from signwriting_evaluation.metrics.similarity import SignWritingSimilarityMetric
+# matplotlib, scipy and signwriting_evaluation (with the CLIP model behind
+# CLIPScore) take seconds to import, so they are imported where they are used
+
+
+def default_metrics():
+    """BLEU, chrF, CLIPScore and symbol similarity metric objects."""
+    from signwriting_evaluation.metrics.bleu import SignWritingBLEU
+    from signwriting_evaluation.metrics.chrf import SignWritingCHRF
+    from signwriting_evaluation.metrics.clip import SignWritingCLIPScore
+    from signwriting_evaluation.metrics.similarity import SignWritingSimilarityMetric
+
+    return [
+        SignWritingBLEU(),
+        SignWritingCHRF(),
+        SignWritingCLIPScore(),
+        SignWritingSimilarityMetric(),
+    ]
 
 
 def visualize_signwriting(value, filename="SignWriting_Visualization"):
     """Generate and display a SignWriting image from its string representation."""
-    from PIL import Image
+    from signwriting_evaluation.metrics.clip import signwriting_to_clip_image
 
     v = value.split()
     if len(v) > 1:
@@ -38,6 +46,7 @@ def analyze_value_columns(
     """
     For each *_value columnplot and save histogram of value multiplicities
     """
+    import matplotlib.pyplot as plt
 
     value_cols = [c for c in merged_df.columns if c.endswith(col_prefix)]
 
@@ -108,6 +117,8 @@ def overlay_all_metrics_kde(df, col_prefix="value"):
     Create subplots for all metrics overlaying original/cut/speed/both variants
     using KDE curves with light fills and legend below the title.
     """
+    import matplotlib.pyplot as plt
+    from scipy.stats import gaussian_kde
 
     variants = ["original", "cut", "speed", "both"]
     colors = {"original": "blue", "cut": "orange", "speed": "green", "both": "pink"}
@@ -223,10 +234,11 @@ def compare_length(df, col_prefix="value"):
     return nan_counts
 
 
-def compare_signwriting(res_df, sw_df, experiment=False):
+def compare_signwriting(res_df, sw_df, experiment=False, metrics=None):
     """
     Compare all SignWriting columns in res_df with
     SignWriting lists in sw_df, matched by stem and 'stem.mp4' filename.
+    metrics defaults to BLEU, chrF, CLIPScore and symbol similarity.
     """
 
     # Prepare filename stem for matching
@@ -243,12 +255,8 @@ def compare_signwriting(res_df, sw_df, experiment=False):
     # ]["stem"].value_counts()
     # print(gloss_counts)
 
-    metrics = [
-        SignWritingBLEU(),
-        SignWritingCHRF(),
-        SignWritingCLIPScore(),
-        SignWritingSimilarityMetric(),
-    ]
+    if metrics is None:
+        metrics = default_metrics()
     # Identify SW columns
     list_cols = [c for c in merged.columns if c.endswith("_value")]
 
@@ -278,6 +286,8 @@ def compare_signwriting(res_df, sw_df, experiment=False):
     #    subset=["stem", "Filename", "name", "reference"], inplace=True
     # )
     if experiment:
+        import matplotlib.pyplot as plt
+
         plt.style.use("bmh")
         overlay_all_metrics_kde(merged, col_prefix="value")
 
@@ -1,35 +1,13 @@
-import os
-import glob
-import pandas as pd
-import xml.etree.ElementTree as ET
+from src.single_signs.eaf import parse_eaf, load_eaf_folder, annotation_values
 
 
 def extract_annotation_values(eaf_path):
     """Extract all <ANNOTATION_VALUE>...</ANNOTATION_VALUE> texts from an .eaf file."""
-    tree = ET.parse(eaf_path)
-    root = tree.getroot()
-
-    values = []
-
     # Look for all <ANNOTATION_VALUE> tags regardless of tier
-    for elem in root.findall(".//ANNOTATION_VALUE"):
-        if elem.text:
-            values.append(elem.text.strip())
+    return [value for *_, value in parse_eaf(eaf_path) if value is not None]
 
-    return values
 
-
-def process_eaf_folder(folder_path):
+def process_eaf_folder(folder_path, workers=None, use_cache=True):
     """Build a table containing filename, stem, and list of annotation values."""
-    data = []
-
-    for file_path in glob.glob(os.path.join(folder_path, "*.eaf")):
-        filename = os.path.basename(file_path)
-        stem = os.path.splitext(filename)[0]
-
-        values = extract_annotation_values(file_path)
-
-        data.append({"name": filename, "stem": stem, "value": values})
-
-    df = pd.DataFrame(data)
-    return df
+    annotations = load_eaf_folder(folder_path, workers=workers, use_cache=use_cache)
+    return annotation_values(annotations)
@@ -0,0 +1,151 @@
+import warnings
+import numpy as np
+import pandas as pd
+
+N_RESAMPLES = 10_000
+# resamples drawn at once: chunk x clusters index and weight matrices
+CHUNK_ELEMENTS = 4_000_000
+
+
+def cluster_sums(values, clusters=None):
+    """
+    Per cluster (e.g. stem: a video's rows share its prediction, one row per
+    matching reference) the sum and count of the non-NaN values of each
+    column; without clusters every row is its own.
+    """
+    values = np.asarray(values, dtype=float)
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    if clusters is None:
+        return filled, present.astype(float)
+    _, inverse = np.unique(np.asarray(clusters), return_inverse=True)
+    n_clusters = inverse.max() + 1 if len(inverse) else 0
+    sums = np.zeros((n_clusters, values.shape[1]))
+    counts = np.zeros((n_clusters, values.shape[1]))
+    np.add.at(sums, inverse, filled)
+    np.add.at(counts, inverse, present)
+    return sums, counts
+
+
+def _chunks(n_resamples, n_clusters):
+    size = max(1, CHUNK_ELEMENTS // max(n_clusters, 1))
+    for start in range(0, n_resamples, size):
+        yield min(size, n_resamples - start)
+
+
+def bootstrap_means(sums, counts, n_resamples=N_RESAMPLES, seed=0):
+    """
+    Column means of n_resamples bootstrap samples of the clusters
+    (n_resamples x columns): each chunk of resamples is an index matrix,
+    counted into a weight matrix, so all columns are one matrix product.
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = len(sums)
+    means = []
+    for size in _chunks(n_resamples, n_clusters):
+        index = rng.integers(0, n_clusters, (size, n_clusters))
+        index += np.arange(size)[:, None] * n_clusters
+        weights = np.bincount(index.ravel(), minlength=size * n_clusters)
+        weights = weights.reshape(size, n_clusters).astype(float)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means.append((weights @ sums) / (weights @ counts))
+    return np.concatenate(means)
+
+
+def paired_permutation_pvalues(sums, counts, n_resamples=N_RESAMPLES, seed=0):
+    """
+    Two-sided p-values of paired sign-flip permutation tests, one per column
+    of per-cluster sums of paired differences: under the null each cluster's
+    differences are as likely to have the other sign.
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = len(sums)
+    n = counts.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        observed = np.abs(sums.sum(axis=0) / n)
+    extreme = np.zeros(sums.shape[1])
+    for size in _chunks(n_resamples, n_clusters):
+        signs = rng.integers(0, 2, (size, n_clusters)) * 2.0 - 1.0
+        with np.errstate(invalid="ignore", divide="ignore"):
+            permuted = np.abs((signs @ sums) / n)
+        # tolerance so that ties with the observed statistic count as extreme
+        extreme += (permuted >= observed - 1e-12).sum(axis=0)
+    return (extreme + 1) / (n_resamples + 1)
+
+
+def holm(pvalues):
+    """Holm-Bonferroni adjusted p-values (NaN stays NaN)."""
+    pvalues = np.asarray(pvalues, dtype=float)
+    adjusted = np.full_like(pvalues, np.nan)
+    valid = np.flatnonzero(~np.isnan(pvalues))
+    order = valid[np.argsort(pvalues[valid])]
+    m = len(order)
+    running = 0.0
+    for rank, i in enumerate(order):
+        running = max(running, min(1.0, (m - rank) * pvalues[i]))
+        adjusted[i] = running
+    return adjusted
+
+
+def variant_statistics(
+    summary_df,
+    clusters=None,
+    baseline="original",
+    n_resamples=N_RESAMPLES,
+    confidence=0.95,
+    seed=0,
+):
+    """
+    For the per-row scores of summarize_lengths_and_means ((variant, metric)
+    columns): per metric and variant the mean with a bootstrap percentile
+    CI, and against baseline the mean paired difference with its CI and a
+    permutation p-value (raw and Holm-adjusted over all comparisons).
+    clusters (e.g. result_df["stem"]) are resampled together.
+    """
+    columns = list(summary_df.columns)
+    values = summary_df.to_numpy(dtype=float)
+    comparisons = [
+        (i, columns.index((baseline, metric)))
+        for i, (variant, metric) in enumerate(columns)
+        if variant != baseline and (baseline, metric) in columns
+    ]
+    # NaN, so left out, where either variant has no value
+    differences = np.empty((len(values), len(comparisons)))
+    for k, (i, j) in enumerate(comparisons):
+        differences[:, k] = values[:, i] - values[:, j]
+
+    sums, counts = cluster_sums(np.hstack([values, differences]), clusters)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums.sum(axis=0) / counts.sum(axis=0)
+    resampled = bootstrap_means(sums, counts, n_resamples, seed)
+    alpha = (1 - confidence) / 2
+    with warnings.catch_warnings():
+        # columns without any value (e.g. a variant that was not run)
+        warnings.simplefilter("ignore", RuntimeWarning)
+        low, high = np.nanquantile(resampled, [alpha, 1 - alpha], axis=0)
+
+    n_values = len(columns)
+    pvalues = paired_permutation_pvalues(
+        sums[:, n_values:], counts[:, n_values:], n_resamples, seed + 1
+    )
+
+    table = pd.DataFrame(
+        {
+            "mean": means[:n_values],
+            "ci_low": low[:n_values],
+            "ci_high": high[:n_values],
+        },
+        index=pd.MultiIndex.from_tuples(columns, names=["variant", "metric"]),
+    )
+    for column in ["diff", "diff_ci_low", "diff_ci_high", "p_value", "p_holm"]:
+        table[column] = np.nan
+    for k, (i, _) in enumerate(comparisons):
+        table.iloc[i, 3:] = [
+            means[n_values + k],
+            low[n_values + k],
+            high[n_values + k],
+            pvalues[k],
+            np.nan,
+        ]
+    table.loc[table["p_value"].notna(), "p_holm"] = holm(table["p_value"].dropna())
+    return table.swaplevel().sort_index()